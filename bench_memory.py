@@ -0,0 +1,59 @@
+# bench_memory.py - Memory used per book/member record: dicts vs __slots__ records
+#
+# Usage: python bench_memory.py [--count N]
+#
+# The field values (ISBNs, titles, ...) are created before measuring, so
+# the numbers show only what the record containers themselves cost.
+
+import argparse
+import tracemalloc
+
+from records import VALID_GENRES, Book, Member
+
+
+def make_values(count):
+    """Build the field values shared by both record layouts"""
+    books = [(f"978-{i:010d}", f"Title {i}", f"Author {i % 5000}", VALID_GENRES[i % 3], 3, 3)
+             for i in range(count)]
+    members = [(f"M{i:07d}", f"Member {i}", f"m{i}@email.com", f"555-{i:07d}")
+               for i in range(count)]
+    return books, members
+
+
+def measure(build):
+    """Return bytes allocated while build() runs and its result is alive"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per record: dicts vs __slots__")
+    parser.add_argument("--count", type=int, default=1_000_000, help="records of each kind")
+    args = parser.parse_args()
+
+    book_values, member_values = make_values(args.count)
+    results = [
+        ("Book (dict)", measure(lambda: [
+            {"isbn": i, "title": t, "author": a, "genre": g,
+             "total_copies": c, "available_copies": v}
+            for i, t, a, g, c, v in book_values])),
+        ("Book (__slots__)", measure(lambda: [Book(*values) for values in book_values])),
+        ("Member (dict)", measure(lambda: [
+            {"id": i, "name": n, "email": e, "contact": c, "borrowed_books": []}
+            for i, n, e, c in member_values])),
+        ("Member (__slots__)", measure(lambda: [Member(*values) for values in member_values])),
+    ]
+
+    print(f"Records of each kind: {args.count:,}")
+    print(f"{'Layout':<20}{'Total MB':>12}{'Bytes/record':>15}")
+    for label, total in results:
+        print(f"{label:<20}{total / 1e6:>12.1f}{total / args.count:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# benchmark.py - Reproducible benchmarks for every library operation
+#
+# Usage: python benchmark.py [--sizes 10000:1000,100000:10000] [--samples 1000]
+#                            [--output results.json] [--baseline old.json]
+#
+# For each size (books:members) a synthetic catalog is generated from a
+# fixed random seed, then every operation is timed call by call. The
+# report gives ops/sec and p50/p99 latency per operation, plus peak
+# memory. Results can be saved as JSON and compared with an earlier run:
+# operations whose p50 got slower than --threshold are listed as
+# regressions and the exit status is 1.
+#
+# Large sizes (e.g. 5000000:1000000) need several GB of memory.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import library
+import operations
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+DEFAULT_SIZES = "10000:1000,100000:10000"
+WORDS = ("history", "garden", "night", "river", "secret", "stone", "winter", "empire",
+         "ocean", "shadow", "light", "journey", "city", "dream", "machine", "forest")
+SURNAMES = ("Smith", "Lee", "Garcia", "Chen", "Okafor", "Novak", "Silva", "Khan",
+            "Müller", "Rossi", "Tanaka", "Brown", "Ivanova", "Haddad", "Kim", "Weir")
+
+
+class _Discard:
+    """File-like object that throws output away (for the display functions)"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# ===== SYNTHETIC DATA =====
+
+def make_title(rng):
+    return " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 5)))
+
+
+def make_author(rng):
+    return f"{chr(rng.randint(65, 90))}. {rng.choice(SURNAMES)}"
+
+
+def load_catalog(book_count, member_count, seed=42):
+    """Replace the library contents with a synthetic catalog"""
+    rng = random.Random(seed)
+    library.reset()
+    batch = []
+    for i in range(book_count):
+        copies = rng.randint(1, 5)
+        batch.append(library.make_book(f"BENCH-{i:08d}", make_title(rng), make_author(rng),
+                                       library.VALID_GENRES[i % 3], copies))
+        if len(batch) == 10000:
+            library.add_books(batch)
+            batch = []
+    library.add_books(batch)
+    library.add_members([library.make_member(f"BM{i:08d}", f"Member {i}", f"m{i}@email.com", "0")
+                         for i in range(member_count)])
+
+
+# ===== TIMING =====
+
+def time_calls(calls):
+    """Run each zero-argument call and return the list of durations (seconds)"""
+    durations = []
+    clock = time.perf_counter
+    for call in calls:
+        start = clock()
+        call()
+        durations.append(clock() - start)
+    return durations
+
+
+def summarise(durations):
+    durations = sorted(durations)
+    total = sum(durations)
+    count = len(durations)
+    return {
+        "samples": count,
+        "ops_per_sec": round(count / total, 1) if total else None,
+        "p50_us": round(durations[count // 2] * 1e6, 2),
+        "p99_us": round(durations[min(count - 1, int(count * 0.99))] * 1e6, 2),
+    }
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far, in MB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_size(book_count, member_count, samples, seed):
+    """Time every operation on a catalog of the given size"""
+    rng = random.Random(seed)
+    load_catalog(book_count, member_count, seed)
+    isbns = [f"BENCH-{rng.randrange(book_count):08d}" for _ in range(samples)]
+    member_ids = [f"BM{i % member_count:08d}" for i in range(samples)]
+    queries = [" ".join(rng.sample(WORDS, 2)) for _ in range(samples)]
+    new_isbns = [f"NEW-{i:08d}" for i in range(samples)]
+    scan_samples = max(1, min(samples, 20))  # full scans are slow on big catalogs
+    display_samples = 1
+    results = {}
+    # Time the searches themselves: with the result cache on, repeated
+    # queries would mostly be cache hits
+    library.search_cache.max_entries = 0
+
+    results["add_book"] = time_calls(
+        [lambda i=i: library.add_book(i, "New Title", "N. Author", "Fiction", 2) for i in new_isbns])
+    results["search_books"] = time_calls(
+        [lambda q=q: library.search_books(q) for q in queries])
+    typos = [" ".join(word[:2] + word[3:] for word in q.split()) for q in queries]
+    results["search_books_fuzzy"] = time_calls(
+        [lambda q=q: library.search_books(q, mode="fuzzy") for q in typos])
+    results["search_books_substring"] = time_calls(
+        [lambda q=q: library.search_books(q, mode="substring") for q in queries[:scan_samples]])
+    results["update_book"] = time_calls(
+        [lambda i=i, q=q: library.update_book(i, title=q) for i, q in zip(new_isbns, queries)])
+    results["delete_book"] = time_calls(
+        [lambda i=i: library.delete_book(i) for i in new_isbns])
+
+    # Borrow once per member slot, then give everything back
+    borrowed = []
+
+    def borrow(member_id, isbn):
+        try:
+            library.borrow_book(member_id, isbn)
+            borrowed.append((member_id, isbn))
+        except library.LibraryError:
+            pass
+
+    results["borrow_book"] = time_calls(
+        [lambda m=m, i=i: borrow(m, i) for m, i in zip(member_ids, isbns)])
+    results["return_book"] = time_calls(
+        [lambda m=m, i=i: library.return_book(m, i) for m, i in borrowed])
+
+    stdout = sys.stdout
+    sys.stdout = _Discard()
+    try:
+        results["display_all_books"] = time_calls([operations.display_all_books] * display_samples)
+        results["display_all_members"] = time_calls([operations.display_all_members] * display_samples)
+    finally:
+        sys.stdout = stdout
+
+    return {
+        "books": book_count,
+        "members": member_count,
+        "peak_memory_mb": peak_memory_mb(),
+        "operations": {name: summarise(durations) for name, durations in results.items() if durations},
+    }
+
+
+def catalog_memory_mb(book_count, member_count, seed):
+    """Memory held by a freshly built catalog, measured with tracemalloc"""
+    library.reset()
+    tracemalloc.start()
+    load_catalog(book_count, member_count, seed)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round(current / 1e6, 1)
+
+
+# ===== REPORTING =====
+
+def print_report(run):
+    for size in run["results"]:
+        memory = size.get("catalog_memory_mb") or size["peak_memory_mb"]
+        print(f"\n=== {size['books']:,} books / {size['members']:,} members "
+              f"(memory: {memory} MB) ===")
+        print(f"{'Operation':<26}{'ops/sec':>12}{'p50 µs':>12}{'p99 µs':>12}")
+        for name, stats in size["operations"].items():
+            print(f"{name:<26}{stats['ops_per_sec'] or 0:>12,.0f}{stats['p50_us']:>12,.1f}"
+                  f"{stats['p99_us']:>12,.1f}")
+
+
+def find_regressions(run, baseline, threshold):
+    """Return (size, operation, old p50, new p50) where p50 grew by more than threshold"""
+    old_sizes = {(s["books"], s["members"]): s for s in baseline["results"]}
+    regressions = []
+    for size in run["results"]:
+        old = old_sizes.get((size["books"], size["members"]))
+        if old is None:
+            continue
+        for name, stats in size["operations"].items():
+            old_stats = old["operations"].get(name)
+            if old_stats and stats["p50_us"] > old_stats["p50_us"] * (1 + threshold):
+                regressions.append((f"{size['books']}:{size['members']}", name,
+                                    old_stats["p50_us"], stats["p50_us"]))
+    return regressions
+
+
+def parse_sizes(text):
+    sizes = []
+    for pair in text.split(","):
+        books, members = pair.split(":")
+        sizes.append((int(books), int(members)))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark library operations")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated BOOKS:MEMBERS pairs (default %(default)s)")
+    parser.add_argument("--samples", type=int, default=1000, help="calls timed per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also measure catalog memory with tracemalloc (slow)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with an earlier JSON results file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="p50 slowdown counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    run = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "samples": args.samples,
+        "seed": args.seed,
+        "results": [],
+    }
+    for book_count, member_count in parse_sizes(args.sizes):
+        result = bench_size(book_count, member_count, args.samples, args.seed)
+        if args.tracemalloc:
+            result["catalog_memory_mb"] = catalog_memory_mb(book_count, member_count, args.seed)
+        run["results"].append(result)
+    library.reset()
+
+    print_report(run)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(run, file, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(run, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) (p50 slower by > {args.threshold:.0%}):")
+            for size, name, old, new in regressions:
+                print(f"  {size} {name}: {old:,.1f} µs -> {new:,.1f} µs")
+            return 1
+        print("\n✓ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
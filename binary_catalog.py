@@ -0,0 +1,203 @@
+# binary_catalog.py - Read-only binary catalog file opened with mmap
+#
+# Usage:
+#     python binary_catalog.py build DATA_DIR catalog.bin   (from storage.py data)
+#     python binary_catalog.py get catalog.bin 978-0-7653-7698-5
+#
+#     with BinaryCatalog("catalog.bin") as catalog:
+#         book = catalog.get("978-0-7653-7698-5")
+#
+# Opening a file only maps it into memory and checks the header, so it
+# takes the same time for ten books or ten million. Pages are read from
+# disk when they are first touched, and a Book record is only built for
+# the books actually looked up.
+#
+# File layout (all integers little-endian):
+#     header   magic, version, book count, heap offset, heap size
+#     table    one fixed-size entry per book, sorted by ISBN:
+#              (offset, length) of isbn/title/author in the heap,
+#              genre code, total copies, available copies
+#     heap     the UTF-8 text of every string, back to back
+# A lookup is a binary search over the table, comparing ISBNs in the heap.
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+import library
+from records import VALID_GENRES, Book
+from storage import LOG_FILE, SNAPSHOT_FILE, Storage
+
+MAGIC = b"LIBCAT\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")  # magic, version, count, heap offset, heap size
+ENTRY = struct.Struct("<IIIIIIBxxxii")  # isbn, title, author (offset, length), genre, copies
+
+
+class CatalogFormatError(Exception):
+    """The file is not a binary catalog this version can read"""
+
+
+def write_catalog(path, books):
+    """Write books (records or dictionaries) to a binary catalog file
+
+    The file is written under a temporary name and then renamed, so
+    readers never see a half-written catalog.
+    """
+    genre_codes = {genre: code for code, genre in enumerate(VALID_GENRES)}
+    rows = sorted(books, key=lambda book: book["isbn"].encode("utf-8"))
+    heap = bytearray()
+    table = bytearray()
+
+    def put(text):
+        data = text.encode("utf-8")
+        offset = len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    for book in rows:
+        table += ENTRY.pack(*put(book["isbn"]), *put(book["title"]), *put(book["author"]),
+                            genre_codes[book["genre"]], book["total_copies"],
+                            book["available_copies"])
+    if len(heap) > 0xFFFFFFFF:
+        raise ValueError("Catalog text is larger than 4 GB")
+
+    heap_offset = HEADER.size + len(table)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(rows), heap_offset, len(heap)))
+        file.write(table)
+        file.write(heap)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+    return len(rows)
+
+
+class BinaryCatalog:
+    """A binary catalog file, mapped into memory and read on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            self._file.close()
+            raise CatalogFormatError(f"{path} is empty")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise CatalogFormatError(f"{path} is too short to be a binary catalog")
+        magic, version, self.count, self._heap, heap_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise CatalogFormatError(f"{path} is not a version {VERSION} binary catalog")
+        if self._heap + heap_size != len(self._map):
+            self.close()
+            raise CatalogFormatError(f"{path} is truncated")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ===== LOOKUPS =====
+
+    def _entry(self, row):
+        return ENTRY.unpack_from(self._map, HEADER.size + row * ENTRY.size)
+
+    def _text(self, offset, length):
+        start = self._heap + offset
+        return self._map[start:start + length]
+
+    def _find(self, isbn):
+        # Binary search of the sorted table; returns the row or -1
+        key = isbn.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            found = self._text(entry[0], entry[1])
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def _book(self, row):
+        (isbn, isbn_len, title, title_len, author, author_len,
+         genre, total, available) = self._entry(row)
+        return Book(self._text(isbn, isbn_len).decode("utf-8"),
+                    self._text(title, title_len).decode("utf-8"),
+                    self._text(author, author_len).decode("utf-8"),
+                    VALID_GENRES[genre], total, available)
+
+    def get(self, isbn, default=None):
+        """Return the Book with this ISBN, built from the file, or default"""
+        row = self._find(isbn)
+        return default if row < 0 else self._book(row)
+
+    def __contains__(self, isbn):
+        return self._find(isbn) >= 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yield every Book in ISBN order, one at a time"""
+        for row in range(self.count):
+            yield self._book(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a binary catalog file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="write the books of a data folder to a catalog file")
+    build.add_argument("data", metavar="DATA_DIR", help="folder used with --data (see storage.py)")
+    build.add_argument("output", help="catalog file to write")
+    get = commands.add_parser("get", help="look a book up by ISBN")
+    get.add_argument("catalog")
+    get.add_argument("isbn")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        # Storage.open() would create an empty data folder for a mistyped path
+        if not (os.path.exists(os.path.join(args.data, SNAPSHOT_FILE))
+                or os.path.exists(os.path.join(args.data, LOG_FILE))):
+            print(f"✗ {args.data} holds no saved library (no {SNAPSHOT_FILE} or {LOG_FILE})")
+            return 1
+        storage = Storage(args.data)
+        storage.open()
+        try:
+            count = write_catalog(args.output, library.books)
+        finally:
+            storage.close()
+        print(f"✓ Wrote {count} book(s) to {args.output}")
+        return 0
+
+    try:
+        catalog = BinaryCatalog(args.catalog)
+    except CatalogFormatError as e:
+        print(f"✗ {e}")
+        return 1
+    with catalog:
+        book = catalog.get(args.isbn)
+    if book is None:
+        print("✗ Book not found")
+        return 1
+    print(f"ISBN: {book['isbn']} | Title: {book['title']} | Author: {book['author']} | "
+          f"Genre: {book['genre']} | Available: {book['available_copies']}/{book['total_copies']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# bulk_import.py - Bulk import of books and members from CSV or JSON Lines
+#
+# Usage: python bulk_import.py books catalog.csv
+#        python bulk_import.py members members.jsonl
+#
+# Files are read as a stream, so their size is not limited by memory.
+# Every row is validated in a single pass; bad rows are reported and
+# skipped, and good rows are added to the library in batches.
+
+import csv
+import json
+import os
+import sys
+from operator import itemgetter
+
+import library
+
+BOOK_FIELDS = ("isbn", "title", "author", "genre", "total_copies")
+MEMBER_FIELDS = ("id", "name", "email", "contact")
+_book_fields = itemgetter(*BOOK_FIELDS)
+_member_fields = itemgetter(*MEMBER_FIELDS)
+DEFAULT_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000  # Row errors kept in the report (all are counted)
+
+
+class ImportReport:
+    """Outcome of a bulk import"""
+
+    def __init__(self):
+        self.added = 0
+        self.failed = 0
+        self.errors = []  # (row number, message), up to MAX_REPORTED_ERRORS
+
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    def __repr__(self):
+        return f"ImportReport(added={self.added}, failed={self.failed})"
+
+
+# ===== READING =====
+
+def detect_format(path):
+    """Guess "csv" or "jsonl" from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass fmt='csv' or fmt='jsonl'")
+
+
+def read_rows(file, fmt):
+    """Yield (row number, record) pairs from an open CSV or JSONL file
+
+    Rows that cannot be parsed are yielded with a None record so the
+    caller can report them. Row numbers count data rows from 1.
+    """
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(file), 1):
+            yield row_number, row
+    elif fmt == "jsonl":
+        row_number = 0
+        for line in file:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield row_number, record if isinstance(record, dict) else None
+    else:
+        raise ValueError("Format must be 'csv' or 'jsonl'")
+
+
+# ===== VALIDATION =====
+
+def _book_from_row(row, seen, genres):
+    """Return a book record built from a row, or an error message"""
+    try:
+        isbn, title, author, genre, total = _book_fields(row)
+    except KeyError as e:
+        return f"Missing field {e.args[0]}"
+    isbn = str(isbn).strip()
+    if not isbn:
+        return "Missing ISBN"
+    if isbn in seen or library.books.has_key(isbn):
+        return f"ISBN already exists: {isbn}"
+    if genre not in genres:
+        return f"Genre must be one of {library.VALID_GENRES}"
+    try:
+        total = int(total)
+        available = row.get("available_copies")
+        available = total if available in (None, "") else int(available)
+    except (TypeError, ValueError):
+        return "Total copies must be a number"
+    if not 0 <= available <= total:
+        return "Available copies must be between 0 and total copies"
+
+    seen.add(isbn)
+    return library.make_book(isbn, title, author, genre, total, available)
+
+
+def _member_from_row(row, seen):
+    """Return a member record built from a row, or an error message"""
+    try:
+        member_id, name, email, contact = _member_fields(row)
+    except KeyError as e:
+        return f"Missing field {e.args[0]}"
+    member_id = str(member_id).strip()
+    if not member_id:
+        return "Missing member ID"
+    if member_id in seen or library.members.has_key(member_id):
+        return f"Member ID already exists: {member_id}"
+
+    seen.add(member_id)
+    return library.make_member(member_id, name, email, contact)
+
+
+# ===== IMPORT =====
+
+def _run_import(rows, build, add_batch, batch_size):
+    report = ImportReport()
+    batch = []
+    for row_number, row in rows:
+        record = build(row) if row is not None else "Row could not be parsed"
+        if isinstance(record, str):
+            report.add_error(row_number, record)
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            add_batch(batch)
+            report.added += len(batch)
+            batch = []
+    if batch:
+        add_batch(batch)
+        report.added += len(batch)
+    return report
+
+
+def import_books(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Load books from a CSV or JSONL file and return an ImportReport"""
+    fmt = fmt or detect_format(path)
+    seen = set()
+    genres = frozenset(library.VALID_GENRES)
+    with open(path, newline="", encoding="utf-8") as file:
+        return _run_import(read_rows(file, fmt),
+                           lambda row: _book_from_row(row, seen, genres),
+                           library.add_books, batch_size)
+
+
+def import_members(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Load members from a CSV or JSONL file and return an ImportReport"""
+    fmt = fmt or detect_format(path)
+    seen = set()
+    with open(path, newline="", encoding="utf-8") as file:
+        return _run_import(read_rows(file, fmt),
+                           lambda row: _member_from_row(row, seen),
+                           library.add_members, batch_size)
+
+
+# ===== COMMAND LINE =====
+
+def main(argv):
+    if len(argv) != 3 or argv[1] not in ("books", "members"):
+        print("Usage: python bulk_import.py books|members FILE")
+        return 2
+
+    importer = import_books if argv[1] == "books" else import_members
+    report = importer(argv[2])
+    print(f"✓ Imported {report.added} {argv[1]}")
+    if report.failed:
+        print(f"✗ {report.failed} row(s) rejected:")
+        for row, message in report.errors:
+            print(f"  Row {row}: {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
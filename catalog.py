@@ -0,0 +1,150 @@
+# catalog.py - Hash-indexed record store for books and members
+
+from itertools import islice
+
+
+class CatalogStore:
+    """Ordered collection of records with O(1) lookup by a key field
+
+    Records are kept in a dictionary keyed by `key_field` (e.g. "isbn" for
+    books, "id" for members). Python dictionaries remember insertion order,
+    so iterating the store gives the same order the old plain list did,
+    while get/insert/delete by key no longer scan every record.
+
+    The store also supports the list operations demo.py and tests.py rely
+    on (append, remove, pop, clear, indexing, len, iteration). If a
+    record_type is given (see records.py), plain dictionaries added to the
+    store are converted to that type.
+
+    Indexes built on top of the store register a callback with watch(); it
+    is called as callback(action, record, previous) where action is
+    "insert", "delete", "update" or "clear" and previous holds the old
+    values of the fields changed by update().
+    """
+
+    def __init__(self, key_field, record_type=None):
+        self.key_field = key_field
+        self.record_type = record_type
+        self._records = {}  # key -> record, in insertion order
+        self._watchers = []  # callbacks notified on every change
+
+    # ===== CHANGE NOTIFICATION =====
+
+    def watch(self, callback):
+        """Register a callback that is told about every change"""
+        self._watchers.append(callback)
+
+    def unwatch(self, callback):
+        """Stop notifying a previously registered callback"""
+        self._watchers.remove(callback)
+
+    def _notify(self, action, record, previous=None):
+        for callback in self._watchers:
+            callback(action, record, previous)
+
+    # ===== KEY OPERATIONS =====
+
+    def get(self, key, default=None):
+        """Return the record with this key, or default if missing"""
+        return self._records.get(key, default)
+
+    def has_key(self, key):
+        """Check whether a record with this key exists"""
+        return key in self._records
+
+    def keys(self):
+        """Return a view of all keys in insertion order"""
+        return self._records.keys()
+
+    def insert(self, record):
+        """Add a record; raises ValueError if its key is already taken"""
+        if self.record_type is not None and type(record) is not self.record_type:
+            record = self.record_type.from_dict(record)
+        key = record[self.key_field]
+        if key in self._records:
+            raise ValueError(f"Duplicate {self.key_field}: {key}")
+        self._records[key] = record
+        self._notify("insert", record)
+        return record
+
+    def delete(self, key):
+        """Remove and return the record with this key; raises KeyError if missing"""
+        record = self._records.pop(key)
+        self._notify("delete", record)
+        return record
+
+    def update(self, key, **changes):
+        """Change fields of the record with this key and notify watchers
+
+        Fields should be changed through here (not by assigning to the
+        record directly) so that indexes watching the store stay correct.
+        The key field itself cannot be changed.
+        """
+        record = self._records[key]
+        if self.key_field in changes:
+            raise ValueError(f"Cannot change {self.key_field} of an existing record")
+        previous = {}
+        for field, value in changes.items():
+            previous[field] = record[field]
+            record[field] = value
+        self._notify("update", record, previous)
+        return record
+
+    # ===== LIST COMPATIBILITY =====
+
+    def append(self, record):
+        """Add a record at the end (same as insert)"""
+        self.insert(record)
+
+    def extend(self, records):
+        """Add several records in order"""
+        for record in records:
+            self.insert(record)
+
+    def remove(self, record):
+        """Remove a record; raises ValueError if it is not in the store"""
+        key = record[self.key_field]
+        if self._records.get(key) != record:
+            raise ValueError(f"{self.key_field} {key} not in store")
+        self.delete(key)
+
+    def pop(self, index=-1):
+        """Remove and return the record at a position (default: last)"""
+        if not self._records:
+            raise IndexError("pop from empty store")
+        if index == -1:
+            record = self._records.popitem()[1]
+            self._notify("delete", record)
+            return record
+        record = self[index]
+        return self.delete(record[self.key_field])
+
+    def clear(self):
+        """Remove every record"""
+        self._records.clear()
+        self._notify("clear", None)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __contains__(self, record):
+        key = record[self.key_field]
+        return self._records.get(key) == record
+
+    def __getitem__(self, index):
+        # Positional access walks the dictionary, so it is O(n); use get()
+        # for lookups and keep positions for small scripts and tests
+        if isinstance(index, slice):
+            return list(self._records.values())[index]
+        size = len(self._records)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("store index out of range")
+        return next(islice(self._records.values(), index, None))
+
+    def __repr__(self):
+        return f"CatalogStore({self.key_field!r}, {list(self._records.values())!r})"
@@ -0,0 +1,159 @@
+# columnar.py - Column-oriented copy of the catalog for fast reports
+#
+# Usage:
+#     snapshot = ColumnarCatalog.from_library()
+#     snapshot.availability_by_genre()
+#     snapshot.utilization_by_genre()
+#     snapshot.most_borrowed(10)
+#
+# The books are copied into one array per field (array module, or NumPy
+# arrays when NumPy is installed). Genres and authors are dictionary
+# encoded: each column holds a small integer code and the names are
+# stored once. Rows are grouped by genre, so a genre is one contiguous
+# slice of every column. Aggregations then run over whole columns inside
+# C loops (NumPy, or builtins such as sum over a slice) instead of
+# looking at one record dictionary at a time in Python.
+#
+# The snapshot does not follow later changes; build a new one to refresh.
+
+from array import array
+from heapq import nlargest
+
+import library
+from records import VALID_GENRES
+
+try:
+    import numpy
+except ImportError:  # optional; the array module is used instead
+    numpy = None
+
+
+class ColumnarCatalog:
+    """Books (and member loan counts) as parallel columns"""
+
+    def __init__(self, isbns, titles, genre_codes, genre_starts, author_codes, authors,
+                 total_copies, available_copies, borrow_counts, member_loans):
+        self.isbns = isbns  # list of str, row order
+        self.titles = titles
+        self.genres = VALID_GENRES  # genre code -> name
+        self.genre_starts = genre_starts  # rows of genre code c are [starts[c], starts[c + 1])
+        self.authors = authors  # author code -> name
+        self.genre_codes = genre_codes
+        self.author_codes = author_codes
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+        self.borrow_counts = borrow_counts  # times each book has been lent
+        self.member_loans = member_loans  # books held, per member
+        if numpy is not None:
+            self._np = {name: numpy.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                        for name in ("genre_codes", "author_codes", "total_copies",
+                                     "available_copies", "borrow_counts", "member_loans")}
+        else:
+            self._np = None
+
+    @classmethod
+    def from_library(cls):
+        """Copy the current books and members of library.py into columns"""
+        by_genre = {genre: [] for genre in VALID_GENRES}
+        for book in library.books:
+            by_genre[book["genre"]].append(book)
+        author_code = {}
+        isbns = []
+        titles = []
+        genre_codes = array("B")
+        author_codes = array("I")
+        total_copies = array("l")
+        available_copies = array("l")
+        borrow_counts = array("l")
+        genre_starts = [0]
+        counts = library.borrow_counts
+        for code, genre in enumerate(VALID_GENRES):
+            for book in by_genre[genre]:
+                isbns.append(book["isbn"])
+                titles.append(book["title"])
+                author_codes.append(author_code.setdefault(book["author"], len(author_code)))
+                total_copies.append(book["total_copies"])
+                available_copies.append(book["available_copies"])
+                borrow_counts.append(counts.get(book["isbn"], 0))
+            genre_codes.extend([code] * len(by_genre[genre]))
+            genre_starts.append(len(isbns))
+        member_loans = array("l", (len(member["borrowed_books"]) for member in library.members))
+        return cls(isbns, titles, genre_codes, genre_starts, author_codes, list(author_code),
+                   total_copies, available_copies, borrow_counts, member_loans)
+
+    def __len__(self):
+        return len(self.isbns)
+
+    # ===== AGGREGATIONS =====
+
+    def _genre_slices(self):
+        starts = self.genre_starts
+        return [slice(starts[code], starts[code + 1]) for code in range(len(self.genres))]
+
+    def _sum_by_genre(self, column):
+        # Total of a column for each genre code
+        if self._np is not None:
+            values = self._np[column]
+            return [int(values[rows].sum()) for rows in self._genre_slices()]
+        values = memoryview(getattr(self, column))
+        return [sum(values[rows]) for rows in self._genre_slices()]
+
+    def _count_by_genre(self):
+        starts = self.genre_starts
+        return [starts[code + 1] - starts[code] for code in range(len(self.genres))]
+
+    def availability_by_genre(self):
+        """Return {genre: {"titles", "total_copies", "available_copies"}}"""
+        titles = self._count_by_genre()
+        total = self._sum_by_genre("total_copies")
+        available = self._sum_by_genre("available_copies")
+        return {genre: {"titles": titles[code], "total_copies": total[code],
+                        "available_copies": available[code]}
+                for code, genre in enumerate(self.genres)}
+
+    def utilization(self):
+        """Share of all copies currently lent out (0.0 to 1.0)"""
+        if self._np is not None:
+            total = int(self._np["total_copies"].sum())
+            available = int(self._np["available_copies"].sum())
+        else:
+            total = sum(self.total_copies)
+            available = sum(self.available_copies)
+        return (total - available) / total if total else 0.0
+
+    def utilization_by_genre(self):
+        """Return {genre: share of that genre's copies lent out}"""
+        total = self._sum_by_genre("total_copies")
+        available = self._sum_by_genre("available_copies")
+        return {genre: (total[code] - available[code]) / total[code] if total[code] else 0.0
+                for code, genre in enumerate(self.genres)}
+
+    def most_borrowed(self, count=10):
+        """Return the `count` most-lent books as (ISBN, title, times lent), most first"""
+        if self._np is not None:
+            counts = self._np["borrow_counts"]
+            count = min(count, len(counts))
+            if not count:
+                return []
+            rows = numpy.argpartition(-counts, count - 1)[:count]
+            rows = sorted(rows.tolist(), key=lambda row: (-int(counts[row]), row))
+        else:
+            rows = nlargest(count, range(len(self.borrow_counts)), key=self.borrow_counts.__getitem__)
+        return [(self.isbns[row], self.titles[row], self.borrow_counts[row]) for row in rows]
+
+    def titles_by_author(self, count=10):
+        """Return the `count` authors with the most titles, as (author, titles)"""
+        if self._np is not None:
+            per_author = numpy.bincount(self._np["author_codes"], minlength=len(self.authors)).tolist()
+        else:
+            per_author = [0] * len(self.authors)
+            for code in self.author_codes:
+                per_author[code] += 1
+        top = nlargest(count, range(len(per_author)), key=per_author.__getitem__)
+        return [(self.authors[code], per_author[code]) for code in top]
+
+    def members_at_limit(self):
+        """Return how many members hold the most books allowed"""
+        if self._np is not None:
+            return int((self._np["member_loans"] >= library.MAX_BORROWED).sum())
+        return sum(map(library.MAX_BORROWED.__le__, self.member_loans))
@@ -1,6 +1,7 @@
 # demo.py - Library Management System Demo Script
 
 # Import the data structures and helper functions
+import library
 import operations
 
 print("=" * 60)
@@ -126,37 +127,34 @@ for book in results:
 print("\n4. BORROWING BOOKS")
 print("-" * 40)
 
+# Borrowing and returning go through library.py so copy counts, loans and
+# the indexes built on them stay in step
 # John borrows Harry Potter 1
 member = operations.members[0]  # M001
 book = operations.books[0]  # Harry Potter 1
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}'")
 
 # John borrows Harry Potter 2
 book = operations.books[1]  # Harry Potter 2
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}'")
 
 # Jane borrows To Kill a Mockingbird
 member = operations.members[1]  # M002
 book = operations.books[2]
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}'")
 
 # Jane borrows Brief History
 book = operations.books[3]
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}'")
 
 # Alice borrows The Martian
 member = operations.members[2]  # M003
 book = operations.books[4]
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}'")
 
 # Display updated books status
@@ -169,8 +167,7 @@ print("-" * 40)
 # John tries to borrow 3rd book (The Martian)
 member = operations.members[0]  # M001
 book = operations.books[4]  # The Martian
-member["borrowed_books"].append(book["isbn"])
-book["available_copies"] -= 1
+library.borrow_book(member["id"], book["isbn"])
 print(f"✓ {member['name']} borrowed '{book['title']}' (3rd book)")
 
 # John tries to borrow 4th book (should fail)
@@ -189,8 +186,7 @@ for b in operations.books:
     if b["isbn"] == isbn:
         book = b
         break
-member["borrowed_books"].remove(isbn)
-book["available_copies"] += 1
+library.return_book(member["id"], isbn)
 print(f"✓ {member['name']} returned '{book['title']}'")
 
 # Jane returns Brief History
@@ -201,8 +197,7 @@ for b in operations.books:
     if b["isbn"] == isbn:
         book = b
         break
-member["borrowed_books"].remove(isbn)
-book["available_copies"] += 1
+library.return_book(member["id"], isbn)
 print(f"✓ {member['name']} returned '{book['title']}'")
 
 # Display updated books status
@@ -213,18 +208,12 @@ print("\n7. UPDATING BOOK INFORMATION")
 print("-" * 40)
 
 # Update Harry Potter total copies
-for book in operations.books:
-    if book["isbn"] == "978-0-7475-3269-9":
-        book["total_copies"] = 6
-        print(f"✓ Updated '{book['title']}' - total copies now 6")
-        break
+book = library.update_book("978-0-7475-3269-9", total_copies=6)
+print(f"✓ Updated '{book['title']}' - total copies now 6")
 
 # Update Stephen Hawking's name
-for book in operations.books:
-    if book["isbn"] == "978-0-553-29337-9":
-        book["author"] = "Stephen W. Hawking"
-        print(f"✓ Updated author name to '{book['author']}'")
-        break
+book = library.update_book("978-0-553-29337-9", author="Stephen W. Hawking")
+print(f"✓ Updated author name to '{book['author']}'")
 
 # Display updated books
 operations.display_all_books()
@@ -233,12 +222,8 @@ operations.display_all_books()
 print("\n8. UPDATING MEMBER INFORMATION")
 print("-" * 40)
 
-for member in operations.members:
-    if member["id"] == "M001":
-        member["email"] = "john.newemail@email.com"
-        member["contact"] = "111-222-3333"
-        print(f"✓ Updated {member['name']}'s contact information")
-        break
+member = library.update_member("M001", email="john.newemail@email.com", contact="111-222-3333")
+print(f"✓ Updated {member['name']}'s contact information")
 
 # Display updated members
 operations.display_all_members()
@@ -267,8 +252,7 @@ while len(member["borrowed_books"]) > 0:
     isbn = member["borrowed_books"][0]
     for book in operations.books:
         if book["isbn"] == isbn:
-            member["borrowed_books"].remove(isbn)
-            book["available_copies"] += 1
+            library.return_book(member["id"], isbn)
             print(f"✓ {member['name']} returned '{book['title']}'")
             break
 
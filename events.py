@@ -0,0 +1,219 @@
+# events.py - Change events for every library mutation
+#
+# Usage:
+#     bus = EventBus()
+#     bus.attach()                          # start receiving library changes
+#     bus.subscribe(print)                  # called with each event
+#     sink = JsonlSink("events.jsonl")
+#     bus.subscribe(sink.write)
+#     ...
+#     bus.since(last_seen_seq)              # catch up after a pause
+#
+# Every change made through library.py (and so through the menu in
+# operations.py, the server and batch imports) is reported to
+# library.mutation_listeners. The bus turns each one into a typed event
+# (BookAdded, BookBorrowed, ...) with a sequence number and a time, keeps
+# the latest ones in a ring buffer and hands them to its subscribers.
+
+import json
+import threading
+import time
+from collections import namedtuple
+
+import library
+
+RING_SIZE = 10000  # Events kept for consumers to catch up from
+
+
+def _event_type(name, op, fields):
+    base = namedtuple(name, "seq at " + fields)
+    # The mutation name travels with the type so events can be mapped back
+    return type(name, (base,), {"__slots__": (), "op": op})
+
+
+BookAdded = _event_type("BookAdded", "add_book", "isbn title author genre total_copies")
+BooksAdded = _event_type("BooksAdded", "add_books", "records")
+BookUpdated = _event_type("BookUpdated", "update_book", "isbn changes")
+BookDeleted = _event_type("BookDeleted", "delete_book", "isbn")
+MemberAdded = _event_type("MemberAdded", "add_member", "member_id name email contact")
+MembersAdded = _event_type("MembersAdded", "add_members", "records")
+MemberUpdated = _event_type("MemberUpdated", "update_member", "member_id changes")
+MemberDeleted = _event_type("MemberDeleted", "delete_member", "member_id")
+BookBorrowed = _event_type("BookBorrowed", "borrow_book", "member_id isbn")
+BookReturned = _event_type("BookReturned", "return_book", "member_id isbn")
+HoldPlaced = _event_type("HoldPlaced", "place_hold", "member_id isbn")
+HoldCancelled = _event_type("HoldCancelled", "cancel_hold", "member_id isbn")
+
+EVENT_TYPES = {event_type.op: event_type for event_type in (
+    BookAdded, BooksAdded, BookUpdated, BookDeleted, MemberAdded, MembersAdded,
+    MemberUpdated, MemberDeleted, BookBorrowed, BookReturned, HoldPlaced, HoldCancelled,
+)}
+_KEYS = {"update_book": "isbn", "update_member": "member_id"}  # the rest are changes
+
+
+def _copy_record(record):
+    # A plain dictionary that later changes to the record cannot reach
+    copied = dict(record)
+    if "borrowed_books" in copied:
+        copied["borrowed_books"] = list(copied["borrowed_books"])
+    return copied
+
+
+def make_event(seq, op, data):
+    """Build the typed event for a mutation reported as (op, data)"""
+    at = data.get("now") or time.time()
+    if op in _KEYS:
+        key = _KEYS[op]
+        changes = {field: value for field, value in data.items() if field != key}
+        return EVENT_TYPES[op](seq, at, data[key], changes)
+    if op in ("add_books", "add_members"):
+        # Copy the records: they keep changing after the event is made
+        return EVENT_TYPES[op](seq, at, [_copy_record(record) for record in data["records"]])
+    event_type = EVENT_TYPES[op]
+    return event_type(seq, at, *(data[field] for field in event_type._fields[2:]))
+
+
+def event_to_dict(event):
+    """Return an event as a JSON-ready dictionary, with its type and mutation name"""
+    return {"type": type(event).__name__, "op": event.op, **event._asdict()}
+
+
+class EventsLost(Exception):
+    """The events asked for have already left the ring buffer"""
+
+
+class EventBus:
+    """Sequence-numbered stream of library change events
+
+    The newest `capacity` events are kept in a ring buffer, so a consumer
+    that remembers the last sequence number it handled can resume with
+    since(). Subscribers are called with each event as it happens, in
+    sequence order, while the bus lock is held, so they should be quick
+    (e.g. JsonlSink only buffers the line).
+    """
+
+    def __init__(self, capacity=RING_SIZE, last_seq=0):
+        self.capacity = capacity
+        self._ring = [None] * capacity  # event with sequence number n is at n % capacity
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.last_seq = last_seq  # e.g. continue the numbering of an existing JSONL file
+        self._start_seq = last_seq + 1
+
+    def attach(self):
+        """Start turning library mutations into events"""
+        if self._on_mutation not in library.mutation_listeners:
+            library.mutation_listeners.append(self._on_mutation)
+
+    def detach(self):
+        """Stop receiving library mutations"""
+        if self._on_mutation in library.mutation_listeners:
+            library.mutation_listeners.remove(self._on_mutation)
+
+    def subscribe(self, callback):
+        """Call callback(event) for every new event"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _on_mutation(self, op, data):
+        with self._lock:
+            self._publish(make_event(self.last_seq + 1, op, data))
+
+    def _publish(self, event):
+        # Caller holds self._lock
+        self.last_seq = event.seq
+        self._ring[event.seq % self.capacity] = event
+        for callback in self._subscribers:
+            callback(event)
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest event still buffered"""
+        return max(self._start_seq, self.last_seq - self.capacity + 1)
+
+    def since(self, seq, limit=None):
+        """Return buffered events after sequence number `seq`, oldest first
+
+        Raises EventsLost if some of those events were already dropped
+        from the ring buffer; the consumer then needs a full resync.
+        """
+        with self._lock:
+            if seq + 1 < self.first_seq:
+                raise EventsLost(f"Events after {seq} are gone; oldest kept is {self.first_seq}")
+            end = self.last_seq if limit is None else min(self.last_seq, seq + limit)
+            return [self._ring[n % self.capacity] for n in range(seq + 1, end + 1)]
+
+
+class JsonlSink:
+    """Subscriber that appends events to a JSON Lines file in batches
+
+    Each event is serialised as it arrives and written with others once
+    `batch_size` lines are waiting or every `interval` seconds.
+    """
+
+    def __init__(self, path, batch_size=256, interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def write(self, event):
+        """Queue one event (use as a bus subscriber)"""
+        line = json.dumps(event_to_dict(event), separators=(",", ":")) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def _write_buffer(self):
+        # Caller holds self._lock
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self._buffer.clear()
+
+    def flush(self):
+        """Write every queued event now"""
+        with self._lock:
+            self._write_buffer()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """Write what is queued and close the file"""
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        self._file.close()
+
+
+def last_event_seq(path):
+    """Return the sequence number of the last event in a JSONL file (0 if none)"""
+    last = 0
+    try:
+        for event in read_events(path):
+            last = event["seq"]
+    except FileNotFoundError:
+        pass
+    return last
+
+
+def read_events(path, after_seq=0):
+    """Yield the event dictionaries in a JSONL file with seq > after_seq"""
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                break  # a line still being written
+            if event["seq"] > after_seq:
+                yield event
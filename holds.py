@@ -0,0 +1,143 @@
+# holds.py - Per-book FIFO hold (reservation) queues
+
+import time
+from collections import deque
+
+HOLD_DAYS = 7  # How long a hold waits for a copy before it expires
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class Hold:
+    """A member waiting for a copy of a book"""
+
+    __slots__ = ("member_id", "isbn", "placed_at", "expires_at")
+
+    def __init__(self, member_id, isbn, placed_at, expires_at):
+        self.member_id = member_id
+        self.isbn = isbn
+        self.placed_at = placed_at  # seconds since the epoch, like time.time()
+        self.expires_at = expires_at
+
+    def is_expired(self, now):
+        return self.expires_at <= now
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"Hold(member={self.member_id!r}, isbn={self.isbn!r}, expires_at={self.expires_at})"
+
+
+class HoldQueues:
+    """One first-in, first-out queue of holds per ISBN
+
+    Queues are deques, so adding a hold and taking the head are O(1).
+    Expired holds are skipped when the head is looked at and dropped when
+    it is taken. Callers (library.py) serialise changes to a book's queue
+    with the book's circulation lock.
+    """
+
+    def __init__(self, hold_days=HOLD_DAYS):
+        self.hold_days = hold_days
+        self.clear()
+
+    def clear(self):
+        """Forget every hold"""
+        self.queues = {}  # ISBN -> deque of Hold, oldest first
+        self._waiting = {}  # (member ID, ISBN) -> Hold, for duplicate checks
+
+    def place(self, member_id, isbn, now=None):
+        """Add a hold at the back of the book's queue and return it"""
+        now = time.time() if now is None else now
+        hold = Hold(member_id, isbn, now, now + self.hold_days * SECONDS_PER_DAY)
+        self._add(hold)
+        return hold
+
+    def _add(self, hold):
+        self.queues.setdefault(hold.isbn, deque()).append(hold)
+        self._waiting[(hold.member_id, hold.isbn)] = hold
+
+    def has_hold(self, member_id, isbn, now=None):
+        """Check whether the member has a live (unexpired) hold on the book"""
+        now = time.time() if now is None else now
+        hold = self._waiting.get((member_id, isbn))
+        return hold is not None and not hold.is_expired(now)
+
+    def peek(self, isbn, now=None):
+        """Return the first hold on the book that has not expired, or None"""
+        now = time.time() if now is None else now
+        for hold in self.queues.get(isbn, ()):
+            if not hold.is_expired(now) and self._waiting.get((hold.member_id, isbn)) is hold:
+                return hold
+        return None
+
+    def pop(self, isbn, now=None):
+        """Remove and return the first live hold on the book, dropping expired ones"""
+        now = time.time() if now is None else now
+        queue = self.queues.get(isbn)
+        while queue:
+            hold = queue.popleft()
+            key = (hold.member_id, isbn)
+            if self._waiting.get(key) is not hold:
+                continue  # cancelled earlier
+            del self._waiting[key]
+            if not hold.is_expired(now):
+                self._tidy(isbn)
+                return hold
+        self._tidy(isbn)
+        return None
+
+    def cancel(self, member_id, isbn):
+        """Cancel a member's hold; returns False if there was none
+
+        The entry stays in the deque and is skipped later, so cancelling
+        is O(1) too.
+        """
+        hold = self._waiting.pop((member_id, isbn), None)
+        if hold is None:
+            return False
+        self._tidy(isbn)
+        return True
+
+    def _tidy(self, isbn):
+        # Drop cancelled entries from the front so the head is a live hold
+        queue = self.queues.get(isbn)
+        if queue is None:
+            return
+        while queue and self._waiting.get((queue[0].member_id, isbn)) is not queue[0]:
+            queue.popleft()
+        if not queue:
+            del self.queues[isbn]
+
+    def position(self, member_id, isbn, now=None):
+        """Return the member's 1-based place in the book's queue, or None"""
+        now = time.time() if now is None else now
+        mine = self._waiting.get((member_id, isbn))
+        if mine is None or mine.is_expired(now):
+            return None
+        place = 0
+        for hold in self.queues.get(isbn, ()):
+            if self._waiting.get((hold.member_id, isbn)) is hold and not hold.is_expired(now):
+                place += 1
+            if hold is mine:
+                return place
+        return None
+
+    def queue_length(self, isbn, now=None):
+        """Return how many live holds the book has"""
+        now = time.time() if now is None else now
+        return sum(1 for hold in self.queues.get(isbn, ())
+                   if self._waiting.get((hold.member_id, isbn)) is hold and not hold.is_expired(now))
+
+    # ===== SAVING AND LOADING =====
+
+    def to_list(self):
+        """Return the waiting holds as dictionaries, in queue order (for snapshots)"""
+        return [hold.to_dict() for queue in self.queues.values() for hold in queue
+                if self._waiting.get((hold.member_id, hold.isbn)) is hold]
+
+    def restore(self, hold_dicts):
+        """Replace every hold with the given dictionaries (from to_list)"""
+        self.clear()
+        for data in hold_dicts:
+            self._add(Hold(**data))
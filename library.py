@@ -0,0 +1,751 @@
+# library.py - Library Management System Service API
+#
+# Pure functions over the book and member stores. Nothing here reads input
+# or prints; every function either returns its result or raises one of the
+# LibraryError subclasses below. operations.py builds the interactive menu
+# on top of these functions.
+
+import time
+from itertools import islice
+
+from catalog import CatalogStore
+from holds import HoldQueues
+from loans import LoanRegistry, OverdueSweeper
+from locking import StripedLocks
+from query_cache import QueryCache, cache_key
+from records import VALID_GENRES, Book, Member
+from search_index import FUZZY_LIMIT, SearchIndex
+from secondary_index import BorrowerIndex, GenreAuthorIndex, SortedOrder, StoreOrder
+
+# Data Structures
+books = CatalogStore("isbn", Book)  # Book records indexed by ISBN
+members = CatalogStore("id", Member)  # Member records indexed by member ID
+SEARCH_MODES = ("index", "substring", "fuzzy")  # Tuple of supported search modes
+BOOK_SORT_KEYS = ("title", "author", "genre", "availability")  # Tuple of book listing orders
+MEMBER_SORT_KEYS = ("id", "name")  # Tuple of member listing orders
+MAX_BORROWED = 3  # Most books a member may hold at once
+
+# Token index over titles and authors, kept in sync with books
+search_index = SearchIndex()
+books.watch(search_index.on_change)
+
+# Genre and author indexes with running copy counts per genre
+genre_author_index = GenreAuthorIndex()
+books.watch(genre_author_index.on_change)
+
+# Who currently holds each ISBN, kept in step with borrow/return
+borrowers = BorrowerIndex()
+members.watch(borrowers.on_change)
+
+# Recent search results, dropped when a matching book changes
+search_cache = QueryCache()
+books.watch(search_cache.on_change)
+
+# Locks keyed by ISBN and member ID; every change holds the locks of the
+# book and member it touches while it changes them and reports it, so
+# concurrent callers (e.g. several circulation desks on worker threads)
+# cannot oversell copies, and storage.py can snapshot between changes
+circulation_locks = StripedLocks()
+
+# Loan records (who borrowed what, when, and when it is due)
+loans = LoanRegistry()
+
+# ISBN -> how many times the book has been lent, for reports
+borrow_counts = {}
+
+# Hold queues of members waiting for a copy, per ISBN; a book's queue is
+# only changed while holding that book's circulation lock
+holds = HoldQueues()
+
+# Callbacks told about every successful change, as callback(op, data);
+# used by storage.py to log mutations
+mutation_listeners = []
+
+
+# ===== ERRORS =====
+
+class LibraryError(Exception):
+    """Base class for all library operation errors
+
+    `reason` is the message without details of this particular request
+    (IDs, positions), so it can label metrics; str(error) has both.
+    """
+
+    def __init__(self, reason, detail=None):
+        super().__init__(f"{reason} ({detail})" if detail else reason)
+        self.reason = reason
+
+
+class NotFoundError(LibraryError):
+    """A book or member does not exist"""
+
+
+class DuplicateError(LibraryError):
+    """An ISBN or member ID is already taken"""
+
+
+class ValidationError(LibraryError):
+    """A field value is not allowed"""
+
+
+class ConflictError(LibraryError):
+    """The request clashes with current loans"""
+
+
+class BorrowLimitError(LibraryError):
+    """The member already holds the maximum number of books"""
+
+
+class UnavailableError(LibraryError):
+    """No copies of the book are available"""
+
+
+class BatchError(LibraryError):
+    """One operation of a batch failed, so none of the batch was applied"""
+
+    def __init__(self, index, error):
+        super().__init__(f"Operation {index + 1}: {error}")
+        self.reason = error.reason  # the failing operation's, without its position
+        self.index = index  # position of the failing operation in the batch
+        self.error = error  # the LibraryError that operation would raise
+
+
+# ===== MUTATION LOG =====
+
+def _record(op, **data):
+    """Tell every mutation listener about a change that just happened"""
+    for listener in mutation_listeners:
+        listener(op, data)
+
+
+def apply_mutation(op, data):
+    """Repeat a change recorded by _record (used to replay logs)"""
+    if op not in MUTATIONS:
+        raise ValidationError(f"Unknown mutation: {op}")
+    return MUTATIONS[op](**data)
+
+
+def reset():
+    """Remove every book and member (not logged; used by tests and benchmarks)"""
+    books.clear()
+    members.clear()
+    loans.clear()
+    holds.clear()
+    borrow_counts.clear()
+
+
+def export_state():
+    """Return the whole library state as a dictionary (records not copied)
+
+    Used for snapshots (storage.py) and to start replicas (replication.py);
+    restore_state() loads it back.
+    """
+    return {
+        "books": list(books),
+        "members": list(members),
+        "loans": loans.to_list(),
+        "holds": holds.to_list(),
+        "borrow_counts": dict(borrow_counts),
+    }
+
+
+def restore_state(state):
+    """Replace the library state with one from export_state (not logged)"""
+    reset()
+    books.extend(state["books"])
+    members.extend(state["members"])
+    loans.restore(state.get("loans", []))
+    holds.restore(state.get("holds", []))
+    borrow_counts.update(state.get("borrow_counts", {}))
+
+
+# ===== VALIDATION HELPERS =====
+
+def check_genre(genre):
+    """Return the genre if it is one of VALID_GENRES"""
+    if genre not in VALID_GENRES:
+        raise ValidationError(f"Genre must be one of {VALID_GENRES}")
+    return genre
+
+
+def check_copies(total_copies):
+    """Return the number of copies as an int"""
+    try:
+        return int(total_copies)
+    except (TypeError, ValueError):
+        raise ValidationError("Total copies must be a number") from None
+
+
+# ===== BOOK OPERATIONS =====
+
+def get_book(isbn):
+    """Return the book with this ISBN"""
+    book = books.get(isbn)
+    if book is None:
+        raise NotFoundError("Book not found")
+    return book
+
+
+def make_book(isbn, title, author, genre, total_copies, available_copies=None):
+    """Build a book record without validating or storing it"""
+    return Book(isbn, title, author, genre, total_copies, available_copies)
+
+
+def add_book(isbn, title, author, genre, total_copies):
+    """Add a new book and return it"""
+    check_genre(genre)
+    total_copies = check_copies(total_copies)
+    with circulation_locks.hold(isbn):
+        if books.has_key(isbn):
+            raise DuplicateError("ISBN already exists")
+        book = books.insert(make_book(isbn, title, author, genre, total_copies))
+        _record("add_book", isbn=isbn, title=title, author=author, genre=genre,
+                total_copies=total_copies)
+    return book
+
+
+def add_books(records):
+    """Add already validated book records in one batch (see bulk_import.py)"""
+    with circulation_locks.hold_all(), search_cache.bulk_change():
+        books.extend(records)
+        _record("add_books", records=records)
+
+
+def search_books(query, mode="index", limit=FUZZY_LIMIT):
+    """Return books whose title or author matches the query
+
+    "index" mode looks every word of the query up in the token index and
+    returns books matching all of them (each word may be the start of a
+    longer word). "fuzzy" mode does the same but lets each word have a
+    typo or two ("rowlng" finds "Rowling") and returns the `limit` closest
+    books, best first. "substring" mode is the original full scan that
+    matches the whole query as a substring of the title or author.
+    Results are cached (see query_cache.py) until a matching book changes.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValidationError(f"Search mode must be one of {SEARCH_MODES}")
+    key = cache_key(query, mode, limit if mode == "fuzzy" else None)
+    isbns = search_cache.get(key)
+    if isbns is None:
+        generation = search_cache.generation
+        isbns = _search_isbns(query, mode, limit)
+        search_cache.put(key, isbns, generation)
+    return [books.get(isbn) for isbn in isbns]
+
+
+def _search_isbns(query, mode, limit):
+    if mode == "index":
+        return search_index.search(query)
+    if mode == "fuzzy":
+        return search_index.fuzzy_search(query, limit)
+    query = query.strip().lower()
+    return [book["isbn"] for book in books
+            if query in book["title"].lower() or query in book["author"].lower()]
+
+
+def update_book(isbn, title=None, author=None, genre=None, total_copies=None):
+    """Change the given fields of a book and return it
+
+    Fields left as None (or empty) keep their current value. Every value
+    is validated before anything is changed.
+    """
+    changes = {}
+    if title:
+        changes["title"] = title
+    if author:
+        changes["author"] = author
+    if genre:
+        changes["genre"] = check_genre(genre)
+    if total_copies not in (None, ""):
+        changes["total_copies"] = check_copies(total_copies)
+    with circulation_locks.hold(isbn):
+        get_book(isbn)
+        book = books.update(isbn, **changes)
+        _record("update_book", isbn=isbn, **changes)
+    return book
+
+
+def check_delete_book(isbn):
+    """Return the book if it may be deleted (no copies borrowed)"""
+    book = get_book(isbn)
+    if book["available_copies"] < book["total_copies"]:
+        held_by = ", ".join(borrowers.holders_of(isbn))
+        raise ConflictError("Cannot delete book with borrowed copies",
+                            f"held by {held_by}" if held_by else None)
+    return book
+
+
+def delete_book(isbn):
+    """Delete a book that has no borrowed copies and return it"""
+    with circulation_locks.hold(isbn):
+        check_delete_book(isbn)
+        book = books.delete(isbn)
+        _record("delete_book", isbn=isbn)
+    return book
+
+
+# ===== MEMBER OPERATIONS =====
+
+def get_member(member_id):
+    """Return the member with this ID"""
+    member = members.get(member_id)
+    if member is None:
+        raise NotFoundError("Member not found")
+    return member
+
+
+def make_member(member_id, name, email, contact):
+    """Build a member record without validating or storing it"""
+    return Member(member_id, name, email, contact)
+
+
+def add_member(member_id, name, email, contact):
+    """Add a new member and return them"""
+    with circulation_locks.hold(member_id):
+        if members.has_key(member_id):
+            raise DuplicateError("Member ID already exists")
+        member = members.insert(make_member(member_id, name, email, contact))
+        _record("add_member", member_id=member_id, name=name, email=email, contact=contact)
+    return member
+
+
+def add_members(records):
+    """Add already validated member records in one batch (see bulk_import.py)"""
+    with circulation_locks.hold_all():
+        members.extend(records)
+        _record("add_members", records=records)
+
+
+def update_member(member_id, name=None, email=None, contact=None):
+    """Change the given fields of a member and return them"""
+    changes = {}
+    if name:
+        changes["name"] = name
+    if email:
+        changes["email"] = email
+    if contact:
+        changes["contact"] = contact
+    with circulation_locks.hold(member_id):
+        get_member(member_id)
+        member = members.update(member_id, **changes)
+        _record("update_member", member_id=member_id, **changes)
+    return member
+
+
+def check_delete_member(member_id):
+    """Return the member if they may be deleted (no borrowed books)"""
+    member = get_member(member_id)
+    if len(member["borrowed_books"]) > 0:
+        raise ConflictError("Cannot delete member with borrowed books")
+    return member
+
+
+def delete_member(member_id):
+    """Delete a member who has no borrowed books and return them"""
+    with circulation_locks.hold(member_id):
+        check_delete_member(member_id)
+        member = members.delete(member_id)
+        _record("delete_member", member_id=member_id)
+    return member
+
+
+# ===== BORROW/RETURN OPERATIONS =====
+
+def check_borrower(member_id):
+    """Return the member if they may borrow another book"""
+    member = get_member(member_id)
+    if len(member["borrowed_books"]) >= MAX_BORROWED:
+        raise BorrowLimitError(f"Member has already borrowed {MAX_BORROWED} books")
+    return member
+
+
+def borrow_book(member_id, isbn, now=None):
+    """Lend one copy of a book to a member and return the book
+
+    A loan record due LOAN_DAYS after `now` (default: the current time)
+    is opened. Safe to call from several threads at once.
+    """
+    with circulation_locks.hold(member_id, isbn):
+        member = check_borrower(member_id)
+        book = get_book(isbn)
+        if book["available_copies"] <= 0:
+            raise UnavailableError("No copies available")
+
+        # A member who gets the book no longer needs to wait for it. Logged
+        # before the loan: replaying "borrow_book" cancels the hold itself
+        if holds.cancel(member_id, isbn):
+            _record("cancel_hold", member_id=member_id, isbn=isbn)
+        _lend(member, book, now)
+    return book
+
+
+def return_book(member_id, isbn, now=None, fill_holds=True):
+    """Take back a book a member has borrowed and return the book
+
+    The member's oldest open loan of the book is closed. If other members
+    hold the book, the returned copy is lent straight to the first one in
+    the queue (holds whose member cannot borrow any more are dropped).
+    Safe to call from several threads at once.
+    """
+    returned = None
+    while True:
+        # The head of the queue needs locking too; it can only change while
+        # the book is unlocked, so check it again once the locks are held
+        head = _hold_head(isbn, now) if fill_holds else None
+        keys = (member_id, isbn, head.member_id) if head else (member_id, isbn)
+        with circulation_locks.hold(*keys):
+            if returned is None:
+                member = get_member(member_id)
+                if isbn not in member["borrowed_books"]:
+                    raise ConflictError("Member has not borrowed this book")
+                returned = get_book(isbn)
+                _take_back(member, returned, now)
+            if not fill_holds:
+                return returned
+            if holds.peek(isbn, now) is not head:
+                continue
+            if head is None or _fill_hold(returned, now):
+                return returned
+
+
+def _hold_head(isbn, now):
+    # First live hold on a book, read under the book's lock because
+    # place_hold may be appending to the queue on another thread
+    with circulation_locks.hold(isbn):
+        return holds.peek(isbn, now)
+
+
+def _serve_holds(isbn, now):
+    # Lend free copies of a book to the members holding it, in queue order
+    while True:
+        head = _hold_head(isbn, now)
+        if head is None:
+            return
+        with circulation_locks.hold(isbn, head.member_id):
+            book = books.get(isbn)
+            if book is None:
+                return
+            if holds.peek(isbn, now) is head and _fill_hold(book, now):
+                return
+
+
+def _fill_hold(book, now):
+    # Caller holds the locks of the book and of the member at the head of
+    # its hold queue. Returns True once the queue needs no more attention.
+    if book["available_copies"] <= 0:
+        return True
+    hold = holds.pop(book["isbn"], now)
+    _record("cancel_hold", member_id=hold.member_id, isbn=book["isbn"])
+    member = members.get(hold.member_id)
+    if member is None or len(member["borrowed_books"]) >= MAX_BORROWED:
+        return False  # try the next hold
+    _lend(member, book, now)
+    return True
+
+
+def _lend(member, book, now):
+    # Caller holds the locks and has checked the loan is allowed
+    now = time.time() if now is None else now
+    member["borrowed_books"].append(book["isbn"])
+    borrowers.add(book["isbn"], member["id"])
+    books.update(book["isbn"], available_copies=book["available_copies"] - 1)
+    borrow_counts[book["isbn"]] = borrow_counts.get(book["isbn"], 0) + 1
+    loans.open_loan(member["id"], book["isbn"], now)
+    _record("borrow_book", member_id=member["id"], isbn=book["isbn"], now=now)
+
+
+def _take_back(member, book, now):
+    # Caller holds the locks and has checked the member has the book
+    now = time.time() if now is None else now
+    member["borrowed_books"].remove(book["isbn"])
+    borrowers.remove(book["isbn"], member["id"])
+    books.update(book["isbn"], available_copies=book["available_copies"] + 1)
+    loans.close_loan(member["id"], book["isbn"], now)
+    _record("return_book", member_id=member["id"], isbn=book["isbn"], now=now,
+            fill_holds=False)
+
+
+# ===== BORROWERS =====
+
+def holders(isbn):
+    """Return the IDs of members who currently hold a copy of the book
+
+    Answered from the borrower index, in time proportional to the number
+    of holders (e.g. for recalls of damaged copies).
+    """
+    get_book(isbn)
+    return borrowers.holders_of(isbn)
+
+
+def check_borrowers():
+    """Verify the borrower index against every member's borrowed books
+
+    Returns a list of (ISBN, member ID, copies in index, copies borrowed)
+    for every disagreement; an empty list means the index is consistent.
+    """
+    return borrowers.inconsistencies(members)
+
+
+def rebuild_borrowers():
+    """Rebuild the borrower index from the members' borrowed books"""
+    borrowers.rebuild(members)
+
+
+# ===== HOLDS =====
+
+def place_hold(member_id, isbn, now=None):
+    """Queue a member for the next free copy of a book and return the Hold
+
+    Only allowed while no copies are available.
+    """
+    with circulation_locks.hold(member_id, isbn):
+        get_member(member_id)
+        book = get_book(isbn)
+        if book["available_copies"] > 0:
+            raise ConflictError("Copies are available; borrow the book instead")
+        if holds.has_hold(member_id, isbn, now):
+            raise DuplicateError("Member already has a hold on this book")
+        holds.cancel(member_id, isbn)  # an expired hold, if any
+        hold = holds.place(member_id, isbn, now)
+        _record("place_hold", member_id=member_id, isbn=isbn, now=hold.placed_at)
+    return hold
+
+
+def cancel_hold(member_id, isbn):
+    """Remove a member's hold on a book"""
+    with circulation_locks.hold(member_id, isbn):
+        if not holds.cancel(member_id, isbn):
+            raise NotFoundError("Hold not found")
+        _record("cancel_hold", member_id=member_id, isbn=isbn)
+
+
+def hold_position(member_id, isbn, now=None):
+    """Return the member's place (1 = next) in the book's hold queue"""
+    with circulation_locks.hold(isbn):
+        position = holds.position(member_id, isbn, now)
+    if position is None:
+        raise NotFoundError("Hold not found")
+    return position
+
+
+# ===== LOANS =====
+
+def loans_for_member(member_id):
+    """Return a member's open loans (with due dates), oldest first"""
+    get_member(member_id)
+    return loans.loans_for_member(member_id)
+
+
+def next_overdue(count=10, now=None):
+    """Return up to `count` overdue loans, most overdue first"""
+    return loans.next_overdue(count, now)
+
+
+def start_overdue_sweeper(callback, interval=60.0):
+    """Call callback(loan) once for each loan as it becomes overdue
+
+    Runs on a background thread every `interval` seconds; returns the
+    OverdueSweeper so the caller can stop() it.
+    """
+    sweeper = OverdueSweeper(loans, callback, interval)
+    sweeper.start()
+    return sweeper
+
+
+# ===== BATCH OPERATIONS =====
+
+BATCH_ACTIONS = ("borrow", "return")  # Tuple of actions a batch may contain
+
+
+def circulate_batch(operations, now=None):
+    """Apply many borrows/returns all together, or none of them
+
+    operations is a list of (action, member_id, isbn) with action "borrow"
+    or "return". Each member and book is looked up once and the whole
+    batch is checked first, counting the effect of earlier operations in
+    the batch (so the 3-book limit and available copies hold across the
+    batch). If any operation would fail, BatchError is raised and nothing
+    changes; otherwise all of them are applied and the books are returned
+    in batch order. Copies given back by the batch go to members holding
+    those books once the batch is done.
+    """
+    operations = list(operations)
+    keys = set()
+    for _, member_id, isbn in operations:
+        keys.add(member_id)
+        keys.add(isbn)
+
+    with circulation_locks.hold(*keys):
+        found_members = {}
+        found_books = {}
+        held = {}  # member ID -> list of ISBNs as it will be after the batch so far
+        available = {}  # ISBN -> available copies after the batch so far
+
+        for index, (action, member_id, isbn) in enumerate(operations):
+            try:
+                if action not in BATCH_ACTIONS:
+                    raise ValidationError(f"Batch action must be one of {BATCH_ACTIONS}")
+                if member_id not in found_members:
+                    found_members[member_id] = get_member(member_id)
+                    held[member_id] = list(found_members[member_id]["borrowed_books"])
+                if isbn not in found_books:
+                    found_books[isbn] = get_book(isbn)
+                    available[isbn] = found_books[isbn]["available_copies"]
+
+                if action == "borrow":
+                    if len(held[member_id]) >= MAX_BORROWED:
+                        raise BorrowLimitError(f"Member has already borrowed {MAX_BORROWED} books")
+                    if available[isbn] <= 0:
+                        raise UnavailableError("No copies available")
+                    held[member_id].append(isbn)
+                    available[isbn] -= 1
+                else:
+                    if isbn not in held[member_id]:
+                        raise ConflictError("Member has not borrowed this book")
+                    held[member_id].remove(isbn)
+                    available[isbn] += 1
+            except LibraryError as e:
+                raise BatchError(index, e) from e
+
+        # Everything checked: apply the whole batch
+        for action, member_id, isbn in operations:
+            if action == "borrow":
+                if holds.cancel(member_id, isbn):
+                    _record("cancel_hold", member_id=member_id, isbn=isbn)
+                _lend(found_members[member_id], found_books[isbn], now)
+            else:
+                _take_back(found_members[member_id], found_books[isbn], now)
+
+    for isbn in {isbn: None for action, _, isbn in operations if action == "return"}:
+        _serve_holds(isbn, now)
+    return [found_books[isbn] for _, _, isbn in operations]
+
+
+def borrow_batch(pairs, now=None):
+    """Borrow many (member_id, isbn) pairs all together, or none of them"""
+    return circulate_batch([("borrow", member_id, isbn) for member_id, isbn in pairs], now)
+
+
+def return_batch(pairs, now=None):
+    """Return many (member_id, isbn) pairs all together, or none of them"""
+    return circulate_batch([("return", member_id, isbn) for member_id, isbn in pairs], now)
+
+
+# ===== GENRE AND AUTHOR QUERIES =====
+
+def genre_summary(genre):
+    """Return running totals for a genre in constant time
+
+    The result has "titles", "total_copies", "available_copies" and
+    "titles_available" (titles with at least one copy on the shelf).
+    """
+    check_genre(genre)
+    return genre_author_index.genre_stats(genre)
+
+
+def books_in_genre(genre, available_only=False):
+    """Return the books of a genre, optionally only those with copies available"""
+    check_genre(genre)
+    found = [books.get(isbn) for isbn in genre_author_index.isbns_in_genre(genre)]
+    if available_only:
+        found = [book for book in found if book["available_copies"] > 0]
+    return found
+
+
+def books_by_author(author):
+    """Return every book by an author (case, spacing and punctuation ignored)"""
+    return [books.get(isbn) for isbn in genre_author_index.isbns_by_author(author)]
+
+
+def count_books_by_author(author):
+    """Return how many titles an author has, in constant time"""
+    return genre_author_index.count_by_author(author)
+
+
+# ===== LISTINGS =====
+
+# Sort key functions for the listing orders above
+_BOOK_SORTS = {
+    "title": lambda book: (book["title"].casefold(), book["isbn"]),
+    "author": lambda book: (book["author"].casefold(), book["title"].casefold(), book["isbn"]),
+    "genre": lambda book: (book["genre"], book["title"].casefold(), book["isbn"]),
+    # Most available copies first
+    "availability": lambda book: (-book["available_copies"], book["title"].casefold(), book["isbn"]),
+}
+_MEMBER_SORTS = {
+    "id": lambda member: member["id"],
+    "name": lambda member: (member["name"].casefold(), member["id"]),
+}
+
+
+# Listing orders, each sorted once on first use and then kept up to date
+# (see secondary_index.py), so a page never re-sorts the catalog
+_book_orders = {sort_by: SortedOrder(books, key) for sort_by, key in _BOOK_SORTS.items()}
+_member_orders = {sort_by: SortedOrder(members, key) for sort_by, key in _MEMBER_SORTS.items()}
+_book_orders[None] = StoreOrder(books)
+_member_orders[None] = StoreOrder(members)
+
+
+def _order(orders, sort_by):
+    if sort_by not in orders:
+        raise ValidationError(f"Sort order must be one of {tuple(o for o in orders if o)}")
+    return orders[sort_by]
+
+
+def _iter_sorted(store, orders, sort_by, offset):
+    if sort_by is None:
+        return islice(store, offset, None)
+    keys = _order(orders, sort_by).keys(offset)
+    return (record for record in map(store.get, keys) if record is not None)
+
+
+def _page(store, orders, sort_by, cursor, limit):
+    # One extra key tells whether another page follows
+    cursor = cursor or 0
+    keys = _order(orders, sort_by).keys(cursor, limit + 1)
+    page = [store.get(key) for key in keys[:limit]]
+    return page, cursor + limit if len(keys) > limit else None
+
+
+def iter_books(sort_by=None, offset=0):
+    """Yield books in catalog order (or sorted), starting at offset
+
+    Unsorted listings are produced lazily, one book at a time.
+    """
+    return _iter_sorted(books, _book_orders, sort_by, offset)
+
+
+def iter_members(sort_by=None, offset=0):
+    """Yield members in registration order (or sorted), starting at offset"""
+    return _iter_sorted(members, _member_orders, sort_by, offset)
+
+
+def page_books(cursor=0, limit=50, sort_by=None):
+    """Return (books, next cursor) for one page; the cursor is None at the end
+
+    The cursor is a position in the chosen order; each page costs about
+    `limit` steps wherever it starts.
+    """
+    return _page(books, _book_orders, sort_by, cursor, limit)
+
+
+def page_members(cursor=0, limit=50, sort_by=None):
+    """Return (members, next cursor) for one page; the cursor is None at the end"""
+    return _page(members, _member_orders, sort_by, cursor, limit)
+
+
+# Functions apply_mutation may call, by the op name they record
+MUTATIONS = {
+    "add_book": add_book,
+    "add_books": add_books,
+    "update_book": update_book,
+    "delete_book": delete_book,
+    "add_member": add_member,
+    "add_members": add_members,
+    "update_member": update_member,
+    "delete_member": delete_member,
+    "borrow_book": borrow_book,
+    "return_book": return_book,
+    "place_hold": place_hold,
+    "cancel_hold": cancel_hold,
+}
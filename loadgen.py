@@ -0,0 +1,146 @@
+# loadgen.py - Load generator for server.py
+#
+# Usage: python loadgen.py [--port 8470] [--connections 200] [--requests 500]
+#                          [--pipeline 8] [--books 1000] [--members 1000]
+#
+# Seeds the server with synthetic books and members, then opens many
+# connections that each keep up to --pipeline requests in flight.
+# The request mix is mostly searches plus borrows and returns. Prints
+# requests/sec and latency percentiles.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import DEFAULT_PORT
+
+
+class Connection:
+    """One client connection with pipelined requests"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    def send(self, op, **args):
+        self.next_id += 1
+        self.writer.write((json.dumps({"id": self.next_id, "op": op, "args": args}) + "\n").encode())
+
+    async def receive(self):
+        return json.loads(await self.reader.readline())
+
+    async def call(self, op, **args):
+        self.send(op, **args)
+        await self.writer.drain()
+        return await self.receive()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at a fraction (0-1) of a sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def seed(host, port, book_count, member_count):
+    """Add synthetic books and members through the protocol
+
+    Responses are read by a separate task while the requests are sent:
+    if nobody read them, the server would stop reading once the replies
+    filled the socket buffers, and both sides would wait for ever.
+    """
+    connection = await Connection.open(host, port)
+
+    async def read_responses():
+        for _ in range(book_count + member_count):
+            await connection.receive()
+
+    reading = asyncio.create_task(read_responses())
+    genres = ("Fiction", "Non-Fiction", "Sci-Fi")
+    for i in range(book_count):
+        connection.send("add_book", isbn=f"LOAD-{i}", title=f"Load Title {i}",
+                        author=f"Load Author {i % 100}", genre=genres[i % 3], total_copies=5)
+        await connection.writer.drain()
+    for i in range(member_count):
+        connection.send("add_member", member_id=f"LOAD-M{i}", name=f"Load Member {i}",
+                        email=f"load{i}@email.com", contact="0")
+        await connection.writer.drain()
+    await reading
+    await connection.close()
+
+
+async def run_client(host, port, requests, pipeline, book_count, member_count, latencies, seed_value):
+    """Send requests with up to `pipeline` in flight and record each latency"""
+    rng = random.Random(seed_value)
+    connection = await Connection.open(host, port)
+    sent_at = []  # send times of in-flight requests, oldest first
+    received = 0
+    sent = 0
+    while received < requests:
+        while sent < requests and sent - received < pipeline:
+            roll = rng.random()
+            isbn = f"LOAD-{rng.randrange(book_count)}"
+            member_id = f"LOAD-M{rng.randrange(member_count)}"
+            if roll < 0.90:
+                connection.send("search_books", query=f"title {rng.randrange(book_count)}")
+            elif roll < 0.95:
+                connection.send("borrow_book", member_id=member_id, isbn=isbn)
+            else:
+                connection.send("return_book", member_id=member_id, isbn=isbn)
+            sent_at.append(time.perf_counter())
+            sent += 1
+        await connection.writer.drain()
+        await connection.receive()
+        latencies.append(time.perf_counter() - sent_at[received])
+        received += 1
+    await connection.close()
+
+
+async def run(args):
+    await seed(args.host, args.port, args.books, args.members)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(args.host, args.port, args.requests, args.pipeline,
+                   args.books, args.members, latencies, i)
+        for i in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Requests:     {total:,} over {args.connections} connections "
+          f"(pipeline depth {args.pipeline})")
+    print(f"Elapsed:      {elapsed:.2f} s")
+    print(f"Throughput:   {total / elapsed:,.0f} requests/sec")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500, help="requests per connection")
+    parser.add_argument("--pipeline", type=int, default=8, help="requests in flight per connection")
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
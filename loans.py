@@ -0,0 +1,209 @@
+# loans.py - Loan records with due dates and an overdue scheduler
+
+import heapq
+import threading
+import time
+from collections import deque
+
+LOAN_DAYS = 14  # Default loan period
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class Loan:
+    """One copy of a book lent to a member"""
+
+    __slots__ = ("loan_id", "member_id", "isbn", "borrowed_at", "due_at", "returned_at")
+
+    def __init__(self, loan_id, member_id, isbn, borrowed_at, due_at, returned_at=None):
+        self.loan_id = loan_id
+        self.member_id = member_id
+        self.isbn = isbn
+        self.borrowed_at = borrowed_at  # seconds since the epoch, like time.time()
+        self.due_at = due_at
+        self.returned_at = returned_at
+
+    @property
+    def is_open(self):
+        return self.returned_at is None
+
+    def is_overdue(self, now):
+        return self.is_open and self.due_at < now
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return (f"Loan({self.loan_id}, member={self.member_id!r}, isbn={self.isbn!r}, "
+                f"due_at={self.due_at})")
+
+
+class LoanRegistry:
+    """Open loans, indexed by member/book and by due date
+
+    Two min-heaps of (due_at, loan_id) order loans by due date. Returned
+    loans are not removed from the heaps straight away; they are dropped
+    when they reach the top (lazy deletion), so opening and closing a
+    loan cost O(log n). next_overdue(k) pops at most k live entries and
+    pushes them back, so it costs O(k log n) however many loans exist.
+    """
+
+    def __init__(self, loan_days=LOAN_DAYS):
+        self.loan_days = loan_days
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget every loan"""
+        self._next_id = 1
+        self.open_loans = {}  # loan ID -> Loan
+        self._by_pair = {}  # (member ID, ISBN) -> deque of open loan IDs, oldest first
+        self._by_member = {}  # member ID -> {loan ID: None}, oldest first
+        self._due_heap = []  # (due_at, loan_id) for next_overdue()
+        self._notify_heap = []  # (due_at, loan_id) not yet handed to the sweeper
+
+    # ===== OPENING AND CLOSING =====
+
+    def open_loan(self, member_id, isbn, borrowed_at=None, due_at=None):
+        """Record a new loan and return it"""
+        if borrowed_at is None:
+            borrowed_at = time.time()
+        if due_at is None:
+            due_at = borrowed_at + self.loan_days * SECONDS_PER_DAY
+        with self._lock:
+            loan = Loan(self._next_id, member_id, isbn, borrowed_at, due_at)
+            self._next_id += 1
+            self._add(loan)
+        return loan
+
+    def _add(self, loan):
+        # Caller holds self._lock
+        self.open_loans[loan.loan_id] = loan
+        self._by_pair.setdefault((loan.member_id, loan.isbn), deque()).append(loan.loan_id)
+        self._by_member.setdefault(loan.member_id, {})[loan.loan_id] = None
+        heapq.heappush(self._due_heap, (loan.due_at, loan.loan_id))
+        heapq.heappush(self._notify_heap, (loan.due_at, loan.loan_id))
+
+    def close_loan(self, member_id, isbn, returned_at=None):
+        """Close the member's oldest open loan of this book and return it
+
+        Returns None if there is no such loan (e.g. books lent before loans
+        were recorded).
+        """
+        with self._lock:
+            pending = self._by_pair.get((member_id, isbn))
+            if not pending:
+                return None
+            loan = self.open_loans.pop(pending.popleft())
+            if not pending:
+                del self._by_pair[(member_id, isbn)]
+            member_loans = self._by_member[member_id]
+            del member_loans[loan.loan_id]
+            if not member_loans:
+                del self._by_member[member_id]
+        loan.returned_at = time.time() if returned_at is None else returned_at
+        return loan
+
+    # ===== QUERIES =====
+
+    def loans_for_member(self, member_id):
+        """Return a member's open loans, oldest first"""
+        with self._lock:
+            return [self.open_loans[i] for i in self._by_member.get(member_id, ())]
+
+    def _pop_live(self, heap):
+        # Caller holds self._lock; drops returned loans from the top of the heap
+        while heap:
+            due_at, loan_id = heap[0]
+            if loan_id in self.open_loans:
+                return due_at, loan_id
+            heapq.heappop(heap)
+        return None
+
+    def next_overdue(self, count, now=None):
+        """Return up to `count` open loans that are past due, most overdue first"""
+        now = time.time() if now is None else now
+        found = []
+        with self._lock:
+            while len(found) < count:
+                top = self._pop_live(self._due_heap)
+                if top is None or top[0] >= now:
+                    break
+                heapq.heappop(self._due_heap)
+                found.append(top)
+            for entry in found:
+                heapq.heappush(self._due_heap, entry)
+            return [self.open_loans[loan_id] for _, loan_id in found]
+
+    def take_newly_overdue(self, count, now=None):
+        """Return up to `count` overdue loans not returned by an earlier call"""
+        now = time.time() if now is None else now
+        found = []
+        with self._lock:
+            while len(found) < count:
+                top = self._pop_live(self._notify_heap)
+                if top is None or top[0] >= now:
+                    break
+                heapq.heappop(self._notify_heap)
+                found.append(self.open_loans[top[1]])
+        return found
+
+    # ===== SAVING AND LOADING =====
+
+    def to_list(self):
+        """Return the open loans as dictionaries (for snapshots)"""
+        with self._lock:
+            return [loan.to_dict() for loan in self.open_loans.values()]
+
+    def restore(self, loan_dicts):
+        """Replace every loan with the given dictionaries (from to_list)"""
+        with self._lock:
+            self.clear()
+            for data in loan_dicts:
+                loan = Loan(**data)
+                self._add(loan)
+                self._next_id = max(self._next_id, loan.loan_id + 1)
+
+
+class OverdueSweeper:
+    """Background job that reports each loan once when it becomes overdue
+
+    Every `interval` seconds the callback is called with each newly
+    overdue loan, e.g. to send a reminder to the member.
+    """
+
+    def __init__(self, registry, callback, interval=60.0, batch_size=1000, clock=time.time):
+        self.registry = registry
+        self.callback = callback
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep_once(self):
+        """Hand every newly overdue loan to the callback; return how many"""
+        handled = 0
+        while True:
+            batch = self.registry.take_newly_overdue(self.batch_size, self.clock())
+            for loan in batch:
+                self.callback(loan)
+            handled += len(batch)
+            if len(batch) < self.batch_size:
+                return handled
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep_once()
+
+    def start(self):
+        """Start sweeping on a daemon thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeps"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
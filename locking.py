@@ -0,0 +1,49 @@
+# locking.py - Striped locks for concurrent borrow/return
+
+import threading
+from contextlib import contextmanager
+
+DEFAULT_STRIPES = 256
+
+
+class StripedLocks:
+    """A fixed pool of locks shared out by key (ISBN or member ID)
+
+    Each key always maps to the same lock, so operations on different
+    books and members can run in parallel while operations on the same
+    book or member are serialised. hold() takes the locks for all of its
+    keys in ascending stripe order, so two threads can never wait on each
+    other in a cycle (no deadlock), and a stripe shared by two keys is
+    only taken once.
+    """
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripes_for(self, keys):
+        """Return the sorted, distinct stripe numbers used by these keys"""
+        count = len(self._locks)
+        return sorted({hash(key) % count for key in keys})
+
+    @contextmanager
+    def hold(self, *keys):
+        """Hold the locks for every key for the duration of a with block"""
+        locks = [self._locks[i] for i in self.stripes_for(keys)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @contextmanager
+    def hold_all(self):
+        """Hold every lock, e.g. while taking a consistent copy of the data"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
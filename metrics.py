@@ -0,0 +1,198 @@
+# metrics.py - Call counts, latency histograms and error reasons per operation
+#
+# Usage:
+#     import metrics
+#     metrics.enable()                 # wrap the library.py operations
+#     ...
+#     metrics.write_prometheus("library.prom")
+#     metrics.disable()                # put the plain functions back
+#
+# enable() replaces each operation in the library module with a timing
+# wrapper, and disable() puts the original function back. Callers look
+# operations up as library.<name> (operations.py, server.py), so they use
+# whichever is installed; when metrics are off nothing extra runs at all.
+# Only the operation the caller asked for is counted: calls it makes to
+# other operations on the same thread (e.g. borrow_book looking up the
+# book with get_book) are part of its time, not calls of their own.
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import library
+
+# Operations wrapped by enable(): every one server.py offers, plus the
+# batch adds used by bulk_import.py
+INSTRUMENTED = (
+    "get_book", "add_book", "add_books", "search_books", "update_book", "delete_book",
+    "get_member", "add_member", "add_members", "update_member", "delete_member",
+    "borrow_book", "return_book", "circulate_batch", "borrow_batch", "return_batch",
+    "page_books", "page_members", "genre_summary", "books_in_genre", "books_by_author",
+    "count_books_by_author", "loans_for_member", "next_overdue",
+    "place_hold", "cancel_hold", "hold_position", "holders",
+)
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+           0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets (see BUCKETS)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Counters and histograms for every instrumented operation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Reset every counter"""
+        self.calls = {}  # operation -> call count
+        self.errors = {}  # (operation, error type, reason) -> count
+        self.latency = {}  # operation -> Histogram
+
+    def observe(self, op, seconds, error=None):
+        """Record one call of an operation, and its error if it failed"""
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+            histogram = self.latency.get(op)
+            if histogram is None:
+                histogram = self.latency[op] = Histogram()
+            histogram.observe(seconds)
+            if error is not None:
+                # The reason, not str(error): messages may carry member IDs
+                # or batch positions, which would make a label per request
+                key = (op, type(error).__name__, error.reason)
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = ["# HELP library_calls_total Calls of each library operation.",
+                     "# TYPE library_calls_total counter"]
+            for op, count in sorted(self.calls.items()):
+                lines.append(f'library_calls_total{{op="{op}"}} {count}')
+
+            lines += ["# HELP library_errors_total Failed calls by error type and reason.",
+                      "# TYPE library_errors_total counter"]
+            for (op, error, reason), count in sorted(self.errors.items()):
+                lines.append(f'library_errors_total{{op="{op}",error="{error}",'
+                             f'reason="{_escape(reason)}"}} {count}')
+
+            lines += ["# HELP library_call_seconds Time spent in each library operation.",
+                      "# TYPE library_call_seconds histogram"]
+            for op, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'library_call_seconds_bucket{{op="{op}",le="{bound}"}} {cumulative}')
+                lines.append(f'library_call_seconds_sum{{op="{op}"}} {histogram.total:.9f}')
+                lines.append(f'library_call_seconds_count{{op="{op}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+_originals = {}  # operation name -> unwrapped function, while enabled
+_active = threading.local()  # .inside is True while an operation is being timed
+
+
+def instrument(op, func):
+    """Return func wrapped to record its calls under the name `op`
+
+    A call made from inside another instrumented operation is not
+    recorded separately.
+    """
+    clock = time.perf_counter
+    observe = registry.observe
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_active, "inside", False):
+            return func(*args, **kwargs)
+        _active.inside = True
+        error = None
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        except library.LibraryError as e:
+            error = e
+            raise
+        finally:
+            # Counted and timed however it ends; only LibraryErrors have a reason
+            _active.inside = False
+            observe(op, clock() - start, error)
+    return wrapper
+
+
+def enable():
+    """Start recording metrics for the library operations"""
+    for op in INSTRUMENTED:
+        if op not in _originals:
+            _originals[op] = getattr(library, op)
+            setattr(library, op, instrument(op, _originals[op]))
+
+
+def disable():
+    """Stop recording; the plain functions are used again"""
+    for op, func in _originals.items():
+        setattr(library, op, func)
+    _originals.clear()
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def write_prometheus(path):
+    """Write a snapshot of the metrics to a file, replacing it atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(registry.to_prometheus())
+    os.replace(temp_path, path)
+
+
+class Exporter:
+    """Background thread that rewrites the metrics file every `interval` seconds"""
+
+    def __init__(self, path, interval=15.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            write_prometheus(self.path)
+
+    def start(self):
+        """Start exporting on a daemon thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop exporting and write one last snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        write_prometheus(self.path)
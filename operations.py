@@ -1,9 +1,18 @@
 # operations.py - Library Management System Core Functions
+#
+# Interactive menu for the library. Each menu function only collects input
+# and prints the outcome; the actual work is done by the service API in
+# library.py, which can also be called directly without any terminal I/O.
 
-# Data Structures
-books = []  # List to store book dictionaries
-members = []  # List to store member dictionaries
-VALID_GENRES = ("Fiction", "Non-Fiction", "Sci-Fi")  # Tuple of valid genres
+import argparse
+import sys
+from itertools import islice
+
+import events
+import library
+import metrics
+from library import books, members, VALID_GENRES, LibraryError
+from storage import Storage
 
 
 # ===== BOOK OPERATIONS =====
@@ -14,10 +23,9 @@ def add_book():
     isbn = input("Enter ISBN: ").strip()
 
     # Check if ISBN is unique
-    for book in books:
-        if book["isbn"] == isbn:
-            print("Error: ISBN already exists")
-            return
+    if books.has_key(isbn):
+        print("Error: ISBN already exists")
+        return
 
     title = input("Enter Title: ").strip()
     author = input("Enter Author: ").strip()
@@ -28,41 +36,35 @@ def add_book():
         print(f"Error: Genre must be one of {VALID_GENRES}")
         return
 
+    total_copies = input("Enter Total Copies: ").strip()
+
     try:
-        total_copies = int(input("Enter Total Copies: ").strip())
-    except ValueError:
-        print("Error: Total copies must be a number")
+        library.add_book(isbn, title, author, genre, total_copies)
+    except LibraryError as e:
+        print(f"Error: {e}")
         return
-
-    # Create book dictionary
-    new_book = {
-        "isbn": isbn,
-        "title": title,
-        "author": author,
-        "genre": genre,
-        "total_copies": total_copies,
-        "available_copies": total_copies
-    }
-
-    books.append(new_book)
     print(f"✓ Book '{title}' added successfully")
 
 
-def search_books():
+def search_books(mode="index"):
     """Search books by title or author"""
     print("\n--- SEARCH BOOKS ---")
     search_term = input("Enter title or author to search: ").strip().lower()
 
-    results = []
-    for book in books:
-        if search_term in book["title"].lower() or search_term in book["author"].lower():
-            results.append(book)
+    results = library.search_books(search_term, mode)
 
     if results:
         print(f"\n✓ Found {len(results)} book(s):")
         for book in results:
-            print(f"  ISBN: {book['isbn']}, Title: {book['title']}, Author: {book['author']}, "
-                  f"Genre: {book['genre']}, Available: {book['available_copies']}/{book['total_copies']}")
+            print(f"  {_format_book(book)}")
+        return
+
+    # Nothing matched exactly; the query may have a typo
+    results = library.search_books(search_term, "fuzzy") if mode != "fuzzy" else []
+    if results:
+        print(f"\n✓ No exact matches; {len(results)} close match(es):")
+        for book in results:
+            print(f"  {_format_book(book)}")
     else:
         print("✗ No books found matching your search")
 
@@ -72,12 +74,7 @@ def update_book():
     print("\n--- UPDATE BOOK ---")
     isbn = input("Enter ISBN of book to update: ").strip()
 
-    book_found = None
-    for book in books:
-        if book["isbn"] == isbn:
-            book_found = book
-            break
-
+    book_found = books.get(isbn)
     if not book_found:
         print("Error: Book not found")
         return
@@ -88,23 +85,11 @@ def update_book():
     genre = input(f"New Genre (current: {book_found['genre']}): ").strip()
     total_copies = input(f"New Total Copies (current: {book_found['total_copies']}): ").strip()
 
-    if title:
-        book_found["title"] = title
-    if author:
-        book_found["author"] = author
-    if genre:
-        if genre in VALID_GENRES:
-            book_found["genre"] = genre
-        else:
-            print(f"Error: Genre must be one of {VALID_GENRES}")
-            return
-    if total_copies:
-        try:
-            book_found["total_copies"] = int(total_copies)
-        except ValueError:
-            print("Error: Total copies must be a number")
-            return
-
+    try:
+        library.update_book(isbn, title, author, genre, total_copies)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
     print(f"✓ Book with ISBN {isbn} updated successfully")
 
 
@@ -113,21 +98,23 @@ def delete_book():
     print("\n--- DELETE BOOK ---")
     isbn = input("Enter ISBN of book to delete: ").strip()
 
-    for book in books:
-        if book["isbn"] == isbn:
-            if book["available_copies"] < book["total_copies"]:
-                print("Error: Cannot delete book with borrowed copies")
-                return
+    try:
+        book = library.check_delete_book(isbn)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
 
-            confirm = input(f"Delete '{book['title']}'? (yes/no): ").strip().lower()
-            if confirm == "yes":
-                books.remove(book)
-                print(f"✓ Book with ISBN {isbn} deleted successfully")
-            else:
-                print("✗ Deletion cancelled")
-            return
+    confirm = input(f"Delete '{book['title']}'? (yes/no): ").strip().lower()
+    if confirm != "yes":
+        print("✗ Deletion cancelled")
+        return
 
-    print("Error: Book not found")
+    try:
+        library.delete_book(isbn)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
+    print(f"✓ Book with ISBN {isbn} deleted successfully")
 
 
 # ===== MEMBER OPERATIONS =====
@@ -138,25 +125,19 @@ def add_member():
     member_id = input("Enter Member ID: ").strip()
 
     # Check if member ID is unique
-    for member in members:
-        if member["id"] == member_id:
-            print("Error: Member ID already exists")
-            return
+    if members.has_key(member_id):
+        print("Error: Member ID already exists")
+        return
 
     name = input("Enter Name: ").strip()
     email = input("Enter Email: ").strip()
     contact = input("Enter Contact: ").strip()
 
-    # Create member dictionary
-    new_member = {
-        "id": member_id,
-        "name": name,
-        "email": email,
-        "contact": contact,
-        "borrowed_books": []
-    }
-
-    members.append(new_member)
+    try:
+        library.add_member(member_id, name, email, contact)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
     print(f"✓ Member '{name}' added successfully")
 
 
@@ -165,12 +146,7 @@ def update_member():
     print("\n--- UPDATE MEMBER ---")
     member_id = input("Enter Member ID to update: ").strip()
 
-    member_found = None
-    for member in members:
-        if member["id"] == member_id:
-            member_found = member
-            break
-
+    member_found = members.get(member_id)
     if not member_found:
         print("Error: Member not found")
         return
@@ -180,13 +156,11 @@ def update_member():
     email = input(f"New Email (current: {member_found['email']}): ").strip()
     contact = input(f"New Contact (current: {member_found['contact']}): ").strip()
 
-    if name:
-        member_found["name"] = name
-    if email:
-        member_found["email"] = email
-    if contact:
-        member_found["contact"] = contact
-
+    try:
+        library.update_member(member_id, name, email, contact)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
     print(f"✓ Member with ID {member_id} updated successfully")
 
 
@@ -195,21 +169,23 @@ def delete_member():
     print("\n--- DELETE MEMBER ---")
     member_id = input("Enter Member ID to delete: ").strip()
 
-    for member in members:
-        if member["id"] == member_id:
-            if len(member["borrowed_books"]) > 0:
-                print("Error: Cannot delete member with borrowed books")
-                return
+    try:
+        member = library.check_delete_member(member_id)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
 
-            confirm = input(f"Delete member '{member['name']}'? (yes/no): ").strip().lower()
-            if confirm == "yes":
-                members.remove(member)
-                print(f"✓ Member with ID {member_id} deleted successfully")
-            else:
-                print("✗ Deletion cancelled")
-            return
+    confirm = input(f"Delete member '{member['name']}'? (yes/no): ").strip().lower()
+    if confirm != "yes":
+        print("✗ Deletion cancelled")
+        return
 
-    print("Error: Member not found")
+    try:
+        library.delete_member(member_id)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
+    print(f"✓ Member with ID {member_id} deleted successfully")
 
 
 # ===== BORROW/RETURN OPERATIONS =====
@@ -219,110 +195,117 @@ def borrow_book():
     print("\n--- BORROW BOOK ---")
     member_id = input("Enter Member ID: ").strip()
 
-    # Find member
-    member = None
-    for m in members:
-        if m["id"] == member_id:
-            member = m
-            break
-
-    if not member:
-        print("Error: Member not found")
-        return
-
-    # Check if member already has 3 books
-    if len(member["borrowed_books"]) >= 3:
-        print("Error: Member has already borrowed 3 books")
+    # Check the member exists and is under the borrow limit before asking for the book
+    try:
+        member = library.check_borrower(member_id)
+    except LibraryError as e:
+        print(f"Error: {e}")
         return
 
     isbn = input("Enter Book ISBN: ").strip()
 
-    # Find book
-    book = None
-    for b in books:
-        if b["isbn"] == isbn:
-            book = b
-            break
-
-    if not book:
-        print("Error: Book not found")
+    try:
+        book = library.borrow_book(member_id, isbn)
+    except library.UnavailableError as e:
+        print(f"Error: {e}")
+        if input("Place a hold? (yes/no): ").strip().lower() == "yes":
+            place_hold(member_id, isbn)
         return
-
-    # Check if book is available
-    if book["available_copies"] <= 0:
-        print("Error: No copies available")
+    except LibraryError as e:
+        print(f"Error: {e}")
         return
-
-    # Borrow the book
-    member["borrowed_books"].append(isbn)
-    book["available_copies"] -= 1
     print(f"✓ Book '{book['title']}' borrowed successfully by {member['name']}")
 
 
+def place_hold(member_id, isbn):
+    """Put a member in the queue for a book with no copies available"""
+    try:
+        library.place_hold(member_id, isbn)
+        position = library.hold_position(member_id, isbn)
+    except LibraryError as e:
+        print(f"Error: {e}")
+        return
+    print(f"✓ Hold placed; position {position} in the queue")
+
+
 def return_book():
     """Allow a member to return a borrowed book"""
     print("\n--- RETURN BOOK ---")
     member_id = input("Enter Member ID: ").strip()
 
-    # Find member
-    member = None
-    for m in members:
-        if m["id"] == member_id:
-            member = m
-            break
-
-    if not member:
-        print("Error: Member not found")
+    try:
+        member = library.get_member(member_id)
+    except LibraryError as e:
+        print(f"Error: {e}")
         return
 
     isbn = input("Enter Book ISBN: ").strip()
 
-    # Check if member has borrowed this book
-    if isbn not in member["borrowed_books"]:
-        print("Error: Member has not borrowed this book")
+    try:
+        book = library.return_book(member_id, isbn)
+    except LibraryError as e:
+        print(f"Error: {e}")
         return
+    print(f"✓ Book '{book['title']}' returned successfully by {member['name']}")
 
-    # Find book
-    book = None
-    for b in books:
-        if b["isbn"] == isbn:
-            book = b
-            break
 
-    if not book:
-        print("Error: Book not found")
-        return
+# ===== DISPLAY FUNCTIONS =====
 
-    # Return the book
-    member["borrowed_books"].remove(isbn)
-    book["available_copies"] += 1
-    print(f"✓ Book '{book['title']}' returned successfully by {member['name']}")
+PAGE_SIZE = 500  # Rows written per page (one write call each)
 
 
-# ===== DISPLAY FUNCTIONS =====
+def _write_pages(rows, format_row, page_size, pause, out):
+    """Write formatted rows a page at a time, optionally waiting between pages"""
+    while True:
+        page = [format_row(row) for row in islice(rows, page_size)]
+        if not page:
+            return
+        out.write("\n".join(page) + "\n")
+        if pause and len(page) == page_size:
+            out.flush()
+            if input("-- More? (Enter to continue, q to stop) ").strip().lower() == "q":
+                return
 
-def display_all_books():
-    """Display all books in the library"""
+
+def _format_book(book):
+    return (f"ISBN: {book['isbn']}, Title: {book['title']}, Author: {book['author']}, "
+            f"Genre: {book['genre']}, Available: {book['available_copies']}/{book['total_copies']}")
+
+
+def _format_member(member):
+    return (f"ID: {member['id']}, Name: {member['name']}, Email: {member['email']}, "
+            f"Contact: {member['contact']}, Borrowed Books: {len(member['borrowed_books'])}")
+
+
+def _ask_sort(sort_keys):
+    """Ask for a listing order; returns None to keep the stored order"""
+    sort_by = input(f"Sort by {sort_keys} (blank for none): ").strip().lower()
+    if sort_by and sort_by not in sort_keys:
+        print(f"Error: Sort order must be one of {sort_keys}")
+        return None
+    return sort_by or None
+
+
+def display_all_books(sort_by=None, page_size=PAGE_SIZE, pause=False, out=None):
+    """Display all books in the library, a page at a time"""
     if not books:
         print("\n✗ No books in the library")
         return
 
-    print("\n=== ALL BOOKS ===")
-    for book in books:
-        print(f"ISBN: {book['isbn']}, Title: {book['title']}, Author: {book['author']}, "
-              f"Genre: {book['genre']}, Available: {book['available_copies']}/{book['total_copies']}")
+    out = out or sys.stdout
+    out.write("\n=== ALL BOOKS ===\n")
+    _write_pages(library.iter_books(sort_by), _format_book, page_size, pause, out)
 
 
-def display_all_members():
-    """Display all members"""
+def display_all_members(sort_by=None, page_size=PAGE_SIZE, pause=False, out=None):
+    """Display all members, a page at a time"""
     if not members:
         print("\n✗ No members registered")
         return
 
-    print("\n=== ALL MEMBERS ===")
-    for member in members:
-        print(f"ID: {member['id']}, Name: {member['name']}, Email: {member['email']}, "
-              f"Contact: {member['contact']}, Borrowed Books: {len(member['borrowed_books'])}")
+    out = out or sys.stdout
+    out.write("\n=== ALL MEMBERS ===\n")
+    _write_pages(library.iter_members(sort_by), _format_member, page_size, pause, out)
 
 
 # ===== MAIN MENU =====
@@ -350,8 +333,8 @@ def show_menu():
     print("=" * 60)
 
 
-def main():
-    """Main interactive program"""
+def run_menu():
+    """Interactive menu loop"""
     print("\n🎓 Welcome to Library Management System!")
     print(f"Valid Genres: {', '.join(VALID_GENRES)}")
 
@@ -368,7 +351,7 @@ def main():
         elif choice == "4":
             delete_book()
         elif choice == "5":
-            display_all_books()
+            display_all_books(_ask_sort(library.BOOK_SORT_KEYS), pause=True)
         elif choice == "6":
             add_member()
         elif choice == "7":
@@ -376,7 +359,7 @@ def main():
         elif choice == "8":
             delete_member()
         elif choice == "9":
-            display_all_members()
+            display_all_members(_ask_sort(library.MEMBER_SORT_KEYS), pause=True)
         elif choice == "10":
             borrow_book()
         elif choice == "11":
@@ -393,7 +376,62 @@ def main():
         input("\nPress Enter to continue...")
 
 
+def main(data_dir=None, metrics_file=None, profiler=None, events_file=None):
+    """Main interactive program
+
+    If data_dir is given, the library is loaded from that folder at start
+    and every change is saved there (see storage.py). If metrics_file is
+    given, operation metrics are recorded and written there on exit (see
+    metrics.py). A profiling.Profiler times every menu command and writes
+    its report on exit. If events_file is given, every change is appended
+    to it as a JSON event (see events.py).
+    """
+    storage = None
+    if data_dir:
+        storage = Storage(data_dir)
+        storage.open()
+        for problem in storage.replay_errors:
+            print(f"✗ {problem}")
+    if metrics_file:
+        metrics.enable()
+    if profiler:
+        profiler.install(sys.modules[__name__])
+    bus = sink = None
+    if events_file:
+        bus = events.EventBus(last_seq=events.last_event_seq(events_file))
+        sink = events.JsonlSink(events_file)
+        bus.subscribe(sink.write)
+        bus.attach()
+    try:
+        run_menu()
+    finally:
+        if bus:
+            bus.detach()
+            sink.close()
+        if profiler:
+            profiler.finish()
+        if metrics_file:
+            metrics.write_prometheus(metrics_file)
+            metrics.disable()
+        if storage:
+            storage.close()
+
+
 # ===== RUN PROGRAM =====
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument("--data", metavar="DIR", help="folder to load and save the library")
+    parser.add_argument("--metrics", metavar="FILE", help="write operation metrics to this file on exit")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time each menu command and write a report here on exit ('-' to print it)")
+    parser.add_argument("--cprofile", action="store_true", help="with --profile, also profile functions")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="with --profile, also track memory allocations")
+    parser.add_argument("--events", metavar="FILE", help="append every change to this JSONL file")
+    args = parser.parse_args()
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler(args.profile, args.cprofile, args.tracemalloc)
+    main(args.data, args.metrics, profiler, args.events)
\ No newline at end of file
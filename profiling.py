@@ -0,0 +1,197 @@
+# profiling.py - Per-command timing for the menu and scripted sessions
+#
+# Usage:
+#     python operations.py --profile report.txt [--cprofile] [--tracemalloc]
+#     python profiling.py [--report report.txt] [--cprofile] [--tracemalloc] demo.py
+#
+# A Profiler wraps the menu commands in operations.py (add_book,
+# borrow_book, display_all_books, ...) and records the wall time of every
+# call. Time spent waiting at an input() prompt is left out, so the
+# figures show how long the program took, not how long the user typed.
+# Optionally each command also runs under cProfile (hottest functions)
+# and tracemalloc (where memory was allocated). A summary report is
+# written when the session ends.
+
+import argparse
+import builtins
+import cProfile
+import functools
+import io
+import pstats
+import runpy
+import sys
+import time
+import tracemalloc
+
+# Menu commands in operations.py that are timed
+COMMANDS = (
+    "add_book", "search_books", "update_book", "delete_book", "display_all_books",
+    "add_member", "update_member", "delete_member", "display_all_members",
+    "borrow_book", "return_book",
+)
+TOP_FUNCTIONS = 15  # Lines of cProfile output in the report
+TOP_ALLOCATIONS = 10  # Allocation sites in the report
+
+
+def _snapshot():
+    # Allocations made by the profiler itself are left out
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ))
+
+
+class Profiler:
+    """Times each menu command and writes a report at the end of the session"""
+
+    def __init__(self, report_path="-", cprofile=False, memory=False):
+        self.report_path = report_path  # "-" means standard output
+        self.cprofile = cprofile
+        self.memory = memory
+        self.timings = {}  # command -> [calls, total seconds, slowest call]
+        self.allocations = {}  # (file:line, command) -> bytes allocated
+        self._profiles = {}  # command -> cProfile.Profile
+        self._active = None  # Profile running for the current command, if any
+        self._in_command = False
+        self._waiting = 0.0  # seconds at input() during the current command
+        self._originals = {}
+        self._module = None
+        self._started = None
+
+    # ===== RECORDING =====
+
+    def _input(self, prompt=""):
+        # Replaces input() in operations.py while installed
+        start = time.perf_counter()
+        if self._active:
+            self._active.disable()
+        try:
+            return builtins.input(prompt)
+        finally:
+            if self._active:
+                self._active.enable()
+            self._waiting += time.perf_counter() - start
+
+    def _run(self, name, func, args, kwargs):
+        if self._in_command:  # a command called from another one
+            return func(*args, **kwargs)
+        self._in_command = True
+        self._waiting = 0.0
+        before = _snapshot() if self.memory else None
+        if self.cprofile:
+            self._active = self._profiles.setdefault(name, cProfile.Profile())
+            self._active.enable()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start - self._waiting
+            if self._active:
+                self._active.disable()
+                self._active = None
+            if before is not None:
+                self._count_allocations(name, before, _snapshot())
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+            self._in_command = False
+
+    def _count_allocations(self, name, before, after):
+        for stat in after.compare_to(before, "lineno"):
+            if stat.size_diff > 0:
+                frame = stat.traceback[0]
+                key = (f"{frame.filename}:{frame.lineno}", name)
+                self.allocations[key] = self.allocations.get(key, 0) + stat.size_diff
+
+    def _wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self._run(name, func, args, kwargs)
+        return wrapper
+
+    # ===== SESSION =====
+
+    def install(self, module):
+        """Start timing the menu commands of the operations module"""
+        self._started = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _snapshot()  # so the filters' own setup is not charged to a command
+        for name in COMMANDS:
+            self._originals[name] = getattr(module, name)
+            setattr(module, name, self._wrap(name, self._originals[name]))
+        module.input = self._input
+        self._module = module
+
+    def uninstall(self):
+        """Put the plain commands back"""
+        for name, func in self._originals.items():
+            setattr(self._module, name, func)
+        self._originals.clear()
+        del self._module.input
+        if self.memory:
+            tracemalloc.stop()
+
+    def finish(self):
+        """Uninstall and write the report"""
+        self.uninstall()
+        report = self.report(time.perf_counter() - self._started)
+        if self.report_path == "-":
+            print(report)
+        else:
+            with open(self.report_path, "w", encoding="utf-8") as file:
+                file.write(report)
+            print(f"✓ Profile report written to {self.report_path}")
+
+    # ===== REPORT =====
+
+    def report(self, session_seconds=None):
+        """Return the summary report as text"""
+        busy = sum(total for _, total, _ in self.timings.values())
+        lines = ["=" * 60, "PROFILE REPORT", "=" * 60]
+        if session_seconds is not None:
+            lines.append(f"Session: {session_seconds:.3f} s, of which {busy:.3f} s in commands "
+                         "(time at input prompts excluded)")
+        lines.append(f"\n{'Command':<22}{'calls':>7}{'total ms':>12}{'mean ms':>11}{'max ms':>11}")
+        for name, (calls, total, slowest) in sorted(self.timings.items(),
+                                                    key=lambda item: item[1][1], reverse=True):
+            lines.append(f"{name:<22}{calls:>7}{total * 1000:>12.2f}"
+                         f"{total / calls * 1000:>11.2f}{slowest * 1000:>11.2f}")
+
+        if self._profiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*self._profiles.values(), stream=stream)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            lines.append("\nHottest functions (cProfile, all commands):")
+            lines.append(stream.getvalue().strip())
+
+        if self.allocations:
+            lines.append("\nTop allocation sites (tracemalloc):")
+            top = sorted(self.allocations.items(), key=lambda item: item[1], reverse=True)
+            for (site, name), size in top[:TOP_ALLOCATIONS]:
+                lines.append(f"  {size / 1024:>10.1f} KiB  {site}  ({name})")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script with per-command profiling")
+    parser.add_argument("script", help="script using operations.py, e.g. demo.py")
+    parser.add_argument("--report", default="-", help="report file (default: print it)")
+    parser.add_argument("--cprofile", action="store_true", help="also profile functions")
+    parser.add_argument("--tracemalloc", action="store_true", help="also track allocations")
+    args = parser.parse_args()
+
+    import operations  # not at the top: operations.py imports this module for --profile
+    profiler = Profiler(args.report, args.cprofile, args.tracemalloc)
+    profiler.install(operations)
+    sys.argv = [args.script]
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    finally:
+        profiler.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# query_cache.py - LRU cache of search results with write-aware invalidation
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from search_index import edit_distance, max_typos, tokenize
+
+CACHE_SIZE = 1024  # Most queries kept
+CACHE_TTL = 300.0  # Seconds a cached result may be served
+
+
+def cache_key(query, mode, limit=None):
+    """Normalize a query so equivalent searches share a cache entry
+
+    Token searches ignore case, punctuation, word order and repeated
+    words; substring searches only ignore case and surrounding spaces.
+    """
+    if mode == "substring":
+        return (mode, query.strip().lower(), None)
+    return (mode, " ".join(sorted(set(tokenize(query)))), limit)
+
+
+def _term_matches(term, tokens, fuzzy):
+    limit = max_typos(term)
+    for token in tokens:
+        if token.startswith(term):
+            return True
+        if fuzzy and edit_distance(term, token, limit) <= limit:
+            return True
+    return False
+
+
+def deletions(word, count):
+    """Return every string made by deleting up to `count` letters from word
+
+    Two words within `count` edits of each other always share at least
+    one of these (substituting a letter is one deletion on each side), so
+    they can be matched up by dictionary lookups instead of comparing
+    every pair.
+    """
+    variants = frontier = {word}
+    for _ in range(count):
+        frontier = {text[:i] + text[i + 1:] for text in frontier for i in range(len(text))}
+        variants = variants | frontier
+    return variants
+
+
+def key_matches(key, title, author, tokens):
+    """Could a book with this title/author (and its tokens) be in the key's results?"""
+    mode, text, _ = key
+    if mode == "substring":
+        return text in title.lower() or text in author.lower()
+    return all(_term_matches(term, tokens, mode == "fuzzy") for term in text.split())
+
+
+def _discard(groups, name, key):
+    # Remove key from groups[name], dropping the group once it is empty
+    group = groups.get(name)
+    if group is not None:
+        group.discard(key)
+        if not group:
+            del groups[name]
+
+
+class QueryCache:
+    """Bounded least-recently-used map of search key -> list of ISBNs
+
+    Only ISBNs are cached; the books themselves are looked up on every
+    hit, so borrows and returns never make an entry stale. Entries expire
+    after `ttl` seconds. When a book is added, deleted, or has its title
+    or author changed, only the entries whose query matched the book
+    before or after the change are dropped. To find them without looking
+    at every entry, the keys are indexed by their query terms (and fuzzy
+    terms also by their deletion variants, see deletions()); a change
+    only checks keys with a term that is a prefix of, or a few typos
+    away from, one of the book's words. Substring keys are few and cheap,
+    so they are checked one by one.
+
+    A search that ran while the catalog was changing is not stored,
+    because its result may already be out of date (see generation).
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (ISBN list, expiry time), oldest use first
+        self._by_term = {}  # query term -> keys with that term
+        self._by_variant = {}  # deletion variant of a fuzzy term -> fuzzy keys
+        self._scanned = set()  # substring keys and keys without terms
+        self._bulk = 0  # > 0 while bulk_change() is running
+        self.generation = 0  # bumped by every change that could alter a result
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached ISBN list for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, isbns, generation):
+        """Store a result computed when self.generation was `generation`"""
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            if key not in self._entries:
+                self._index(key)
+            self._entries[key] = (isbns, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_term.clear()
+            self._by_variant.clear()
+            self._scanned.clear()
+
+    @contextmanager
+    def bulk_change(self):
+        """Drop the whole cache once for a batch of changes (e.g. add_books)
+
+        Changes made inside the block are not checked one by one.
+        """
+        with self._lock:
+            self._bulk += 1
+            self.generation += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._bulk -= 1
+            self.clear()
+
+    def stats(self):
+        """Return the counters and current size as a dictionary"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "expirations": self.expirations,
+                    "invalidations": self.invalidations}
+
+    # ===== KEY INDEX =====
+
+    def _index(self, key):
+        # Caller holds self._lock
+        mode, text, _ = key
+        terms = text.split() if mode != "substring" else ()
+        if not terms:
+            self._scanned.add(key)
+        for term in terms:
+            self._by_term.setdefault(term, set()).add(key)
+            if mode == "fuzzy":
+                for variant in deletions(term, max_typos(term)):
+                    self._by_variant.setdefault(variant, set()).add(key)
+
+    def _unindex(self, key):
+        # Caller holds self._lock
+        mode, text, _ = key
+        terms = text.split() if mode != "substring" else ()
+        if not terms:
+            self._scanned.discard(key)
+        for term in terms:
+            _discard(self._by_term, term, key)
+            if mode == "fuzzy":
+                for variant in deletions(term, max_typos(term)):
+                    _discard(self._by_variant, variant, key)
+
+    def _drop(self, key):
+        # Caller holds self._lock
+        del self._entries[key]
+        self._unindex(key)
+
+    def _candidates(self, tokens):
+        # Caller holds self._lock. Keys that might match a book with these
+        # tokens; key_matches() decides.
+        found = set(self._scanned)
+        for token in tokens:
+            for end in range(1, len(token) + 1):
+                found.update(self._by_term.get(token[:end], ()))
+            if self._by_variant:
+                for variant in deletions(token, 2):
+                    found.update(self._by_variant.get(variant, ()))
+        return found
+
+    # ===== INVALIDATION =====
+
+    def _invalidate(self, versions):
+        # versions: (title, author) pairs the book had before/after the change
+        with self._lock:
+            self.generation += 1
+            if not self._entries or self._bulk:
+                return
+        checks = [(title, author, set(tokenize(f"{title} {author}"))) for title, author in versions]
+        with self._lock:
+            stale = set()
+            for check in checks:
+                stale.update(key for key in self._candidates(check[2])
+                             if key in self._entries and key_matches(key, *check))
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+
+    def on_change(self, action, book, previous):
+        """CatalogStore watcher that drops results the change could affect"""
+        if action in ("insert", "delete"):
+            self._invalidate([(book["title"], book["author"])])
+        elif action == "update":
+            if "title" in previous or "author" in previous:
+                self._invalidate([
+                    (previous.get("title", book["title"]), previous.get("author", book["author"])),
+                    (book["title"], book["author"]),
+                ])
+        elif action == "clear":
+            self.clear()
@@ -0,0 +1,120 @@
+# records.py - Compact record classes for books and members
+#
+# Book and Member store their fields in __slots__ instead of a per-record
+# dictionary, which makes each record several times smaller. They still
+# behave like the dictionaries the rest of the system was written for:
+# book["title"], dict(book), book == {...} all work.
+#
+# Assigning to a field (book["available_copies"] -= 1) or changing
+# member["borrowed_books"] in place only changes the record: the store
+# and the indexes built on it (search, genre totals, borrowers, listing
+# orders) are not told. Make changes through library.py (borrow_book,
+# update_book, ...) or CatalogStore.update() instead.
+
+VALID_GENRES = ("Fiction", "Non-Fiction", "Sci-Fi")  # Tuple of valid genres
+
+# Every record of a genre shares the one string object from VALID_GENRES
+_GENRES = {genre: genre for genre in VALID_GENRES}
+
+
+class Record:
+    """Base class giving __slots__ records a dictionary interface"""
+
+    __slots__ = ()
+    FIELDS = ()  # field names, in the order the old dictionaries used
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a dictionary (or another record)"""
+        return cls(*[data[field] for field in cls.FIELDS])
+
+    def to_dict(self):
+        """Return the record as a plain dictionary"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def copy(self):
+        """Return a shallow copy of the record"""
+        return type(self).from_dict(self)
+
+    # ===== DICTIONARY INTERFACE =====
+
+    def __getitem__(self, field):
+        if field not in self._field_set:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in self._field_set:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def get(self, field, default=None):
+        if field not in self._field_set:
+            return default
+        return getattr(self, field)
+
+    def keys(self):
+        return self.FIELDS
+
+    def values(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __contains__(self, field):
+        return field in self._field_set
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # mutable, like the dictionaries it replaces
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Book(Record):
+    """A book in the catalog"""
+
+    FIELDS = ("isbn", "title", "author", "genre", "total_copies", "available_copies")
+    __slots__ = FIELDS
+    _field_set = frozenset(FIELDS)
+
+    def __init__(self, isbn, title, author, genre, total_copies, available_copies=None):
+        self.isbn = isbn
+        self.title = title
+        self.author = author
+        self.genre = _GENRES.get(genre, genre)
+        self.total_copies = total_copies
+        self.available_copies = total_copies if available_copies is None else available_copies
+
+    def __setitem__(self, field, value):
+        if field == "genre":
+            value = _GENRES.get(value, value)
+        Record.__setitem__(self, field, value)
+
+
+class Member(Record):
+    """A registered library member"""
+
+    FIELDS = ("id", "name", "email", "contact", "borrowed_books")
+    __slots__ = FIELDS
+    _field_set = frozenset(FIELDS)
+
+    def __init__(self, id, name, email, contact, borrowed_books=None):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.contact = contact
+        self.borrowed_books = [] if borrowed_books is None else list(borrowed_books)
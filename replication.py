@@ -0,0 +1,432 @@
+# replication.py - Read replicas that follow the primary's change log
+#
+# Usage:
+#     python server.py --primary /tmp/library.sock                 (reads and writes)
+#     python server.py --port 8471 --replica-of /tmp/library.sock  (reads only)
+#
+# The primary publishes every change as an event (see events.py) and
+# ships the events over a Unix socket as JSON lines. A replica process
+# starts from a copy of the primary's state, then applies each change
+# to its own library.py with library.apply_mutation, so its search and
+# genre indexes are kept up to date locally and searches never wait for
+# the primary's writes.
+#
+# Replicas confirm how far they have got after each batch, so the
+# primary knows each replica's lag in changes and in seconds (status()).
+# The primary keeps the latest `capacity` events in memory. A replica
+# that joins, or reconnects after losing the primary, resumes from the
+# last change it applied if that is still kept; otherwise it is sent a
+# fresh copy of the state (re-exported once `refresh_every` changes have
+# happened since the last copy) and continues from there.
+#
+# Run "python replication.py" for a self-check with two replica processes.
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from functools import partial
+
+import events
+import library
+
+REPLICATION_LOG_SIZE = 1_000_000  # Events the primary keeps for replicas
+BATCH_SIZE = 1000  # Events sent before asking the replica to confirm
+RECONNECT_DELAY = 0.5  # Seconds a replica waits before trying the primary again
+
+
+def _to_json(value):
+    # Book/Member records
+    return value.to_dict()
+
+
+def mutation_of(event):
+    """Return (op, data) for library.apply_mutation from a change event"""
+    fields = event._asdict()
+    del fields["seq"]
+    at = fields.pop("at")
+    if event.op in ("update_book", "update_member"):
+        changes = fields.pop("changes")
+        return event.op, {**fields, **changes}
+    if event.op in ("borrow_book", "place_hold"):
+        return event.op, {**fields, "now": at}
+    if event.op == "return_book":
+        # Holds filled by the primary arrive as their own events
+        return event.op, {**fields, "now": at, "fill_holds": False}
+    return event.op, fields
+
+
+class Primary:
+    """Publishes library changes to replicas over a Unix socket"""
+
+    def __init__(self, socket_path, capacity=REPLICATION_LOG_SIZE, refresh_every=None):
+        self.socket_path = socket_path
+        self.capacity = capacity
+        # Changes after which a joining replica gets a newly exported state;
+        # well inside capacity, so the events after a copy are still kept
+        self.refresh_every = refresh_every or max(1, capacity // 2)
+        self.epoch = uuid.uuid4().hex  # replicas only resume with the primary they followed
+        self.bus = None
+        self._base = None  # (seq, JSON of the state after change seq), for joining replicas
+        self._base_lock = threading.Lock()
+        self._published = [0.0] * capacity  # publish time of event n at n % capacity
+        self._changed = threading.Condition()
+        self._stopping = False
+        self._listener = None
+        self._replicas = {}  # replica number -> {"acked": seq, "lag_seconds": ...}
+        self._connections = []
+
+    # ===== STARTUP AND SHUTDOWN =====
+
+    def start(self):
+        """Start publishing changes and accepting replicas"""
+        self.bus = events.EventBus(self.capacity)
+        self.bus.subscribe(self._on_event)
+        self.bus.attach()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self):
+        """Stop publishing and disconnect the replicas"""
+        self.bus.detach()
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        self._listener.close()
+        for connection in self._connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _on_event(self, event):
+        # Bus subscriber; runs while the bus lock is held
+        self._published[event.seq % self.capacity] = time.time()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _base_state(self, at_least=0):
+        """Return (seq, state JSON) for a replica starting from a copy
+
+        The copy is taken after change `at_least` or later, for a replica
+        that could not apply that change.
+        """
+        with self._base_lock:
+            if (self._base is None or self._base[0] < at_least
+                    or self.bus.last_seq - self._base[0] >= self.refresh_every):
+                # Every change is made and published under its circulation
+                # locks, so with all of them held none is half-way through
+                # and the copy is exactly the state after bus.last_seq
+                with library.circulation_locks.hold_all():
+                    self._base = (self.bus.last_seq,
+                                  json.dumps(library.export_state(), separators=(",", ":"),
+                                             default=_to_json))
+            return self._base
+
+    # ===== SHIPPING =====
+
+    def _accept_loop(self):
+        number = 0
+        while True:
+            try:
+                connection, _ = self._listener.accept()
+            except OSError:
+                return  # listener closed by stop()
+            number += 1
+            self._connections.append(connection)
+            threading.Thread(target=self._ship, args=(number, connection), daemon=True).start()
+
+    def _send_base(self, connection, at_least=0):
+        seq, state = self._base_state(at_least)
+        connection.sendall(f'{{"seq":{seq},"epoch":"{self.epoch}","state":{state}}}\n'.encode())
+        return seq
+
+    def _ship(self, number, connection):
+        # Bring one replica up to date, then send it every event as it happens
+        reader = connection.makefile("r", encoding="utf-8")
+        try:
+            hello = json.loads(reader.readline())
+            position = hello.get("from_seq", 0)
+            if (hello.get("epoch") == self.epoch
+                    and self.bus.first_seq - 1 <= position <= self.bus.last_seq):
+                connection.sendall(f'{{"resume":{position}}}\n'.encode())
+            else:
+                position = self._send_base(connection, hello.get("failed_seq", 0))
+            self._replicas[number] = {"acked": position, "lag_seconds": None}
+            while True:
+                with self._changed:
+                    while self.bus.last_seq <= position and not self._stopping:
+                        self._changed.wait()
+                    if self._stopping:
+                        return
+                try:
+                    batch = self.bus.since(position, BATCH_SIZE)
+                except events.EventsLost:
+                    # Fell too far behind: start it again from a fresh copy
+                    position = self._send_base(connection)
+                    continue
+                lines = []
+                for event in batch:
+                    op, data = mutation_of(event)
+                    lines.append(json.dumps({"seq": event.seq, "op": op, "data": data,
+                                             "published": self._published[event.seq % self.capacity]},
+                                            separators=(",", ":"), default=_to_json))
+                position = batch[-1].seq
+                lines.append(json.dumps({"sync": position}))
+                connection.sendall(("\n".join(lines) + "\n").encode())
+                self._record_ack(number, json.loads(reader.readline())["ack"])
+        except (OSError, ValueError):
+            pass  # replica gone; it reconnects and resumes
+        finally:
+            self._replicas.pop(number, None)
+            reader.close()
+            connection.close()
+
+    def _record_ack(self, number, seq):
+        self._replicas[number] = {
+            "acked": seq,
+            "lag_seconds": time.time() - self._published[seq % self.capacity],
+        }
+
+    def status(self):
+        """Return {replica number: {"acked", "behind", "lag_seconds"}}
+
+        "behind" is how many changes the replica has not confirmed yet;
+        "lag_seconds" is how long its last confirmed change took to be
+        applied there after it happened here.
+        """
+        last = self.bus.last_seq
+        return {number: {**replica, "behind": last - replica["acked"]}
+                for number, replica in list(self._replicas.items())}
+
+
+class Replica:
+    """Follows a primary and applies its changes to this process's library
+
+    Changes are applied by calling dispatch(function, message); the
+    default runs it at once on the replica's thread. server.py passes a
+    dispatcher that runs it on the asyncio loop instead, so requests and
+    changes never run at the same time.
+
+    If the primary goes away the replica keeps trying to reconnect, every
+    RECONNECT_DELAY seconds. `connected` is False until it has caught up
+    with a primary and while it has none, so callers can stop serving
+    data that is no longer being kept up to date. on_status(message) is
+    told when the connection is made or lost. A change that cannot be
+    applied here also counts as losing the primary: the replica
+    reconnects and loads a copy of the state taken after that change.
+    """
+
+    def __init__(self, socket_path, dispatch=None, on_status=None):
+        self.socket_path = socket_path
+        self.dispatch = dispatch or (lambda function, message: function(message))
+        self.on_status = on_status or (lambda message: None)
+        self.connected = False
+        self.epoch = None  # the primary whose changes have been applied
+        self._failed_seq = 0  # a change that could not be applied here, until reloaded
+        self.applied_seq = 0
+        self.lag_seconds = None  # time from the primary's change to applying it here
+        self._applied = threading.Condition()
+        self._dispatched = self._done = 0  # messages handed to dispatch / applied
+        self._socket = None
+        self._stopping = False
+
+    def start(self):
+        """Start following the primary (connecting in the background)"""
+        threading.Thread(target=self._follow, daemon=True).start()
+
+    def stop(self):
+        self._stopping = True
+        self.connected = False
+        if self._socket is not None:
+            self._socket.close()
+
+    def _follow(self):
+        while not self._stopping:
+            try:
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._socket.connect(self.socket_path)
+                hello = {"from_seq": self.applied_seq, "epoch": self.epoch,
+                         "failed_seq": self._failed_seq}
+                self._socket.sendall((json.dumps(hello) + "\n").encode())
+                self._stream()
+            except (OSError, ValueError):
+                pass
+            self._socket.close()
+            if self.connected:
+                self.connected = False
+                self.on_status(f"✗ Lost the primary at {self.socket_path}; reconnecting")
+            if not self._stopping:
+                time.sleep(RECONNECT_DELAY)
+
+    def _stream(self):
+        # Apply messages until the primary closes the connection
+        reader = self._socket.makefile("r", encoding="utf-8")
+        for line in reader:
+            message = json.loads(line)
+            if "sync" in message:
+                # Confirm once everything before it has been applied
+                self._wait_applied(self._dispatched)
+                self._socket.sendall(f'{{"ack":{message["sync"]}}}\n'.encode())
+            elif "resume" in message:
+                self._set_connected()
+            else:
+                self._dispatched += 1
+                self.dispatch(partial(self._apply, self._socket), message)
+
+    def _set_connected(self):
+        if not self.connected:
+            self.connected = True
+            self.on_status(f"✓ Following the primary at {self.socket_path}")
+
+    def _apply(self, connection, message):
+        applied = False
+        try:
+            if "state" in message:
+                library.restore_state(message["state"])
+                self.epoch = message["epoch"]
+                self._failed_seq = 0
+            else:
+                library.apply_mutation(message["op"], message["data"])
+                self.lag_seconds = time.time() - message["published"]
+            applied = True
+        except Exception as e:
+            # This copy no longer matches the primary: stop serving it and
+            # reconnect for a fresh copy of the state
+            self.epoch = None
+            self._failed_seq = message["seq"]
+            if self.connected:
+                self.connected = False
+                self.on_status(f"✗ Change {message['seq']} ({message.get('op', 'state')}) "
+                               f"could not be applied: {e}; reloading from the primary")
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        finally:
+            # Counted either way, so a pending confirmation is never stuck
+            with self._applied:
+                if applied:
+                    self.applied_seq = message["seq"]
+                self._done += 1
+                self._applied.notify_all()
+        if applied and "state" in message:
+            self._set_connected()
+
+    def _wait_applied(self, count):
+        with self._applied:
+            self._applied.wait_for(lambda: self._done >= count)
+
+    def wait_for(self, seq, timeout=None):
+        """Wait until change `seq` has been applied here; False on timeout"""
+        with self._applied:
+            return self._applied.wait_for(lambda: self.applied_seq >= seq, timeout)
+
+
+# ===== SELF-CHECK =====
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _ask(port, op, **args):
+    # One request to a server.py process
+    with socket.create_connection(("127.0.0.1", port)) as connection:
+        connection.sendall((json.dumps({"id": 1, "op": op, "args": args}) + "\n").encode())
+        return json.loads(connection.makefile("r", encoding="utf-8").readline())
+
+
+def _self_check():
+    import tempfile
+    socket_path = os.path.join(tempfile.mkdtemp(), "library.sock")
+    here = os.path.dirname(os.path.abspath(__file__))
+    library.add_book("REP-0", "Replicated Start", "Rep Author", "Fiction", 1)
+    # A small log, so replicas joining late must start from a refreshed copy
+    primary = Primary(socket_path, capacity=64)
+    primary.start()
+    ports = [_free_port(), _free_port()]
+    replicas = [subprocess.Popen([sys.executable, "server.py", "--port", str(port),
+                                  "--replica-of", socket_path],
+                                 cwd=here, stdout=subprocess.DEVNULL)
+                for port in ports]
+    deadline = time.time() + 30
+
+    def wait_until(check, message):
+        while True:
+            try:
+                if check():
+                    return
+            except (OSError, KeyError, TypeError):
+                pass  # replica still starting
+            assert time.time() < deadline, message
+            time.sleep(0.01)
+
+    def caught_up():
+        status = primary.status()
+        return len(status) == len(ports) and not any(r["behind"] for r in status.values())
+
+    try:
+        library.add_member("REP-M1", "Rep Member", "rep@email.com", "0")
+        for i in range(1, 200):
+            library.add_book(f"REP-{i}", f"Replicated Title {i}", "Rep Author", "Fiction", 2)
+        library.borrow_book("REP-M1", "REP-7")
+        library.update_book("REP-3", title="Renamed On Primary")
+
+        for port in ports:
+            wait_until(lambda: len(_ask(port, "search_books", query="replicated")["result"]) == 199
+                       and _ask(port, "get_book", isbn="REP-7")["result"]["available_copies"] == 1,
+                       "Replica did not catch up")
+            write = _ask(port, "add_book", isbn="X", title="X", author="X", genre="Fiction",
+                         total_copies=1)
+            assert write["error"] == "UnknownOperation", "Replicas should refuse writes"
+
+        wait_until(caught_up, "Replicas did not confirm every change")
+        # Once caught up, the lag of a single change
+        library.return_book("REP-M1", "REP-7")
+        wait_until(caught_up, "Replicas did not confirm every change")
+        for number, replica in sorted(primary.status().items()):
+            print(f"  replica {number}: confirmed change {replica['acked']}, "
+                  f"lag {replica['lag_seconds'] * 1000:.1f} ms")
+
+        # A change a replica cannot apply makes it reload a copy taken after it
+        library._record("cancel_hold", member_id="REP-M1", isbn="REP-MISSING")
+        library.add_book("REP-AFTER", "Added After The Failure", "Rep Author", "Fiction", 1)
+        for port in ports:
+            wait_until(lambda: _ask(port, "get_book", isbn="REP-AFTER")["ok"],
+                       "Replica should reload after a change it could not apply")
+        wait_until(caught_up, "Replicas did not confirm every change after reloading")
+
+        # Without a primary, replicas stop answering; they rejoin a new one
+        primary.stop()
+        for port in ports:
+            wait_until(lambda: _ask(port, "get_book", isbn="REP-0")["error"] == "Unavailable",
+                       "Replica should stop serving once the primary is gone")
+        primary = Primary(socket_path, capacity=64)
+        primary.start()
+        library.delete_book("REP-0")
+        for port in ports:
+            wait_until(lambda: _ask(port, "get_book", isbn="REP-0")["error"] == "NotFoundError",
+                       "Replica should follow the new primary")
+    finally:
+        for replica in replicas:
+            replica.terminate()
+            replica.wait()
+        primary.stop()
+    print("✓ Replication self-check passed")
+
+
+if __name__ == "__main__":
+    _self_check()
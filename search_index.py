@@ -0,0 +1,233 @@
+# search_index.py - Inverted token index for searching books by title or author
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")  # Runs of letters/digits
+FUZZY_LIMIT = 20  # Results returned by a fuzzy search
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(token):
+    """Return the set of 3-letter pieces of a token, padded at both ends"""
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(term):
+    """Edits allowed for a query term: 1 for short words, 2 for longer ones"""
+    return 1 if len(term) <= 4 else 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 if it is larger
+
+    Stops as soon as every entry of a row is over the limit, so checking a
+    word that is far away costs little.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class SearchIndex:
+    """Inverted index from title/author tokens to book ISBNs
+
+    Each token maps to a posting set of ISBNs. A sorted list of all tokens
+    lets a query term match every token it is a prefix of ("pott" finds
+    "potter") with a binary search. Multi-term queries are AND-ed:
+    a book must match every term, in its title or its author.
+
+    For typo-tolerant searches every distinct token is also indexed by its
+    trigrams. A misspelt term only has to be compared with tokens sharing
+    enough trigrams with it, not with the whole vocabulary.
+
+    The index is kept up to date by watching a CatalogStore (see
+    CatalogStore.watch), so it follows add/update/delete of books.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # books with different ISBNs may change at once
+        self.postings = {}  # token -> set of ISBNs
+        self.sorted_tokens = []  # all tokens, sorted, for prefix lookups
+        self.trigram_tokens = {}  # trigram -> set of tokens containing it
+        self._book_tokens = {}  # ISBN -> tokens indexed for that book
+        self._order = {}  # ISBN -> insertion number, to keep catalog order
+        self._next_order = 0
+
+    # ===== MAINTENANCE =====
+
+    def add(self, book):
+        """Index a book's title and author"""
+        isbn = book["isbn"]
+        tokens = set(tokenize(f"{book['title']} {book['author']}"))
+        self._book_tokens[isbn] = tokens
+        if isbn not in self._order:
+            self._order[isbn] = self._next_order
+            self._next_order += 1
+
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = {isbn}
+                insort(self.sorted_tokens, token)
+                for gram in trigrams(token):
+                    self.trigram_tokens.setdefault(gram, set()).add(token)
+            else:
+                posting.add(isbn)
+
+    def remove(self, isbn, keep_order=False):
+        """Drop a book from the index"""
+        tokens = self._book_tokens.pop(isbn, ())
+        if not keep_order:
+            self._order.pop(isbn, None)
+
+        for token in tokens:
+            posting = self.postings[token]
+            posting.discard(isbn)
+            if not posting:
+                del self.postings[token]
+                del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+                for gram in trigrams(token):
+                    tokens_with_gram = self.trigram_tokens[gram]
+                    tokens_with_gram.discard(token)
+                    if not tokens_with_gram:
+                        del self.trigram_tokens[gram]
+
+    def clear(self):
+        """Empty the index"""
+        self.postings.clear()
+        self.sorted_tokens.clear()
+        self.trigram_tokens.clear()
+        self._book_tokens.clear()
+        self._order.clear()
+
+    def on_change(self, action, book, previous):
+        """CatalogStore watcher that keeps the index in sync"""
+        with self._lock:
+            if action == "insert":
+                self.add(book)
+            elif action == "delete":
+                self.remove(book["isbn"])
+            elif action == "update":
+                # Only title and author are indexed
+                if "title" in previous or "author" in previous:
+                    self.remove(book["isbn"], keep_order=True)
+                    self.add(book)
+            elif action == "clear":
+                self.clear()
+
+    # ===== QUERIES =====
+
+    def prefix_matches(self, term):
+        """Return the set of ISBNs having a token that starts with term"""
+        start = bisect_left(self.sorted_tokens, term)
+        matches = set()
+        for i in range(start, len(self.sorted_tokens)):
+            token = self.sorted_tokens[i]
+            if not token.startswith(term):
+                break
+            matches |= self.postings[token]
+        return matches
+
+    def search(self, query):
+        """Return ISBNs matching every term of the query, in catalog order
+
+        An empty query matches every book, like the substring search did.
+        """
+        with self._lock:
+            return self._search(query)
+
+    def _search(self, query):
+        terms = set(tokenize(query))
+        if not terms:
+            return sorted(self._book_tokens, key=self._order.__getitem__)
+
+        result = None
+        # Longer terms are usually more selective, so intersect them first
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self.prefix_matches(term)
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+        return sorted(result, key=self._order.__getitem__)
+
+    def similar_tokens(self, term):
+        """Return {token: edits} for indexed tokens close to the term
+
+        Tokens the term is a prefix of count as 0 edits. Otherwise a token
+        needs to be within max_typos(term) edits. Each edit changes at
+        most 3 trigrams, so tokens sharing fewer trigrams than that allows
+        are skipped without computing the distance.
+        """
+        limit = max_typos(term)
+        found = {}
+        start = bisect_left(self.sorted_tokens, term)
+        for i in range(start, len(self.sorted_tokens)):
+            token = self.sorted_tokens[i]
+            if not token.startswith(term):
+                break
+            found[token] = 0
+
+        term_grams = trigrams(term)
+        shared = {}
+        for gram in term_grams:
+            for token in self.trigram_tokens.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        needed = max(1, len(term_grams) - 3 * limit)
+        for token, count in shared.items():
+            if count >= needed and token not in found:
+                distance = edit_distance(term, token, limit)
+                if distance <= limit:
+                    found[token] = distance
+        return found
+
+    def fuzzy_search(self, query, limit=FUZZY_LIMIT):
+        """Return up to `limit` ISBNs matching every term, allowing typos
+
+        Books are ranked by the total number of edits needed to match the
+        query (exact and prefix matches first), then by catalog order.
+        """
+        return [isbn for _, isbn in self.fuzzy_scores(query, limit)]
+
+    def fuzzy_scores(self, query, limit=FUZZY_LIMIT):
+        """Like fuzzy_search, but return (edits, ISBN) pairs"""
+        with self._lock:
+            return self._fuzzy_scores(query, limit)
+
+    def _fuzzy_scores(self, query, limit):
+        terms = set(tokenize(query))
+        if not terms:
+            return [(0, isbn) for isbn in self._search(query)[:limit]]
+
+        scores = None  # ISBN -> total edits over the terms so far
+        for term in sorted(terms, key=len, reverse=True):
+            best = {}  # ISBN -> fewest edits for this term
+            for token, distance in self.similar_tokens(term).items():
+                for isbn in self.postings[token]:
+                    if scores is None or isbn in scores:
+                        if distance < best.get(isbn, distance + 1):
+                            best[isbn] = distance
+            if scores is not None:
+                for isbn in best:
+                    best[isbn] += scores[isbn]
+            scores = best
+            if not scores:
+                return []
+        best = heapq.nsmallest(limit, scores, key=lambda isbn: (scores[isbn], self._order[isbn]))
+        return [(scores[isbn], isbn) for isbn in best]
@@ -0,0 +1,340 @@
+# secondary_index.py - Books by genre and by author, with running copy counts,
+# current borrowers per book, and listing orders kept sorted
+
+import threading
+from bisect import bisect_left, insort
+
+from records import VALID_GENRES
+from search_index import tokenize
+
+ORDER_CHUNK_SIZE = 1000  # Largest piece a sorted listing order is kept in
+
+
+def normalize_author(author):
+    """Author name as an index key: "J.K. Rowling" and "j. k.  rowling" match"""
+    return " ".join(tokenize(author))
+
+
+class GenreAuthorIndex:
+    """Secondary indexes over the catalog, kept up to date by watching it
+
+    Books are grouped by genre and by normalized author name. Each genre
+    also keeps running totals (titles, total copies, available copies and
+    titles with at least one copy available) so dashboard questions like
+    "how many Sci-Fi books are available" are answered in constant time.
+    The totals follow borrow/return because those change available_copies
+    through CatalogStore.update(); a value assigned straight to a record
+    is not seen (see records.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # borrows on different books may run at once
+        self.clear()
+
+    # ===== MAINTENANCE =====
+
+    def clear(self):
+        """Empty the index"""
+        # Dictionaries with None values act as insertion-ordered sets
+        self.by_genre = {genre: {} for genre in VALID_GENRES}
+        self.by_author = {}
+        self.stats = {genre: {"titles": 0, "total_copies": 0, "available_copies": 0,
+                              "titles_available": 0} for genre in VALID_GENRES}
+
+    def _count(self, genre, total, available, sign):
+        stats = self.stats.setdefault(genre, {"titles": 0, "total_copies": 0,
+                                              "available_copies": 0, "titles_available": 0})
+        stats["titles"] += sign
+        stats["total_copies"] += sign * total
+        stats["available_copies"] += sign * available
+        if available > 0:
+            stats["titles_available"] += sign
+
+    def _add_member(self, groups, key, isbn):
+        groups.setdefault(key, {})[isbn] = None
+
+    def _remove_member(self, groups, key, isbn):
+        group = groups.get(key)
+        if group is not None:
+            group.pop(isbn, None)
+            if not group and key not in VALID_GENRES:
+                del groups[key]
+
+    def on_change(self, action, book, previous):
+        """CatalogStore watcher that keeps the index in sync"""
+        with self._lock:
+            if action == "insert":
+                isbn = book["isbn"]
+                self._add_member(self.by_genre, book["genre"], isbn)
+                self._add_member(self.by_author, normalize_author(book["author"]), isbn)
+                self._count(book["genre"], book["total_copies"], book["available_copies"], 1)
+            elif action == "delete":
+                isbn = book["isbn"]
+                self._remove_member(self.by_genre, book["genre"], isbn)
+                self._remove_member(self.by_author, normalize_author(book["author"]), isbn)
+                self._count(book["genre"], book["total_copies"], book["available_copies"], -1)
+            elif action == "update":
+                self._update(book, previous)
+            elif action == "clear":
+                self.clear()
+
+    def _update(self, book, previous):
+        isbn = book["isbn"]
+        old_genre = previous.get("genre", book["genre"])
+        if ("genre" in previous or "total_copies" in previous
+                or "available_copies" in previous):
+            self._count(old_genre, previous.get("total_copies", book["total_copies"]),
+                        previous.get("available_copies", book["available_copies"]), -1)
+            self._count(book["genre"], book["total_copies"], book["available_copies"], 1)
+        if old_genre != book["genre"]:
+            self._remove_member(self.by_genre, old_genre, isbn)
+            self._add_member(self.by_genre, book["genre"], isbn)
+        if "author" in previous:
+            old_key = normalize_author(previous["author"])
+            new_key = normalize_author(book["author"])
+            if old_key != new_key:
+                self._remove_member(self.by_author, old_key, isbn)
+                self._add_member(self.by_author, new_key, isbn)
+
+    # ===== QUERIES =====
+
+    def genre_stats(self, genre):
+        """Return a copy of the running totals for one genre"""
+        return dict(self.stats[genre])
+
+    def isbns_in_genre(self, genre):
+        """Return the ISBNs of a genre, in the order they were added"""
+        return list(self.by_genre.get(genre, ()))
+
+    def isbns_by_author(self, author):
+        """Return the ISBNs of an author's books, in the order they were added"""
+        return list(self.by_author.get(normalize_author(author), ()))
+
+    def count_by_author(self, author):
+        """Return how many titles an author has"""
+        return len(self.by_author.get(normalize_author(author), ()))
+
+
+class BorrowerIndex:
+    """ISBN -> members currently holding a copy, kept in step with loans
+
+    library.py updates it under the circulation locks whenever a copy is
+    lent or taken back, and watches the member store so members added
+    with borrowed books (e.g. from a snapshot) or deleted are reflected.
+    A member holding two copies of a book is counted twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Empty the index"""
+        self.holders = {}  # ISBN -> {member ID: copies held}, in borrow order
+
+    def add(self, isbn, member_id):
+        """Record that a member now holds one more copy of a book"""
+        with self._lock:
+            held = self.holders.setdefault(isbn, {})
+            held[member_id] = held.get(member_id, 0) + 1
+
+    def remove(self, isbn, member_id):
+        """Record that a member gave back one copy of a book"""
+        with self._lock:
+            held = self.holders.get(isbn)
+            if held is None or member_id not in held:
+                return
+            held[member_id] -= 1
+            if not held[member_id]:
+                del held[member_id]
+                if not held:
+                    del self.holders[isbn]
+
+    def on_change(self, action, member, previous):
+        """Member-store watcher for members added or deleted with borrowed books"""
+        if action == "insert":
+            for isbn in member["borrowed_books"]:
+                self.add(isbn, member["id"])
+        elif action == "delete":
+            for isbn in member["borrowed_books"]:
+                self.remove(isbn, member["id"])
+        elif action == "clear":
+            with self._lock:
+                self.clear()
+
+    # ===== QUERIES =====
+
+    def holders_of(self, isbn):
+        """Return the IDs of members holding the book, in the order they borrowed it"""
+        with self._lock:
+            return list(self.holders.get(isbn, ()))
+
+    def inconsistencies(self, members):
+        """Compare the index with the members' borrowed lists
+
+        Returns a list of (ISBN, member ID, copies in index, copies in the
+        member's borrowed_books); empty when they agree.
+        """
+        expected = {}
+        for member in members:
+            for isbn in member["borrowed_books"]:
+                key = (isbn, member["id"])
+                expected[key] = expected.get(key, 0) + 1
+        with self._lock:
+            indexed = {(isbn, member_id): copies for isbn, held in self.holders.items()
+                       for member_id, copies in held.items()}
+        return [(isbn, member_id, indexed.get((isbn, member_id), 0), expected.get((isbn, member_id), 0))
+                for isbn, member_id in sorted(indexed.keys() | expected.keys())
+                if indexed.get((isbn, member_id)) != expected.get((isbn, member_id))]
+
+    def rebuild(self, members):
+        """Rebuild the index from the members' borrowed lists"""
+        with self._lock:
+            self.clear()
+        for member in members:
+            for isbn in member["borrowed_books"]:
+                self.add(isbn, member["id"])
+
+
+class StoreOrder:
+    """The keys of a CatalogStore in store order, for paging by position
+
+    The key list is built on first use and then kept: inserts are
+    appended, and only a delete (or clear) drops it to be rebuilt. So a
+    page at any offset is a slice, not a walk over every earlier record.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._keys = None  # list of record keys, or None until needed
+        store.watch(self.on_change)
+
+    def on_change(self, action, record, previous):
+        """CatalogStore watcher"""
+        with self._lock:
+            if self._keys is None or action == "update":
+                return
+            if action == "insert":
+                self._keys.append(record[self.store.key_field])
+            else:
+                self._keys = None
+
+    def keys(self, offset=0, count=None):
+        """Return up to `count` record keys from position `offset` (all if None)"""
+        with self._lock:
+            if self._keys is None:
+                self._keys = list(self.store.keys())
+            end = None if count is None else offset + count
+            return self._keys[offset:end]
+
+
+class SortedChunks:
+    """A sorted list kept as consecutive sorted pieces of bounded size
+
+    Adding or removing an entry shifts only the entries of one piece
+    (at most ORDER_CHUNK_SIZE), not the whole list, so the cost of an
+    update does not grow with the catalog.
+    """
+
+    def __init__(self, entries=()):
+        # entries must already be sorted; pieces start half full
+        half = ORDER_CHUNK_SIZE // 2
+        self._chunks = [entries[i:i + half] for i in range(0, len(entries), half)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]  # last entry of each piece
+
+    def add(self, entry):
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            return
+        i = min(bisect_left(self._maxes, entry), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        insort(chunk, entry)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > ORDER_CHUNK_SIZE:
+            half = len(chunk) // 2
+            self._chunks[i:i + 1] = [chunk[:half], chunk[half:]]
+            self._maxes[i:i + 1] = [chunk[half - 1], chunk[-1]]
+
+    def remove(self, entry):
+        i = bisect_left(self._maxes, entry)
+        chunk = self._chunks[i]
+        del chunk[bisect_left(chunk, entry)]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+
+    def slice(self, offset=0, count=None):
+        """Return up to `count` entries from position `offset` (all if None)"""
+        found = []
+        for chunk in self._chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            found.extend(chunk[offset:])
+            offset = 0
+            if count is not None and len(found) >= count:
+                return found[:count]
+        return found
+
+
+class SortedOrder:
+    """The keys of a CatalogStore kept sorted by sort_key(record)
+
+    Built with one sort on first use; after that each insert, delete or
+    update moves only the records it touches within one piece of a
+    SortedChunks, so neither a sorted page nor a borrow re-sorts or
+    shifts the whole catalog. sort_key must end with the record key so
+    entries are unique.
+    """
+
+    def __init__(self, store, sort_key):
+        self.store = store
+        self.sort_key = sort_key
+        self._lock = threading.Lock()  # borrows on different books may run at once
+        self._sorted = None  # SortedChunks of (sort key, record key), or None until needed
+        self._entries = {}  # record key -> its entry in _sorted
+        store.watch(self.on_change)
+
+    def on_change(self, action, record, previous):
+        """CatalogStore watcher"""
+        with self._lock:
+            if self._sorted is None:
+                return
+            if action == "clear":
+                self._sorted = None
+                self._entries = {}
+                return
+            key = record[self.store.key_field]
+            if action == "insert":
+                self._add(key, (self.sort_key(record), key))
+            elif action == "delete":
+                self._remove(key)
+            elif action == "update":
+                entry = (self.sort_key(record), key)
+                if entry != self._entries.get(key):
+                    self._remove(key)
+                    self._add(key, entry)
+
+    def _add(self, key, entry):
+        self._entries[key] = entry
+        self._sorted.add(entry)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._sorted.remove(entry)
+
+    def keys(self, offset=0, count=None):
+        """Return up to `count` record keys in sorted order from position `offset`"""
+        with self._lock:
+            if self._sorted is None:
+                key_field = self.store.key_field
+                entries = sorted((self.sort_key(record), record[key_field])
+                                 for record in self.store)
+                self._entries = {entry[1]: entry for entry in entries}
+                self._sorted = SortedChunks(entries)
+            return [key for _, key in self._sorted.slice(offset, count)]
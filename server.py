@@ -0,0 +1,194 @@
+# server.py - asyncio network service for the library
+#
+# Usage: python server.py [--host 127.0.0.1] [--port 8470] [--data DIR]
+#                         [--primary SOCKET | --replica-of SOCKET]
+#
+# Protocol: line-delimited JSON over TCP. Each request is one line
+#     {"id": 1, "op": "borrow_book", "args": {"member_id": "M001", "isbn": "..."}}
+# and gets exactly one response line, in the same order as the requests
+#     {"id": 1, "ok": true, "result": {...}}
+#     {"id": 1, "ok": false, "error": "UnavailableError", "message": "No copies available"}
+#
+# Clients may pipeline: send many requests without waiting for answers.
+# When a client stops reading its responses, the server stops reading its
+# requests (backpressure through writer.drain()) instead of buffering
+# without limit.
+#
+# With --primary the server also ships its changes to read replicas over
+# a Unix socket; a server started with --replica-of follows that primary
+# and answers only READ_OPERATIONS (see replication.py). While it has lost
+# the primary it answers every request with an "Unavailable" error rather
+# than serve data that is no longer kept up to date.
+
+import argparse
+import asyncio
+import json
+
+import library
+import metrics
+import replication
+from storage import Storage
+
+DEFAULT_PORT = 8470
+MAX_LINE = 64 * 1024  # longest request line accepted, in bytes
+
+# library.py functions a client may call, by name (looked up on each call)
+OPERATIONS = frozenset((
+    "get_book", "add_book", "search_books", "update_book", "delete_book",
+    "get_member", "add_member", "update_member", "delete_member",
+    "borrow_book", "return_book", "circulate_batch", "borrow_batch", "return_batch",
+    "page_books", "page_members", "genre_summary", "books_in_genre", "books_by_author",
+    "count_books_by_author", "loans_for_member", "next_overdue",
+    "place_hold", "cancel_hold", "hold_position", "holders",
+))
+# The ones that do not change the library, served by replicas
+READ_OPERATIONS = frozenset((
+    "get_book", "search_books", "get_member", "page_books", "page_members",
+    "genre_summary", "books_in_genre", "books_by_author", "count_books_by_author",
+    "loans_for_member", "next_overdue", "hold_position", "holders",
+))
+
+
+def _to_json(value):
+    # Book/Member records and Loan objects
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Cannot send {type(value).__name__}")
+
+
+def handle_request(line, operations=OPERATIONS, unavailable=None):
+    """Run one request line and return the response line (as bytes)
+
+    unavailable, if given, is called first and returns a reason to refuse
+    the request, or None to run it.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get("id")
+        op = request.get("op")
+        reason = unavailable() if unavailable else None
+        if reason:
+            response = {"id": request_id, "ok": False, "error": "Unavailable", "message": reason}
+        elif op not in operations:
+            response = {"id": request_id, "ok": False, "error": "UnknownOperation",
+                        "message": f"Operation must be one of {sorted(operations)}"}
+        else:
+            result = getattr(library, op)(**request.get("args", {}))
+            response = {"id": request_id, "ok": True, "result": result}
+    except library.BatchError as e:
+        response = {"id": request_id, "ok": False, "error": "BatchError", "message": str(e),
+                    "index": e.index}
+    except library.LibraryError as e:
+        response = {"id": request_id, "ok": False, "error": type(e).__name__, "message": str(e)}
+    except (ValueError, TypeError, AttributeError) as e:
+        # Bad JSON, a request that is not an object, or wrong arguments
+        response = {"id": request_id, "ok": False, "error": "BadRequest", "message": str(e)}
+    return (json.dumps(response, default=_to_json) + "\n").encode()
+
+
+async def handle_client(reader, writer, operations=OPERATIONS, unavailable=None):
+    """Serve one connection until the client disconnects"""
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Line longer than MAX_LINE
+                writer.write(b'{"id": null, "ok": false, "error": "BadRequest", '
+                             b'"message": "Request line too long"}\n')
+                break
+            if not line:
+                break
+            if not line.strip():
+                continue
+            writer.write(handle_request(line, operations, unavailable))
+            # Returns at once unless the client is behind on reading
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(host="127.0.0.1", port=DEFAULT_PORT, operations=OPERATIONS,
+                       unavailable=None):
+    """Start listening and return the asyncio server"""
+    async def client(reader, writer):
+        await handle_client(reader, writer, operations, unavailable)
+    return await asyncio.start_server(client, host, port, limit=MAX_LINE, backlog=4096)
+
+
+async def serve(host, port, replica_of=None):
+    operations = OPERATIONS
+    unavailable = None
+    if replica_of:
+        # Changes from the primary run on this loop, between requests
+        loop = asyncio.get_running_loop()
+        replica = replication.Replica(replica_of, dispatch=loop.call_soon_threadsafe,
+                                      on_status=print)
+        replica.start()
+        operations = READ_OPERATIONS
+
+        def unavailable():
+            if not replica.connected:
+                return f"Not following the primary at {replica_of}; try again later"
+            return None
+        print(f"✓ Serving reads only, from the primary at {replica_of}")
+    server = await start_server(host, port, operations, unavailable)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"✓ Library service listening on {addresses}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Library network service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data", metavar="DIR", help="folder to load and save the library")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record operation metrics and rewrite this file every 15 seconds")
+    roles = parser.add_mutually_exclusive_group()
+    roles.add_argument("--primary", metavar="SOCKET",
+                       help="ship changes to read replicas through this Unix socket")
+    roles.add_argument("--replica-of", metavar="SOCKET",
+                       help="serve reads only, following the primary at this Unix socket")
+    args = parser.parse_args()
+    if args.replica_of and args.data:
+        parser.error("a replica gets its data from the primary; --data cannot be used")
+
+    storage = None
+    if args.data:
+        storage = Storage(args.data)
+        storage.open()
+        for problem in storage.replay_errors:
+            print(f"✗ {problem}")
+    exporter = None
+    if args.metrics:
+        metrics.enable()
+        exporter = metrics.Exporter(args.metrics)
+        exporter.start()
+    primary = None
+    if args.primary:
+        primary = replication.Primary(args.primary)
+        primary.start()
+    try:
+        asyncio.run(serve(args.host, args.port, args.replica_of))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if primary:
+            primary.stop()
+        if exporter:
+            exporter.stop()
+        if storage:
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
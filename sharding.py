@@ -0,0 +1,408 @@
+# sharding.py - Catalog split across worker processes to use several cores
+#
+# ShardedLibrary starts one worker process per shard. Each worker runs its
+# own copy of library.py holding only its part of the data: books are
+# placed by a hash of the ISBN and members by a hash of the member ID, so
+# the same key always goes to the same shard. Calls are sent to the
+# owning shard over a pipe; searches go to every shard at once and the
+# results are merged.
+#
+# A worker handles one request at a time, so each call it receives is
+# atomic. Borrowing a book held by another shard than the member is done
+# in two steps: the book's shard sets a copy aside, then the member's
+# shard records the loan; if the member may not borrow, the copy is put
+# back. No copy can be lent twice in between because it is no longer
+# available.
+#
+# Holds and persistence (storage.py) are not available in sharded mode.
+#
+# Usage:
+#     with ShardedLibrary(shards=4) as shards:
+#         shards.add_book("978-0-7653-7698-5", "The Martian", "Andy Weir", "Sci-Fi", 3)
+#         shards.borrow_book("M001", "978-0-7653-7698-5")
+#
+# Run "python sharding.py" for a self-check.
+
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+
+import library
+from library import books, circulation_locks, get_book, get_member, loans
+
+DEFAULT_SHARDS = os.cpu_count() or 2
+
+
+def shard_for(key, shard_count):
+    """Return the shard number that owns a key (ISBN or member ID)"""
+    return zlib.crc32(key.encode("utf-8")) % shard_count
+
+
+# ===== WORKER SIDE =====
+# These run inside a shard process, on its own copy of library.py
+
+def _reserve_copy(isbn):
+    # Set one copy aside for a borrower held by another shard
+    with circulation_locks.hold(isbn):
+        book = get_book(isbn)
+        if book["available_copies"] <= 0:
+            raise library.UnavailableError("No copies available")
+        books.update(isbn, available_copies=book["available_copies"] - 1)
+        library.borrow_counts[isbn] = library.borrow_counts.get(isbn, 0) + 1
+    return book
+
+
+def _release_copy(isbn, cancelled=False):
+    # Put a copy back on the shelf: a return, or (cancelled=True) a
+    # reservation whose loan was refused, which must not count as a lend
+    with circulation_locks.hold(isbn):
+        book = get_book(isbn)
+        books.update(isbn, available_copies=book["available_copies"] + 1)
+        if cancelled:
+            library.borrow_counts[isbn] -= 1
+    return book
+
+
+def _borrow_count(isbn):
+    return library.borrow_counts.get(isbn, 0)
+
+
+def _attach_loan(member_id, isbn, now=None):
+    # Record a loan of a copy reserved on another shard
+    now = time.time() if now is None else now
+    with circulation_locks.hold(member_id):
+        member = library.check_borrower(member_id)
+        member["borrowed_books"].append(isbn)
+        library.borrowers.add(isbn, member_id)
+        loans.open_loan(member_id, isbn, now)
+    return member
+
+
+def _detach_loan(member_id, isbn, now=None):
+    # Close a loan whose book lives on another shard
+    now = time.time() if now is None else now
+    with circulation_locks.hold(member_id):
+        member = get_member(member_id)
+        if isbn not in member["borrowed_books"]:
+            raise library.ConflictError("Member has not borrowed this book")
+        member["borrowed_books"].remove(isbn)
+        library.borrowers.remove(isbn, member_id)
+        loans.close_loan(member_id, isbn, now)
+    return member
+
+
+def _search_ranked(query, mode, limit):
+    # Search results with a sort key so the router can merge shards
+    if mode == "fuzzy":
+        scores = library.search_index.fuzzy_scores(query, limit)
+        return [(edits, books.get(isbn)) for edits, isbn in scores]
+    return [(0, book) for book in library.search_books(query, mode)]
+
+
+def _counts():
+    return len(books), len(library.members)
+
+
+WORKER_OPS = {
+    "get_book": library.get_book,
+    "add_books": library.add_books,
+    "update_book": library.update_book,
+    "delete_book": library.delete_book,
+    "get_member": library.get_member,
+    "add_members": library.add_members,
+    "update_member": library.update_member,
+    "delete_member": library.delete_member,
+    "borrow_book": library.borrow_book,
+    "return_book": library.return_book,
+    "loans_for_member": library.loans_for_member,
+    "genre_summary": library.genre_summary,
+    "reserve_copy": _reserve_copy,
+    "release_copy": _release_copy,
+    "borrow_count": _borrow_count,
+    "attach_loan": _attach_loan,
+    "detach_loan": _detach_loan,
+    "search_ranked": _search_ranked,
+    "counts": _counts,
+}
+
+
+def _serve(connection):
+    """Worker process main loop: run requests until told to stop (None)"""
+    # A forked worker starts with a copy of the parent's data, and of its
+    # mutation listeners (storage, events, replication): shard changes
+    # must not reach those copies
+    library.mutation_listeners.clear()
+    library.reset()
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        name, args, kwargs = request
+        try:
+            connection.send((True, WORKER_OPS[name](*args, **kwargs)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+# ===== ROUTER =====
+
+class ShardedLibrary:
+    """Library operations spread over worker processes, one per shard
+
+    Methods have the same names, arguments, results and errors as the
+    functions in library.py. Calls may come from several threads.
+    """
+
+    def __init__(self, shards=DEFAULT_SHARDS, context=None):
+        context = context or multiprocessing.get_context()
+        self.shard_count = shards
+        self._connections = []
+        self._processes = []
+        self._locks = []  # one per pipe, so a request and its reply stay paired
+        for _ in range(shards):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_serve, args=(child_end,), daemon=True)
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+            self._locks.append(threading.Lock())
+
+    def close(self):
+        """Stop the worker processes"""
+        for connection, lock in zip(self._connections, self._locks):
+            with lock:
+                connection.send(None)
+        for process in self._processes:
+            process.join()
+        for connection in self._connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ===== MESSAGING =====
+
+    def _call(self, shard, name, *args, **kwargs):
+        with self._locks[shard]:
+            self._connections[shard].send((name, args, kwargs))
+            ok, result = self._connections[shard].recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call_many(self, calls):
+        """Run (shard, name, args) calls on their shards in parallel, in order
+
+        Each shard gets its requests before any reply is read, so the
+        shards work at the same time. Returns the results in call order.
+        """
+        shards = sorted({shard for shard, _, _ in calls})
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard, name, args in calls:
+                self._connections[shard].send((name, args, {}))
+            replies = [self._connections[shard].recv() for shard, _, _ in calls]
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+        for ok, result in replies:
+            if not ok:
+                raise result
+        return [result for _, result in replies]
+
+    def _book_shard(self, isbn):
+        return shard_for(isbn, self.shard_count)
+
+    def _member_shard(self, member_id):
+        return shard_for(member_id, self.shard_count)
+
+    # ===== BOOKS =====
+
+    def get_book(self, isbn):
+        return self._call(self._book_shard(isbn), "get_book", isbn)
+
+    def add_book(self, isbn, title, author, genre, total_copies):
+        return self.add_books([library.make_book(isbn, title, author, genre, total_copies)])[0]
+
+    def add_books(self, records):
+        """Add many books, each shard adding its share at the same time
+
+        All-or-nothing only within a shard: if one shard rejects its share,
+        the other shards' books are still added.
+        """
+        records = list(records)
+        groups = {}
+        for book in records:
+            groups.setdefault(self._book_shard(book["isbn"]), []).append(book)
+        self._call_many([(shard, "add_books", (group,)) for shard, group in groups.items()])
+        return records
+
+    def update_book(self, isbn, **changes):
+        return self._call(self._book_shard(isbn), "update_book", isbn, **changes)
+
+    def delete_book(self, isbn):
+        return self._call(self._book_shard(isbn), "delete_book", isbn)
+
+    def search_books(self, query, mode="index", limit=library.FUZZY_LIMIT):
+        """Search every shard at once and merge the results
+
+        Index and substring results are ordered by title (there is no
+        catalog order across shards); fuzzy results by closeness, then
+        title, keeping the best `limit`.
+        """
+        if mode not in library.SEARCH_MODES:
+            raise library.ValidationError(f"Search mode must be one of {library.SEARCH_MODES}")
+        parts = self._call_many([(shard, "search_ranked", (query, mode, limit))
+                                 for shard in range(self.shard_count)])
+        ranked = [entry for part in parts for entry in part]
+
+        def rank(entry):
+            return entry[0], entry[1]["title"], entry[1]["isbn"]
+        if mode == "fuzzy":
+            return [book for _, book in heapq.nsmallest(limit, ranked, key=rank)]
+        return [book for _, book in sorted(ranked, key=rank)]
+
+    def genre_summary(self, genre):
+        """Add up a genre's running totals over every shard"""
+        parts = self._call_many([(shard, "genre_summary", (genre,))
+                                 for shard in range(self.shard_count)])
+        return {field: sum(part[field] for part in parts) for field in parts[0]}
+
+    def borrow_count(self, isbn):
+        """Return how many times a book has been lent"""
+        return self._call(self._book_shard(isbn), "borrow_count", isbn)
+
+    def counts(self):
+        """Return (books, members) held over all shards"""
+        parts = self._call_many([(shard, "counts", ()) for shard in range(self.shard_count)])
+        return sum(b for b, _ in parts), sum(m for _, m in parts)
+
+    # ===== MEMBERS =====
+
+    def get_member(self, member_id):
+        return self._call(self._member_shard(member_id), "get_member", member_id)
+
+    def add_member(self, member_id, name, email, contact):
+        return self.add_members([library.make_member(member_id, name, email, contact)])[0]
+
+    def add_members(self, records):
+        """Add many members, each shard adding its share at the same time"""
+        records = list(records)
+        groups = {}
+        for member in records:
+            groups.setdefault(self._member_shard(member["id"]), []).append(member)
+        self._call_many([(shard, "add_members", (group,)) for shard, group in groups.items()])
+        return records
+
+    def update_member(self, member_id, **changes):
+        return self._call(self._member_shard(member_id), "update_member", member_id, **changes)
+
+    def delete_member(self, member_id):
+        return self._call(self._member_shard(member_id), "delete_member", member_id)
+
+    def loans_for_member(self, member_id):
+        return self._call(self._member_shard(member_id), "loans_for_member", member_id)
+
+    # ===== BORROW/RETURN =====
+
+    def borrow_book(self, member_id, isbn, now=None):
+        """Lend one copy of a book to a member and return the book"""
+        now = time.time() if now is None else now
+        member_shard = self._member_shard(member_id)
+        book_shard = self._book_shard(isbn)
+        if member_shard == book_shard:
+            return self._call(book_shard, "borrow_book", member_id, isbn, now)
+
+        book = self._call(book_shard, "reserve_copy", isbn)
+        try:
+            self._call(member_shard, "attach_loan", member_id, isbn, now)
+        except Exception:
+            self._call(book_shard, "release_copy", isbn, cancelled=True)
+            raise
+        return book
+
+    def return_book(self, member_id, isbn, now=None):
+        """Take back a book a member has borrowed and return the book"""
+        now = time.time() if now is None else now
+        member_shard = self._member_shard(member_id)
+        book_shard = self._book_shard(isbn)
+        if member_shard == book_shard:
+            return self._call(book_shard, "return_book", member_id, isbn, now, fill_holds=False)
+
+        self._call(member_shard, "detach_loan", member_id, isbn, now)
+        return self._call(book_shard, "release_copy", isbn)
+
+
+# ===== SELF-CHECK =====
+
+def _self_check():
+    import tempfile
+    # A listener in this process, which the workers must not inherit
+    log_path = os.path.join(tempfile.mkdtemp(), "parent.log")
+
+    def log_change(op, data):
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(op + "\n")
+    library.mutation_listeners.append(log_change)
+    try:
+        _check_shards()
+    finally:
+        library.mutation_listeners.remove(log_change)
+    assert not os.path.exists(log_path), "Shard changes should not reach the parent's listeners"
+    print("✓ Sharded catalog self-check passed")
+
+
+def _check_shards():
+    with ShardedLibrary(shards=4) as shards:
+        shards.add_books([library.make_book(f"SH-{i}", f"Shard Title {i}", f"Author {i % 7}",
+                                            library.VALID_GENRES[i % 3], 1) for i in range(200)])
+        shards.add_members([library.make_member(f"SM-{i}", f"Member {i}", f"s{i}@email.com", "0")
+                            for i in range(20)])
+        assert shards.counts() == (200, 20), "Every record should land on exactly one shard"
+        assert len(shards.search_books("shard title")) == 200, "Search should fan out to all shards"
+        assert [b["isbn"] for b in shards.search_books("titel 17", mode="fuzzy", limit=1)] == ["SH-17"]
+
+        # Find a book and member on different shards, and some on the same one
+        cross = next(i for i in range(200) if shard_for(f"SH-{i}", 4) != shard_for("SM-0", 4))
+        isbn = f"SH-{cross}"
+        shards.borrow_book("SM-0", isbn)
+        assert shards.get_book(isbn)["available_copies"] == 0, "Cross-shard borrow takes a copy"
+        assert shards.get_member("SM-0")["borrowed_books"] == [isbn]
+        try:
+            shards.borrow_book("SM-1", isbn)
+            raise AssertionError("The only copy is lent out")
+        except library.UnavailableError:
+            pass
+
+        # A failed loan gives the reserved copy back
+        others = [i for i in range(200)
+                  if shard_for(f"SH-{i}", 4) != shard_for("SM-2", 4) and f"SH-{i}" != isbn][:4]
+        for i in others[:3]:
+            shards.borrow_book("SM-2", f"SH-{i}")
+        try:
+            shards.borrow_book("SM-2", f"SH-{others[3]}")
+            raise AssertionError("The borrow limit applies across shards")
+        except library.BorrowLimitError:
+            pass
+        assert shards.get_book(f"SH-{others[3]}")["available_copies"] == 1, "Reservation undone"
+        assert shards.borrow_count(f"SH-{others[3]}") == 0, "A refused loan is not counted as a lend"
+        assert shards.borrow_count(f"SH-{others[0]}") == 1, "A cross-shard loan is counted once"
+
+        shards.return_book("SM-0", isbn)
+        assert shards.get_book(isbn)["available_copies"] == 1, "Cross-shard return puts it back"
+        available = sum(shards.genre_summary(genre)["available_copies"]
+                        for genre in library.VALID_GENRES)
+        assert available == 200 - 3, "Genre totals should add up over the shards"
+
+
+if __name__ == "__main__":
+    _self_check()
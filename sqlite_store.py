@@ -0,0 +1,253 @@
+# sqlite_store.py - SQLite-backed alternative to the in-memory library
+#
+# SQLiteLibrary offers the same book, member and borrow/return operations
+# as library.py, with the same errors, but keeps the data in an SQLite
+# database (stdlib sqlite3) so the catalog can be larger than memory and
+# queried with SQL.
+#
+# Usage:
+#     db = SQLiteLibrary("library.db")
+#     db.add_book("978-0-7653-7698-5", "The Martian", "Andy Weir", "Sci-Fi", 3)
+#     db.borrow_book("M001", "978-0-7653-7698-5")
+
+import sqlite3
+from contextlib import contextmanager
+
+from library import (
+    MAX_BORROWED, VALID_GENRES, BorrowLimitError, ConflictError, DuplicateError,
+    NotFoundError, UnavailableError, check_copies, check_genre,
+)
+from records import Book, Member
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    author TEXT NOT NULL,
+    author_key TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    total_copies INTEGER NOT NULL,
+    available_copies INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    contact TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS loans (
+    loan_id INTEGER PRIMARY KEY,
+    member_id TEXT NOT NULL REFERENCES members(id),
+    isbn TEXT NOT NULL REFERENCES books(isbn)
+);
+CREATE INDEX IF NOT EXISTS books_author ON books(author_key);
+CREATE INDEX IF NOT EXISTS books_genre ON books(genre);
+CREATE INDEX IF NOT EXISTS loans_member ON loans(member_id);
+CREATE INDEX IF NOT EXISTS loans_isbn ON loans(isbn);
+"""
+
+# All SQL lives in constants: sqlite3 keeps a per-connection cache of
+# prepared statements keyed by the SQL text, so reusing the exact same
+# strings means each statement is compiled once and then reused
+BOOK_COLUMNS = "isbn, title, author, genre, total_copies, available_copies"
+SQL_GET_BOOK = f"SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?"
+# The *_key columns hold Python's lower() of the text: SQLite's lower()
+# only changes ASCII letters, so "É" would never match "é"
+SQL_INSERT_BOOK = ("INSERT INTO books (isbn, title, title_key, author, author_key, genre, "
+                   "total_copies, available_copies) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_UPDATE_BOOK = ("UPDATE books SET title = ?, title_key = ?, author = ?, author_key = ?, "
+                   "genre = ?, total_copies = ? WHERE isbn = ?")
+SQL_DELETE_BOOK = "DELETE FROM books WHERE isbn = ?"
+SQL_SEARCH_BOOKS = (f"SELECT {BOOK_COLUMNS} FROM books "
+                    "WHERE instr(title_key, ?) > 0 OR instr(author_key, ?) > 0 ORDER BY rowid")
+SQL_BOOKS_BY_AUTHOR = f"SELECT {BOOK_COLUMNS} FROM books WHERE author_key = ? ORDER BY rowid"
+SQL_BOOKS_BY_GENRE = f"SELECT {BOOK_COLUMNS} FROM books WHERE genre = ? ORDER BY rowid"
+SQL_GENRE_SUMMARY = ("SELECT genre, COUNT(*), SUM(total_copies), SUM(available_copies) "
+                     "FROM books GROUP BY genre")
+SQL_TAKE_COPY = ("UPDATE books SET available_copies = available_copies - 1 "
+                 "WHERE isbn = ? AND available_copies > 0")
+SQL_GIVE_BACK_COPY = "UPDATE books SET available_copies = available_copies + 1 WHERE isbn = ?"
+
+SQL_GET_MEMBER = "SELECT id, name, email, contact FROM members WHERE id = ?"
+SQL_INSERT_MEMBER = "INSERT INTO members (id, name, email, contact) VALUES (?, ?, ?, ?)"
+SQL_UPDATE_MEMBER = "UPDATE members SET name = ?, email = ?, contact = ? WHERE id = ?"
+SQL_DELETE_MEMBER = "DELETE FROM members WHERE id = ?"
+
+SQL_MEMBER_LOANS = "SELECT isbn FROM loans WHERE member_id = ? ORDER BY loan_id"
+SQL_COUNT_MEMBER_LOANS = "SELECT COUNT(*) FROM loans WHERE member_id = ?"
+SQL_FIRST_LOAN = ("SELECT loan_id FROM loans WHERE member_id = ? AND isbn = ? "
+                  "ORDER BY loan_id LIMIT 1")
+SQL_INSERT_LOAN = "INSERT INTO loans (member_id, isbn) VALUES (?, ?)"
+SQL_DELETE_LOAN = "DELETE FROM loans WHERE loan_id = ?"
+
+
+def _book_from_row(row):
+    return Book(*row)
+
+
+class SQLiteLibrary:
+    """Book, member and borrow/return operations stored in SQLite"""
+
+    def __init__(self, path=":memory:"):
+        # Autocommit mode: transactions are started explicitly below
+        self.connection = sqlite3.connect(path, isolation_level=None,
+                                          cached_statements=256)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one write transaction, rolled back on error"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    # ===== BOOK OPERATIONS =====
+
+    def get_book(self, isbn):
+        """Return the book with this ISBN"""
+        row = self.connection.execute(SQL_GET_BOOK, (isbn,)).fetchone()
+        if row is None:
+            raise NotFoundError("Book not found")
+        return _book_from_row(row)
+
+    def add_book(self, isbn, title, author, genre, total_copies):
+        """Add a new book and return it"""
+        check_genre(genre)
+        total_copies = check_copies(total_copies)
+        try:
+            self.connection.execute(SQL_INSERT_BOOK, (isbn, title, title.lower(), author,
+                                                      author.lower(), genre, total_copies,
+                                                      total_copies))
+        except sqlite3.IntegrityError:
+            raise DuplicateError("ISBN already exists") from None
+        return self.get_book(isbn)
+
+    def search_books(self, query):
+        """Return books whose title or author contains the query (any case)"""
+        query = query.strip().lower()
+        rows = self.connection.execute(SQL_SEARCH_BOOKS, (query, query))
+        return [_book_from_row(row) for row in rows]
+
+    def books_by_author(self, author):
+        """Return all books by an author (exact name, any case), using the index"""
+        rows = self.connection.execute(SQL_BOOKS_BY_AUTHOR, (author.strip().lower(),))
+        return [_book_from_row(row) for row in rows]
+
+    def books_by_genre(self, genre):
+        """Return all books of a genre, using the index"""
+        rows = self.connection.execute(SQL_BOOKS_BY_GENRE, (genre,))
+        return [_book_from_row(row) for row in rows]
+
+    def genre_summary(self):
+        """Return {genre: (books, total copies, available copies)}"""
+        summary = {genre: (0, 0, 0) for genre in VALID_GENRES}
+        for genre, count, total, available in self.connection.execute(SQL_GENRE_SUMMARY):
+            summary[genre] = (count, total, available)
+        return summary
+
+    def update_book(self, isbn, title=None, author=None, genre=None, total_copies=None):
+        """Change the given fields of a book and return it"""
+        with self.transaction():
+            book = self.get_book(isbn)
+            if title:
+                book["title"] = title
+            if author:
+                book["author"] = author
+            if genre:
+                book["genre"] = check_genre(genre)
+            if total_copies not in (None, ""):
+                book["total_copies"] = check_copies(total_copies)
+            self.connection.execute(SQL_UPDATE_BOOK, (
+                book["title"], book["title"].lower(), book["author"], book["author"].lower(),
+                book["genre"], book["total_copies"], isbn))
+        return book
+
+    def delete_book(self, isbn):
+        """Delete a book that has no borrowed copies and return it"""
+        with self.transaction():
+            book = self.get_book(isbn)
+            if book["available_copies"] < book["total_copies"]:
+                raise ConflictError("Cannot delete book with borrowed copies")
+            self.connection.execute(SQL_DELETE_BOOK, (isbn,))
+        return book
+
+    # ===== MEMBER OPERATIONS =====
+
+    def get_member(self, member_id):
+        """Return the member with this ID, including their borrowed books"""
+        row = self.connection.execute(SQL_GET_MEMBER, (member_id,)).fetchone()
+        if row is None:
+            raise NotFoundError("Member not found")
+        loans = self.connection.execute(SQL_MEMBER_LOANS, (member_id,))
+        return Member(*row, borrowed_books=[isbn for (isbn,) in loans])
+
+    def add_member(self, member_id, name, email, contact):
+        """Add a new member and return them"""
+        try:
+            self.connection.execute(SQL_INSERT_MEMBER, (member_id, name, email, contact))
+        except sqlite3.IntegrityError:
+            raise DuplicateError("Member ID already exists") from None
+        return self.get_member(member_id)
+
+    def update_member(self, member_id, name=None, email=None, contact=None):
+        """Change the given fields of a member and return them"""
+        with self.transaction():
+            member = self.get_member(member_id)
+            if name:
+                member["name"] = name
+            if email:
+                member["email"] = email
+            if contact:
+                member["contact"] = contact
+            self.connection.execute(SQL_UPDATE_MEMBER, (
+                member["name"], member["email"], member["contact"], member_id))
+        return member
+
+    def delete_member(self, member_id):
+        """Delete a member who has no borrowed books and return them"""
+        with self.transaction():
+            member = self.get_member(member_id)
+            if member["borrowed_books"]:
+                raise ConflictError("Cannot delete member with borrowed books")
+            self.connection.execute(SQL_DELETE_MEMBER, (member_id,))
+        return member
+
+    # ===== BORROW/RETURN OPERATIONS =====
+
+    def borrow_book(self, member_id, isbn):
+        """Lend one copy of a book to a member and return the book"""
+        with self.transaction() as db:
+            if db.execute(SQL_GET_MEMBER, (member_id,)).fetchone() is None:
+                raise NotFoundError("Member not found")
+            (borrowed,) = db.execute(SQL_COUNT_MEMBER_LOANS, (member_id,)).fetchone()
+            if borrowed >= MAX_BORROWED:
+                raise BorrowLimitError(f"Member has already borrowed {MAX_BORROWED} books")
+            self.get_book(isbn)
+            if db.execute(SQL_TAKE_COPY, (isbn,)).rowcount == 0:
+                raise UnavailableError("No copies available")
+            db.execute(SQL_INSERT_LOAN, (member_id, isbn))
+        return self.get_book(isbn)
+
+    def return_book(self, member_id, isbn):
+        """Take back a book a member has borrowed and return the book"""
+        with self.transaction() as db:
+            if db.execute(SQL_GET_MEMBER, (member_id,)).fetchone() is None:
+                raise NotFoundError("Member not found")
+            loan = db.execute(SQL_FIRST_LOAN, (member_id, isbn)).fetchone()
+            if loan is None:
+                raise ConflictError("Member has not borrowed this book")
+            db.execute(SQL_DELETE_LOAN, loan)
+            db.execute(SQL_GIVE_BACK_COPY, (isbn,))
+        return self.get_book(isbn)
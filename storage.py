@@ -0,0 +1,188 @@
+# storage.py - Durable storage for the library: write-ahead log + snapshots
+#
+# Every change made through library.py is appended to a log file as one
+# JSON line. Log lines are written and fsync-ed in groups (group commit)
+# so that many changes share one disk flush. Every so often the whole
+# state is written to a compact snapshot and the log is started afresh,
+# so startup only loads the latest snapshot and replays the short log
+# written after it. Snapshots are taken on the background flush thread
+# while every circulation lock is held, so no change is half-way through
+# (applied but not yet logged) when the state is copied.
+#
+# Usage:
+#     store = Storage("library-data")
+#     store.open()     # load saved state, then log every change
+#     ...
+#     store.close()    # flush the log
+
+import json
+import os
+import threading
+import time
+
+import library
+
+SNAPSHOT_FILE = "snapshot.json"
+LOG_FILE = "mutations.log"
+
+
+def _to_json(value):
+    # Book and Member records (see records.py) are written as dictionaries
+    return value.to_dict()
+
+
+class Storage:
+    """Append-only mutation log with periodic snapshots for library.py"""
+
+    def __init__(self, directory, group_size=64, group_interval=0.05,
+                 snapshot_every=100000):
+        self.directory = directory
+        self.group_size = group_size  # flush after this many log lines...
+        self.group_interval = group_interval  # ...or after this many seconds
+        self.snapshot_every = snapshot_every  # log lines between snapshots
+        self.seq = 0  # sequence number of the last logged change
+        self._since_snapshot = 0
+        self.replay_errors = []  # log entries that could not be replayed, as messages
+        self._buffer = []  # log lines waiting for the next group commit
+        self._log = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    @property
+    def log_path(self):
+        return os.path.join(self.directory, LOG_FILE)
+
+    # ===== STARTUP AND SHUTDOWN =====
+
+    def open(self):
+        """Load saved state into library.py and start logging changes
+
+        If the directory holds no saved state yet, whatever is currently in
+        the library is written as the first snapshot instead.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.replay_errors = []
+        if os.path.exists(self.snapshot_path) or os.path.exists(self.log_path):
+            self._load_snapshot()
+            self._replay_log()
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        else:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            self.snapshot()
+
+        library.mutation_listeners.append(self._on_mutation)
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def close(self):
+        """Stop logging and flush everything still buffered"""
+        if self._log is None:
+            return
+        library.mutation_listeners.remove(self._on_mutation)
+        self._stop.set()
+        self._flusher.join()
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        self.flush()
+        self._log.close()
+        self._log = None
+
+    def _load_snapshot(self):
+        library.reset()
+        self.seq = 0
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, encoding="utf-8") as file:
+            state = json.load(file)
+        library.restore_state(state)
+        self.seq = state["seq"]
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        good_length = 0
+        with open(self.log_path, "rb") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; drop it
+                    break
+                good_length += len(line)
+                # Entries already covered by the snapshot are skipped
+                if entry["seq"] <= self.seq:
+                    continue
+                try:
+                    library.apply_mutation(entry["op"], entry["data"])
+                except library.LibraryError as e:
+                    # Keep loading the rest; the caller reports what was skipped
+                    self.replay_errors.append(f"Log entry {entry['seq']} ({entry['op']}) "
+                                              f"could not be replayed: {e}")
+                self.seq = entry["seq"]
+                self._since_snapshot += 1
+        if good_length < os.path.getsize(self.log_path):
+            with open(self.log_path, "r+b") as file:
+                file.truncate(good_length)
+
+    # ===== LOGGING =====
+
+    def _on_mutation(self, op, data):
+        # Serialise now: the records in data may change after this call
+        with self._lock:
+            self.seq += 1
+            self._buffer.append(json.dumps({"seq": self.seq, "op": op, "data": data},
+                                           separators=(",", ":"), default=_to_json) + "\n")
+            self._since_snapshot += 1
+            if len(self._buffer) >= self.group_size:
+                self._write_buffer()
+
+    def _write_buffer(self):
+        # Caller holds self._lock
+        if not self._buffer:
+            return
+        self._log.write("".join(self._buffer))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._buffer.clear()
+
+    def flush(self):
+        """Write and fsync every buffered log line now"""
+        with self._lock:
+            self._write_buffer()
+
+    def _flush_loop(self):
+        # Bounds how long a change can wait for its group commit, and
+        # takes snapshots away from the threads making changes
+        while not self._stop.wait(self.group_interval):
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+            else:
+                self.flush()
+
+    # ===== SNAPSHOTS =====
+
+    def snapshot(self):
+        """Write the full state to a new snapshot and start an empty log
+
+        Holds every circulation lock, so changes wait while it runs.
+        """
+        with library.circulation_locks.hold_all(), self._lock:
+            self._write_buffer()
+            state = {"seq": self.seq, "written_at": time.time(), **library.export_state()}
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(state, file, separators=(",", ":"), default=_to_json)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.snapshot_path)
+
+            # The snapshot covers everything logged so far
+            self._log.truncate(0)
+            self._log.seek(0)
+            self._since_snapshot = 0
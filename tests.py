@@ -1,6 +1,26 @@
 # tests.py - Library Management System Unit Tests
 
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+
+import binary_catalog
+import bulk_import
+import columnar
+import events
+import library
+import metrics
 import operations
+import profiling
+import server
+import storage
+from sqlite_store import SQLiteLibrary
 
 print("=" * 60)
 print("LIBRARY MANAGEMENT SYSTEM - UNIT TESTS")
@@ -170,6 +190,791 @@ assert len(results) == 1, "Should find exactly one book by 'Author 2'"
 assert results[0]["isbn"] == "TEST-003", "Should find correct book"
 print("✓ PASSED: Search functionality works correctly")
 
+# TEST 9: Catalog store keeps key lookups in sync with the ordered list
+print("\nTEST 9: Catalog store lookups by ISBN and member ID")
+assert operations.books.get("TEST-003")["title"] == "Book 2", "Should find book by ISBN"
+assert operations.members.get("TEST-M001")["name"] == "Test Member", "Should find member by ID"
+assert operations.books.get("MISSING") is None, "Unknown ISBN should return None"
+
+# Removing a book must drop it from both the lookup and the ordered list
+removed = operations.books.pop(2)  # TEST-004
+assert removed["isbn"] == "TEST-004", "Should pop the book at position 2"
+assert operations.books.get("TEST-004") is None, "Removed book should not be found"
+assert [b["isbn"] for b in operations.books] == ["TEST-001", "TEST-003", "TEST-005"], \
+    "Remaining books should keep their order"
+
+# Duplicate ISBNs are rejected by the store itself
+try:
+    operations.books.append(dict(removed, isbn="TEST-001"))
+    assert False, "Should reject duplicate ISBN"
+except ValueError:
+    pass
+
+operations.books.append(removed)
+assert operations.books[-1]["isbn"] == "TEST-004", "Re-added book should be last"
+print("✓ PASSED: Catalog store lookups and removals stay in sync")
+
+# TEST 10: Indexed search with prefixes and multiple terms
+print("\nTEST 10: Indexed search (prefix and multi-term)")
+results = library.search_books("auth 2")
+assert [b["isbn"] for b in results] == ["TEST-003"], "All terms must match (as prefixes)"
+
+results = library.search_books("book")
+assert len(results) == 4, "Prefix 'book' should match every test book"
+
+# Changes made through the store keep the index in sync
+operations.books.update("TEST-003", author="Renamed Writer")
+assert library.search_books("author 2") == [], "Old author should no longer match"
+assert library.search_books("renamed")[0]["isbn"] == "TEST-003", "New author should match"
+operations.books.update("TEST-003", author="Author 2")
+
+# Substring mode keeps the original semantics
+results = library.search_books("k 2", mode="substring")
+assert [b["isbn"] for b in results] == ["TEST-003"], "Substring mode should match inside words"
+assert library.search_books("k 2") == [], "Index mode matches whole-word prefixes only"
+print("✓ PASSED: Indexed search works correctly")
+
+# TEST 11: Service API returns records and raises typed errors
+print("\nTEST 11: Service API without terminal I/O")
+book = library.add_book("TEST-006", "API Book", "API Author", "Sci-Fi", "2")
+assert book["available_copies"] == 2, "Copies should be converted to a number"
+library.add_member("TEST-M002", "API Member", "api@email.com", "000")
+
+for call, error in [
+    (lambda: library.add_book("TEST-006", "Dup", "Dup", "Fiction", 1), library.DuplicateError),
+    (lambda: library.add_book("TEST-007", "Bad", "Bad", "Poetry", 1), library.ValidationError),
+    (lambda: library.update_book("TEST-006", total_copies="many"), library.ValidationError),
+    (lambda: library.borrow_book("NOBODY", "TEST-006"), library.NotFoundError),
+    (lambda: library.return_book("TEST-M002", "TEST-006"), library.ConflictError),
+]:
+    try:
+        call()
+        assert False, f"Should raise {error.__name__}"
+    except error:
+        pass
+
+library.borrow_book("TEST-M001", "TEST-005")  # third book for TEST-M001
+try:
+    library.borrow_book("TEST-M001", "TEST-006")
+    assert False, "Should raise BorrowLimitError"
+except library.BorrowLimitError:
+    pass
+library.return_book("TEST-M001", "TEST-005")
+
+library.borrow_book("TEST-M002", "TEST-006")
+library.borrow_book("TEST-M002", "TEST-006")
+try:
+    library.borrow_book("TEST-M002", "TEST-006")
+    assert False, "Should raise UnavailableError"
+except library.UnavailableError:
+    pass
+try:
+    library.delete_book("TEST-006")
+    assert False, "Should not delete a borrowed book"
+except library.ConflictError:
+    pass
+
+book = library.return_book("TEST-M002", "TEST-006")
+assert book["available_copies"] == 1, "Return should free one copy"
+library.return_book("TEST-M002", "TEST-006")
+library.delete_book("TEST-006")
+library.delete_member("TEST-M002")
+assert operations.books.get("TEST-006") is None, "Deleted book should be gone"
+print("✓ PASSED: Service API works correctly")
+
+# TEST 12: Bulk import from CSV and JSONL with per-row errors
+print("\nTEST 12: Bulk import of books and members")
+with tempfile.TemporaryDirectory() as folder:
+    books_csv = os.path.join(folder, "books.csv")
+    with open(books_csv, "w", newline="") as f:
+        f.write("isbn,title,author,genre,total_copies\n"
+                "BULK-1,Bulk One,Bulk Author,Fiction,2\n"
+                "BULK-2,Bulk Two,Bulk Author,Poetry,2\n"     # bad genre
+                "BULK-1,Bulk Again,Bulk Author,Fiction,2\n"  # duplicate in file
+                "TEST-001,Clash,Bulk Author,Fiction,2\n"     # duplicate in library
+                "BULK-3,Bulk Three,Bulk Author,Sci-Fi,x\n"   # bad number
+                "BULK-4,Bulk Four,Bulk Author,Sci-Fi,1\n")
+    report = bulk_import.import_books(books_csv, batch_size=1)
+    assert report.added == 2, "Two valid rows should be imported"
+    assert [row for row, message in report.errors] == [2, 3, 4, 5], "Bad rows should be reported"
+    assert library.search_books("bulk")[-1]["isbn"] == "BULK-4", "Imported books should be searchable"
+
+    members_jsonl = os.path.join(folder, "members.jsonl")
+    with open(members_jsonl, "w") as f:
+        f.write('{"id": "BULK-M1", "name": "Bulk", "email": "b@email.com", "contact": "1"}\n'
+                'not json\n'
+                '{"id": "BULK-M2", "name": "Bulk"}\n')
+    report = bulk_import.import_members(members_jsonl)
+    assert report.added == 1 and report.failed == 2, "Bad member rows should be reported"
+    assert operations.members.get("BULK-M1")["borrowed_books"] == [], "Members start with no loans"
+
+for isbn in ("BULK-1", "BULK-4"):
+    library.delete_book(isbn)
+library.delete_member("BULK-M1")
+print("✓ PASSED: Bulk import validates rows and keeps going")
+
+# TEST 13: Write-ahead log and snapshots survive a restart
+print("\nTEST 13: Persistent storage (log + snapshot)")
+with tempfile.TemporaryDirectory() as folder:
+    store = storage.Storage(folder, group_size=2)
+    store.open()  # empty folder: current data becomes the first snapshot
+    library.add_book("WAL-1", "Logged Book", "Log Author", "Fiction", 2)
+    library.add_member("WAL-M1", "Logged Member", "log@email.com", "1")
+    library.borrow_book("WAL-M1", "WAL-1")
+    library.update_book("WAL-1", title="Logged Book Renamed")
+    store.close()
+    expected_books = [dict(b) for b in operations.books]
+    expected_members = [dict(m, borrowed_books=list(m["borrowed_books"])) for m in operations.members]
+
+    # "Restart": wipe memory and load snapshot + log tail
+    operations.books.clear()
+    operations.members.clear()
+    store = storage.Storage(folder, snapshot_every=1)
+    store.open()
+    assert list(operations.books) == expected_books, "Books should be restored"
+    assert list(operations.members) == expected_members, "Members should be restored"
+    assert library.search_books("renamed")[0]["isbn"] == "WAL-1", "Search index should be rebuilt"
+
+    # With snapshot_every=1 the next change compacts the log into the snapshot
+    library.return_book("WAL-M1", "WAL-1")
+    store.close()
+    assert os.path.getsize(store.log_path) == 0, "Snapshot should leave an empty log"
+    operations.books.clear()
+    operations.members.clear()
+    store.open()
+    assert operations.books.get("WAL-1")["available_copies"] == 2, "Snapshot should hold the return"
+    store.close()
+
+    # An entry that no longer applies is reported with its number, not fatal
+    with open(store.log_path, "a", encoding="utf-8") as log:
+        log.write(json.dumps({"seq": store.seq + 1, "op": "return_book",
+                              "data": {"member_id": "WAL-M1", "isbn": "WAL-1"}}) + "\n")
+    store.open()
+    assert len(store.replay_errors) == 1 and f"entry {store.seq}" in store.replay_errors[0], \
+        "A failing log entry should be reported with its sequence number"
+    store.close()
+
+library.delete_book("WAL-1")
+library.delete_member("WAL-M1")
+print("✓ PASSED: State survives a restart")
+
+# TEST 14: SQLite store offers the same operations and errors
+print("\nTEST 14: SQLite-backed store")
+db = SQLiteLibrary(":memory:")
+db.add_book("SQL-1", "SQL Book", "SQL Author", "Fiction", 1)
+db.add_book("SQL-2", "Other Book", "sql author", "Sci-Fi", 2)
+db.add_member("SQL-M1", "SQL Member", "sql@email.com", "1")
+db.borrow_book("SQL-M1", "SQL-1")
+assert db.get_book("SQL-1")["available_copies"] == 0, "Borrow should take a copy"
+assert db.get_member("SQL-M1")["borrowed_books"] == ["SQL-1"], "Loan should be recorded"
+assert [b["isbn"] for b in db.books_by_author("SQL AUTHOR")] == ["SQL-1", "SQL-2"], \
+    "Author lookup should ignore case"
+assert [b["isbn"] for b in db.search_books("other")] == ["SQL-2"], "Search should match titles"
+db.add_book("SQL-3", "Émile ÉTUDE", "Rousseau", "Non-Fiction", 1)
+assert [b["isbn"] for b in db.search_books("émile")] == ["SQL-3"], \
+    "Search should ignore case beyond ASCII, like library.py"
+db.delete_book("SQL-3")
+assert db.genre_summary()["Fiction"] == (1, 1, 0), "Genre summary should count copies"
+
+for call, error in [
+    (lambda: db.add_book("SQL-1", "Dup", "Dup", "Fiction", 1), library.DuplicateError),
+    (lambda: db.borrow_book("SQL-M1", "SQL-1"), library.UnavailableError),
+    (lambda: db.delete_book("SQL-1"), library.ConflictError),
+    (lambda: db.delete_member("SQL-M1"), library.ConflictError),
+    (lambda: db.return_book("SQL-M1", "SQL-2"), library.ConflictError),
+]:
+    try:
+        call()
+        assert False, f"Should raise {error.__name__}"
+    except error:
+        pass
+
+# A failed borrow must not leave a half-applied transaction behind
+assert db.get_member("SQL-M1")["borrowed_books"] == ["SQL-1"], "Failed borrow should roll back"
+db.return_book("SQL-M1", "SQL-1")
+db.delete_member("SQL-M1")
+db.delete_book("SQL-1")
+db.close()
+print("✓ PASSED: SQLite store works correctly")
+
+# TEST 15: Books and members are compact records that act like dictionaries
+print("\nTEST 15: __slots__ records with a dictionary interface")
+book = operations.books.get("TEST-001")
+assert isinstance(book, library.Book), "Appended dictionaries should become Book records"
+assert not hasattr(book, "__dict__"), "Records should not carry a per-instance dictionary"
+assert book == dict(book) and dict(book)["isbn"] == "TEST-001", "Records should compare like dicts"
+assert book["genre"] is library.VALID_GENRES[0], "Genre strings should be shared"
+try:
+    book["publisher"] = "Nobody"
+    assert False, "Unknown fields should be rejected"
+except KeyError:
+    pass
+member = operations.members.get("TEST-M001")
+assert isinstance(member, library.Member) and isinstance(member["borrowed_books"], list), \
+    "Members should keep a list of borrowed books"
+print("✓ PASSED: Records work like dictionaries")
+
+# TEST 16: Concurrent borrow/return never oversells or over-returns copies
+print("\nTEST 16: Thread-safe borrow/return under load")
+stress_isbns = [f"STRESS-{i}" for i in range(3)]
+stress_members = [f"STRESS-M{i}" for i in range(12)]
+for isbn in stress_isbns:
+    library.add_book(isbn, "Stress Book", "Stress Author", "Fiction", 4)
+for member_id in stress_members:
+    library.add_member(member_id, "Stress Member", "stress@email.com", "0")
+
+bad_counts = []
+
+
+def circulation_desk(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        member_id, isbn = rng.choice(stress_members), rng.choice(stress_isbns)
+        try:
+            if rng.random() < 0.5:
+                library.borrow_book(member_id, isbn)
+            else:
+                library.return_book(member_id, isbn)
+        except library.LibraryError:
+            pass
+        book = operations.books.get(isbn)
+        if not 0 <= book["available_copies"] <= book["total_copies"]:
+            bad_counts.append(book["available_copies"])
+
+
+old_interval = sys.getswitchinterval()
+sys.setswitchinterval(1e-6)  # switch threads as often as possible
+desks = [threading.Thread(target=circulation_desk, args=(seed,)) for seed in range(8)]
+for desk in desks:
+    desk.start()
+for desk in desks:
+    desk.join()
+sys.setswitchinterval(old_interval)
+
+assert not bad_counts, f"Copy counts went out of range: {bad_counts[:5]}"
+for isbn in stress_isbns:
+    on_loan = sum(operations.members.get(m)["borrowed_books"].count(isbn) for m in stress_members)
+    assert operations.books.get(isbn)["available_copies"] + on_loan == 4, "Copies should balance"
+for member_id in stress_members:
+    assert len(operations.members.get(member_id)["borrowed_books"]) <= library.MAX_BORROWED, \
+        "Borrow limit should hold under concurrency"
+    for isbn in list(operations.members.get(member_id)["borrowed_books"]):
+        library.return_book(member_id, isbn)
+    library.delete_member(member_id)
+for isbn in stress_isbns:
+    library.delete_book(isbn)
+
+# Books with different ISBNs are added and renamed at the same time; every
+# word must end up in the search index exactly once
+
+
+def cataloguer(desk):
+    for i in range(150):
+        isbn = f"IDX-{desk}-{i}"
+        library.add_book(isbn, f"Shared Word{i % 10} Draft", "Index Author", "Fiction", 1)
+        library.update_book(isbn, title=f"Shared Word{i % 10} Final{desk}")
+
+
+sys.setswitchinterval(1e-6)
+desks = [threading.Thread(target=cataloguer, args=(desk,)) for desk in range(8)]
+for desk in desks:
+    desk.start()
+for desk in desks:
+    desk.join()
+sys.setswitchinterval(old_interval)
+index_isbns = [f"IDX-{desk}-{i}" for desk in range(8) for i in range(150)]
+assert len(library.search_books("shared")) == len(index_isbns), "No book should be lost from the index"
+assert len(library.search_books("word3")) == 8 * 15, "Words added at once should all be indexed"
+assert not library.search_books("draft"), "Old titles should be gone from the index"
+assert len(library.search_index.sorted_tokens) == len(set(library.search_index.sorted_tokens)), \
+    "Each word should be listed once"
+for isbn in index_isbns:
+    library.delete_book(isbn)
+print("✓ PASSED: Copy counts and the search index stay consistent across threads")
+
+# TEST 17: Network service answers pipelined requests in order
+print("\nTEST 17: asyncio network service")
+
+
+async def talk_to_server():
+    service = await server.start_server("127.0.0.1", 0)
+    port = service.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    requests = [
+        {"id": 1, "op": "add_book", "args": {"isbn": "NET-1", "title": "Net Book",
+                                             "author": "Net Author", "genre": "Sci-Fi",
+                                             "total_copies": 1}},
+        {"id": 2, "op": "add_member", "args": {"member_id": "NET-M1", "name": "Net",
+                                               "email": "net@email.com", "contact": "0"}},
+        {"id": 3, "op": "borrow_book", "args": {"member_id": "NET-M1", "isbn": "NET-1"}},
+        {"id": 4, "op": "borrow_book", "args": {"member_id": "NET-M1", "isbn": "NET-1"}},
+        {"id": 5, "op": "search_books", "args": {"query": "net"}},
+        {"id": 6, "op": "drop_tables", "args": {}},
+    ]
+    # Send everything before reading anything (pipelining)
+    writer.write("".join(json.dumps(r) + "\n" for r in requests).encode())
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.05)  # let the server notice the disconnect
+    service.close()
+    await service.wait_closed()
+    return responses
+
+
+responses = asyncio.run(talk_to_server())
+assert [r["id"] for r in responses] == [1, 2, 3, 4, 5, 6], "Responses should come back in order"
+assert responses[2]["ok"] and responses[2]["result"]["available_copies"] == 0, "Borrow should succeed"
+assert responses[3]["error"] == "UnavailableError", "Errors should carry their type"
+assert responses[4]["result"][0]["isbn"] == "NET-1", "Search results should be sent as objects"
+assert responses[5]["error"] == "UnknownOperation", "Unknown operations should be refused"
+library.return_book("NET-M1", "NET-1")
+library.delete_book("NET-1")
+library.delete_member("NET-M1")
+print("✓ PASSED: Network service works correctly")
+
+# TEST 18: Batch borrow/return is all-or-nothing
+print("\nTEST 18: Batch circulation (all or nothing)")
+library.add_book("BATCH-1", "Batch One", "Batch Author", "Fiction", 1)
+library.add_book("BATCH-2", "Batch Two", "Batch Author", "Fiction", 3)
+library.add_member("BATCH-M1", "Batch Member", "batch@email.com", "0")
+library.add_member("BATCH-M2", "Batch Member 2", "batch2@email.com", "0")
+
+# BATCH-1 has one copy, so the second borrow of it must sink the whole batch
+try:
+    library.borrow_batch([("BATCH-M1", "BATCH-1"), ("BATCH-M1", "BATCH-2"), ("BATCH-M2", "BATCH-1")])
+    assert False, "Should raise BatchError"
+except library.BatchError as e:
+    assert e.index == 2 and isinstance(e.error, library.UnavailableError), "Should name the failing step"
+assert operations.members.get("BATCH-M1")["borrowed_books"] == [], "Nothing should be applied"
+assert operations.books.get("BATCH-1")["available_copies"] == 1, "Copies should be untouched"
+
+# The borrow limit counts books borrowed earlier in the same batch
+try:
+    library.borrow_batch([("BATCH-M2", "BATCH-2")] * 3 + [("BATCH-M2", "BATCH-1")])
+    assert False, "Fourth book should break the limit"
+except library.BatchError as e:
+    assert isinstance(e.error, library.BorrowLimitError), "Should report the borrow limit"
+
+library.borrow_batch([("BATCH-M1", "BATCH-1"), ("BATCH-M1", "BATCH-2"), ("BATCH-M2", "BATCH-2")])
+assert operations.books.get("BATCH-2")["available_copies"] == 1, "Batch borrows should apply"
+library.circulate_batch([("return", "BATCH-M1", "BATCH-1"), ("borrow", "BATCH-M2", "BATCH-1"),
+                         ("return", "BATCH-M1", "BATCH-2"), ("return", "BATCH-M2", "BATCH-2"),
+                         ("return", "BATCH-M2", "BATCH-1")])
+assert operations.books.get("BATCH-1")["available_copies"] == 1, "Mixed batch should balance"
+for isbn in ("BATCH-1", "BATCH-2"):
+    library.delete_book(isbn)
+for member_id in ("BATCH-M1", "BATCH-M2"):
+    library.delete_member(member_id)
+print("✓ PASSED: Batch circulation is atomic")
+
+# TEST 19: Paginated, sorted listings written one page at a time
+print("\nTEST 19: Paginated listings")
+page, cursor = library.page_books(limit=2)
+assert [b["isbn"] for b in page] == ["TEST-001", "TEST-003"] and cursor == 2, "First page"
+page, cursor = library.page_books(cursor, limit=2)
+assert [b["isbn"] for b in page] == ["TEST-005", "TEST-004"] and cursor is None, "Last page"
+
+titles = [b["title"] for b in library.iter_books(sort_by="title")]
+assert titles == sorted(titles, key=str.casefold), "Books should sort by title"
+most_available = next(library.iter_books(sort_by="availability"))
+assert most_available["available_copies"] == max(b["available_copies"] for b in operations.books), \
+    "Availability order should list the most available book first"
+renamed = operations.books.get("TEST-005")
+old_title = renamed["title"]
+library.update_book("TEST-005", title="AAA First In Title Order")
+page, cursor = library.page_books(limit=1, sort_by="title")
+assert page[0]["isbn"] == "TEST-005" and cursor == 1, "Sorted pages should follow updates"
+rest, _ = library.page_books(cursor, limit=100, sort_by="title")
+assert page + rest == sorted(operations.books, key=lambda b: (b["title"].casefold(), b["isbn"])), \
+    "Sorted pages should cover every book once, in order"
+library.update_book("TEST-005", title=old_title)
+
+
+class CountingWriter:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        pass
+
+
+writer = CountingWriter()
+operations.display_all_books(page_size=3, out=writer)
+assert len(writer.writes) == 3, "Header plus one write per page (3 + 1 books)"
+assert writer.writes[1].count("\n") == 3, "A full page should hold page_size rows"
+print("✓ PASSED: Listings page and sort correctly")
+
+# TEST 20: Genre and author indexes with constant-time counts
+print("\nTEST 20: Genre and author indexes")
+library.add_book("IDX-1", "Index One", "J.K. Rowling", "Sci-Fi", 2)
+library.add_book("IDX-2", "Index Two", "j. k.  rowling", "Sci-Fi", 1)
+library.add_member("IDX-M1", "Index Member", "idx@email.com", "0")
+before = library.genre_summary("Sci-Fi")
+assert [b["isbn"] for b in library.books_by_author("J. K. Rowling")] == ["IDX-1", "IDX-2"], \
+    "Author lookups should ignore case, spacing and punctuation"
+
+library.borrow_book("IDX-M1", "IDX-2")
+after = library.genre_summary("Sci-Fi")
+assert after["available_copies"] == before["available_copies"] - 1, "Borrow should lower availability"
+assert after["titles_available"] == before["titles_available"] - 1, "IDX-2 has no copy left"
+available_isbns = [b["isbn"] for b in library.books_in_genre("Sci-Fi", available_only=True)]
+assert "IDX-1" in available_isbns and "IDX-2" not in available_isbns, "Available listing should skip IDX-2"
+library.return_book("IDX-M1", "IDX-2")
+
+library.update_book("IDX-1", genre="Fiction", author="Someone Else")
+assert library.count_books_by_author("jk rowling") == 0 and \
+    library.count_books_by_author("j k rowling") == 1, "Author index should follow updates"
+assert library.genre_summary("Sci-Fi")["titles"] == before["titles"] - 1, "Genre change should move counts"
+for genre in library.VALID_GENRES:
+    expected = [b for b in operations.books if b["genre"] == genre]
+    summary = library.genre_summary(genre)
+    assert summary["titles"] == len(expected), "Title counts should match a full scan"
+    assert summary["available_copies"] == sum(b["available_copies"] for b in expected), \
+        "Available copies should match a full scan"
+library.delete_book("IDX-1")
+library.delete_book("IDX-2")
+library.delete_member("IDX-M1")
+print("✓ PASSED: Genre and author indexes stay consistent")
+
+# TEST 21: Loan records with due dates and overdue lookups
+print("\nTEST 21: Loans, due dates and overdue sweeps")
+DAY = 24 * 60 * 60
+library.add_book("LOAN-1", "Loan Book", "Loan Author", "Fiction", 3)
+library.add_member("LOAN-M1", "Loan Member", "loan@email.com", "0")
+library.add_member("LOAN-M2", "Loan Member 2", "loan2@email.com", "0")
+start = 1_000_000.0
+library.borrow_book("LOAN-M1", "LOAN-1", now=start)
+library.borrow_book("LOAN-M2", "LOAN-1", now=start + DAY)
+library.borrow_book("LOAN-M1", "LOAN-1", now=start + 2 * DAY)
+
+loan = library.loans_for_member("LOAN-M1")[0]
+assert loan.due_at == start + library.loans.loan_days * DAY, "Loans should be due after the loan period"
+assert library.next_overdue(10, now=start) == [], "Nothing is overdue on day one"
+overdue = library.next_overdue(2, now=start + 30 * DAY)
+assert [(l.member_id, l.borrowed_at) for l in overdue] == [("LOAN-M1", start), ("LOAN-M2", start + DAY)], \
+    "Most overdue loans should come first"
+
+# Returning closes the oldest open loan of that book for the member
+library.return_book("LOAN-M1", "LOAN-1", now=start + 3 * DAY)
+assert [l.borrowed_at for l in library.loans_for_member("LOAN-M1")] == [start + 2 * DAY], \
+    "The oldest loan should be closed first"
+assert [l.member_id for l in library.next_overdue(10, now=start + 30 * DAY)] == ["LOAN-M2", "LOAN-M1"], \
+    "Returned loans should drop out of the overdue list"
+
+# The sweeper reports each overdue loan only once
+reminders = []
+sweeper = library.OverdueSweeper(library.loans, reminders.append, clock=lambda: start + 30 * DAY)
+assert sweeper.sweep_once() == 2 and sweeper.sweep_once() == 0, "Each loan should be reported once"
+assert {l.member_id for l in reminders} == {"LOAN-M1", "LOAN-M2"}, "Both members should be reminded"
+
+library.return_book("LOAN-M1", "LOAN-1")
+library.return_book("LOAN-M2", "LOAN-1")
+assert library.next_overdue(10, now=start + 30 * DAY) == [], "All loans should be closed"
+library.delete_book("LOAN-1")
+library.delete_member("LOAN-M1")
+library.delete_member("LOAN-M2")
+print("✓ PASSED: Loans track due dates and overdue items")
+
+# TEST 22: Hold queues are served first-come, first-served
+print("\nTEST 22: Holds on unavailable books")
+library.add_book("HOLD-1", "Hold Book", "Hold Author", "Fiction", 1)
+for i in range(1, 5):
+    library.add_member(f"HOLD-M{i}", f"Hold Member {i}", f"hold{i}@email.com", "0")
+library.borrow_book("HOLD-M1", "HOLD-1", now=start)
+try:
+    library.place_hold("HOLD-M2", "HOLD-2", now=start)
+    assert False, "Should reject holds on unknown books"
+except library.NotFoundError:
+    pass
+library.place_hold("HOLD-M2", "HOLD-1", now=start)
+library.place_hold("HOLD-M3", "HOLD-1", now=start + 1)
+library.place_hold("HOLD-M4", "HOLD-1", now=start + 2)
+try:
+    library.place_hold("HOLD-M2", "HOLD-1", now=start)
+    assert False, "Should reject a second hold by the same member"
+except library.DuplicateError:
+    pass
+assert library.hold_position("HOLD-M4", "HOLD-1", now=start) == 3, "Holds should queue in order"
+
+# The returned copy goes straight to the first member in the queue
+library.cancel_hold("HOLD-M3", "HOLD-1")
+library.return_book("HOLD-M1", "HOLD-1", now=start + DAY)
+assert "HOLD-1" in library.get_member("HOLD-M2")["borrowed_books"], "First hold should get the copy"
+assert library.hold_position("HOLD-M4", "HOLD-1", now=start + DAY) == 1, "Queue should move up"
+
+# Expired holds are skipped and the copy goes back on the shelf
+library.return_book("HOLD-M2", "HOLD-1", now=start + 30 * DAY)
+assert library.get_book("HOLD-1")["available_copies"] == 1, "Expired holds should not get copies"
+try:
+    library.place_hold("HOLD-M3", "HOLD-1")
+    assert False, "Should not allow holds while copies are available"
+except library.ConflictError:
+    pass
+
+# Borrowing a book cancels the member's own hold; the log must replay cleanly
+with tempfile.TemporaryDirectory() as folder:
+    store = storage.Storage(folder)
+    store.open()
+    library.borrow_book("HOLD-M1", "HOLD-1", now=start)
+    library.place_hold("HOLD-M2", "HOLD-1", now=start)
+    library.return_book("HOLD-M1", "HOLD-1", now=start + 30 * DAY)
+    library.borrow_book("HOLD-M2", "HOLD-1", now=start + 30 * DAY)
+    store.close()
+    store.open()
+    assert store.replay_errors == [], f"Log should replay cleanly: {store.replay_errors}"
+    assert library.get_member("HOLD-M2")["borrowed_books"] == ["HOLD-1"], "Loan should be restored"
+    store.close()
+library.return_book("HOLD-M2", "HOLD-1")
+library.delete_book("HOLD-1")
+for i in range(1, 5):
+    library.delete_member(f"HOLD-M{i}")
+print("✓ PASSED: Holds are filled in order and expire")
+
+# TEST 23: Typo-tolerant search through the trigram index
+print("\nTEST 23: Fuzzy search")
+library.add_book("FUZZ-1", "To Kill a Mockingbird", "Harper Lee", "Fiction", 1)
+library.add_book("FUZZ-2", "Mocking Jay", "Suzanne Collins", "Fiction", 1)
+assert library.search_books("mokingbird") == [], "Exact search should miss the typo"
+assert [b["isbn"] for b in library.search_books("mokingbird", mode="fuzzy")] == ["FUZZ-1"], \
+    "Fuzzy search should forgive a missing letter"
+assert [b["isbn"] for b in library.search_books("mocking", mode="fuzzy")][:2] == ["FUZZ-1", "FUZZ-2"], \
+    "Prefix matches should rank first"
+assert library.search_books("harpr colins", mode="fuzzy") == [], "Every word must still match"
+library.update_book("FUZZ-2", author="Suzanne Kollins")
+assert [b["isbn"] for b in library.search_books("colins", mode="fuzzy")] == ["FUZZ-2"], \
+    "Updated authors should be searchable"
+library.delete_book("FUZZ-1")
+assert library.search_books("mokingbird", mode="fuzzy") == [], "Deleted books should not be found"
+library.delete_book("FUZZ-2")
+print("✓ PASSED: Fuzzy search tolerates typos")
+
+# TEST 24: Cached search results are dropped only when a matching book changes
+print("\nTEST 24: Search result cache")
+library.search_cache.clear()
+library.add_book("CACHE-1", "Cache Title", "Cache Author", "Fiction", 1)
+before = library.search_cache.stats()
+library.search_books("cache title")
+library.search_books("Title, CACHE")
+library.search_books("unrelated words")
+stats = library.search_cache.stats()
+assert stats["misses"] - before["misses"] == 2 and stats["hits"] - before["hits"] == 1, \
+    "Equivalent queries should share a cache entry"
+library.add_book("CACHE-2", "Cached Things", "Someone Else", "Fiction", 1)
+assert [b["isbn"] for b in library.search_books("cache")] == ["CACHE-1", "CACHE-2"], \
+    "Adding a matching book should refresh the result"
+assert library.search_cache.stats()["entries"] >= 2, "Unaffected entries should stay cached"
+assert [b["isbn"] for b in library.search_books("cahced", mode="fuzzy")] == ["CACHE-2"]
+library.add_book("CACHE-3", "Cached Again", "Someone Else", "Fiction", 1)
+assert [b["isbn"] for b in library.search_books("cahced", mode="fuzzy")] == ["CACHE-2", "CACHE-3"], \
+    "A book a few typos away from a fuzzy query should refresh it"
+library.add_books([library.make_book("CACHE-4", "Cached Batch", "Someone Else", "Fiction", 1)])
+assert library.search_cache.stats()["entries"] == 0, "A batch add should drop the cache once"
+assert len(library.search_books("cached")) == 3, "Batch-added books should be found"
+library.delete_book("CACHE-3")
+library.delete_book("CACHE-4")
+library.update_book("CACHE-1", title="Renamed")
+assert [b["isbn"] for b in library.search_books("cache title")] == [], "Renamed books should drop out"
+library.delete_book("CACHE-1")
+library.delete_book("CACHE-2")
+assert library.search_books("cache") == [], "Deleted books should drop out"
+print("✓ PASSED: Search cache hits and invalidates precisely")
+
+# TEST 25: Sharded catalog across worker processes (run as its own script
+# so worker processes never re-import this file)
+print("\nTEST 25: Sharded catalog")
+result = subprocess.run([sys.executable, "sharding.py"], capture_output=True, text=True,
+                        cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+assert result.returncode == 0, f"Sharding self-check failed:\n{result.stderr}"
+print("✓ PASSED: Shards route, fan out and borrow across shards")
+
+# TEST 26: Metrics are recorded only while enabled
+print("\nTEST 26: Operation metrics")
+plain_borrow = library.borrow_book
+metrics.registry.clear()
+metrics.enable()
+try:
+    library.add_book("MET-1", "Metric Book", "Metric Author", "Fiction", 1)
+    library.add_member("MET-M1", "Metric Member", "met@email.com", "0")
+    library.add_member("MET-M2", "Metric Member 2", "met2@email.com", "0")
+    library.borrow_book("MET-M1", "MET-1")
+    try:
+        library.borrow_book("MET-M2", "MET-1")
+    except library.UnavailableError:
+        pass
+    try:
+        library.loans_for_member()
+    except TypeError:
+        pass
+finally:
+    metrics.disable()
+assert library.borrow_book is plain_borrow, "Disabling should restore the plain functions"
+library.return_book("MET-M1", "MET-1")
+assert metrics.registry.calls["borrow_book"] == 2, "Calls made while enabled should be counted"
+assert "return_book" not in metrics.registry.calls, "Calls made while disabled should not be counted"
+assert "get_book" not in metrics.registry.calls, "Lookups made inside an operation are not calls of their own"
+assert metrics.registry.calls["loans_for_member"] == 1, "Calls failing with other errors should be counted"
+assert server.OPERATIONS <= set(metrics.INSTRUMENTED), "Every network operation should be instrumented"
+metrics_path = os.path.join(tempfile.mkdtemp(), "library.prom")
+metrics.write_prometheus(metrics_path)
+with open(metrics_path, encoding="utf-8") as file:
+    exported = file.read()
+assert 'library_errors_total{op="borrow_book",error="UnavailableError",reason="No copies available"} 1' \
+    in exported, "Error reasons should be exported"
+assert 'library_call_seconds_count{op="borrow_book"} 2' in exported, "Latencies should be exported"
+library.delete_book("MET-1")
+library.delete_member("MET-M1")
+library.delete_member("MET-M2")
+print("✓ PASSED: Metrics count calls, errors and latency")
+
+# TEST 27: Profiling mode times each menu command
+print("\nTEST 27: Profiling mode")
+report_path = os.path.join(tempfile.mkdtemp(), "profile.txt")
+profiler = profiling.Profiler(report_path, cprofile=True)
+profiler.install(operations)
+operations.display_all_books(out=io.StringIO())
+operations.display_all_books(out=io.StringIO())
+profiler.finish()
+assert profiler.timings["display_all_books"][0] == 2, "Each command call should be timed"
+assert not hasattr(operations, "input"), "Uninstalling should restore input()"
+with open(report_path, encoding="utf-8") as file:
+    report = file.read()
+assert "display_all_books" in report and "Hottest functions" in report, "Report should list commands"
+print("✓ PASSED: Profiler reports per-command timings")
+
+# TEST 28: Reverse index from ISBN to the members holding it
+print("\nTEST 28: Borrower index")
+library.add_book("WHO-1", "Who Has It", "Some Author", "Fiction", 3)
+library.add_member("WHO-M1", "Holder One", "who1@email.com", "0")
+library.add_member("WHO-M2", "Holder Two", "who2@email.com", "0")
+library.borrow_book("WHO-M2", "WHO-1")
+library.borrow_book("WHO-M1", "WHO-1")
+library.borrow_book("WHO-M1", "WHO-1")
+assert library.holders("WHO-1") == ["WHO-M2", "WHO-M1"], "Holders should be listed in borrow order"
+try:
+    library.delete_book("WHO-1")
+    assert False, "Should not delete a borrowed book"
+except library.ConflictError as e:
+    assert "WHO-M2, WHO-M1" in str(e), "The error should name the holders"
+library.return_book("WHO-M1", "WHO-1")
+assert library.holders("WHO-1") == ["WHO-M2", "WHO-M1"], "A member with a second copy still holds it"
+library.return_book("WHO-M2", "WHO-1")
+assert library.holders("WHO-1") == ["WHO-M1"], "Returned copies should leave the index"
+assert library.check_borrowers() == [], "Index should agree with the borrowed lists"
+
+# The checker spots changes made behind the index's back
+library.get_member("WHO-M2")["borrowed_books"].append("WHO-1")
+assert library.check_borrowers() == [("WHO-1", "WHO-M2", 0, 1)], "Checker should find the difference"
+library.rebuild_borrowers()
+assert library.check_borrowers() == [], "Rebuilding should fix the index"
+library.return_book("WHO-M1", "WHO-1")
+library.get_member("WHO-M2")["borrowed_books"].remove("WHO-1")
+library.rebuild_borrowers()
+library.delete_book("WHO-1")
+library.delete_member("WHO-M1")
+library.delete_member("WHO-M2")
+print("✓ PASSED: Borrower index tracks who holds each book")
+
+# TEST 29: Column-oriented snapshot for reports
+print("\nTEST 29: Columnar analytics")
+before = columnar.ColumnarCatalog.from_library().availability_by_genre()
+library.add_book("COL-1", "Column One", "Col Author", "Fiction", 4)
+library.add_book("COL-2", "Column Two", "Col Author", "Sci-Fi", 2)
+library.add_book("COL-3", "Column Three", "Other Author", "Fiction", 2)
+library.add_member("COL-M1", "Col Member", "col@email.com", "0")
+for isbn in ("COL-2", "COL-1", "COL-2"):
+    library.borrow_book("COL-M1", isbn)
+library.return_book("COL-M1", "COL-2")
+columns = columnar.ColumnarCatalog.from_library()
+after = columns.availability_by_genre()
+assert {field: after["Fiction"][field] - before["Fiction"][field] for field in after["Fiction"]} == \
+    {"titles": 2, "total_copies": 6, "available_copies": 5}, "Genre totals should include the new books"
+total = sum(book["total_copies"] for book in library.books)
+available = sum(book["available_copies"] for book in library.books)
+assert columns.utilization() == (total - available) / total, "Utilization should match the books"
+assert ("COL-2", "Column Two", 2) in columns.most_borrowed(len(columns)), "COL-2 was lent twice"
+assert ("Col Author", 2) in columns.titles_by_author(len(columns)), "Col Author has two titles"
+library.return_book("COL-M1", "COL-1")
+library.return_book("COL-M1", "COL-2")
+for isbn in ("COL-1", "COL-2", "COL-3"):
+    library.delete_book(isbn)
+library.delete_member("COL-M1")
+print("✓ PASSED: Columnar snapshot aggregates the catalog")
+
+# TEST 30: Memory-mapped binary catalog file
+print("\nTEST 30: Binary catalog file")
+catalog_path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+shelf = [library.make_book(f"BIN-{i:03d}", f"Binary Title {i}", "Bin Author", "Sci-Fi", 2)
+         for i in (5, 1, 3)]
+shelf.append(library.make_book("BIN-ü", "Ünïcode Title", "Ä Author", "Fiction", 1))
+binary_catalog.write_catalog(catalog_path, shelf)
+with binary_catalog.BinaryCatalog(catalog_path) as catalog:
+    assert len(catalog) == 4, "Every book should be written"
+    assert catalog.get("BIN-003") == shelf[2], "Lookups should rebuild the record"
+    assert catalog.get("BIN-ü")["title"] == "Ünïcode Title", "Text should survive as UTF-8"
+    assert catalog.get("BIN-002") is None and "BIN-004" not in catalog, "Missing ISBNs should not be found"
+    assert [book["isbn"] for book in catalog][:3] == ["BIN-001", "BIN-003", "BIN-005"], \
+        "Books should be stored in ISBN order"
+for size in (os.path.getsize(catalog_path) - 1, 10):  # truncated table, then header
+    with open(catalog_path, "r+b") as file:
+        file.truncate(size)
+    try:
+        binary_catalog.BinaryCatalog(catalog_path)
+        assert False, "Should reject a truncated file"
+    except binary_catalog.CatalogFormatError:
+        pass
+print("✓ PASSED: Binary catalog opens lazily and finds books by ISBN")
+
+# TEST 31: Change events with sequence numbers and a JSONL sink
+print("\nTEST 31: Change events")
+bus = events.EventBus(capacity=4)
+received = []
+bus.subscribe(received.append)
+events_path = os.path.join(tempfile.mkdtemp(), "events.jsonl")
+sink = events.JsonlSink(events_path, batch_size=2)
+bus.subscribe(sink.write)
+bus.attach()
+try:
+    library.add_book("EVT-1", "Event Book", "Event Author", "Fiction", 1)
+    library.add_member("EVT-M1", "Event Member", "evt@email.com", "0")
+    library.borrow_book("EVT-M1", "EVT-1", now=start)
+    library.return_book("EVT-M1", "EVT-1", now=start + DAY)
+    library.update_book("EVT-1", title="Event Book 2")
+    library.delete_book("EVT-1")
+    library.delete_member("EVT-M1")
+finally:
+    bus.detach()
+    sink.close()
+assert [type(e).__name__ for e in received] == [
+    "BookAdded", "MemberAdded", "BookBorrowed", "BookReturned", "BookUpdated", "BookDeleted",
+    "MemberDeleted"], "Every change should produce one typed event"
+assert [e.seq for e in received] == list(range(1, 8)), "Sequence numbers should count up"
+assert received[2].at == start and received[4].changes == {"title": "Event Book 2"}, \
+    "Events should carry their details"
+assert [e.seq for e in bus.since(5)] == [6, 7], "Consumers should resume after a sequence number"
+try:
+    bus.since(1)
+    assert False, "Events that left the ring buffer should be reported lost"
+except events.EventsLost:
+    pass
+logged = list(events.read_events(events_path, after_seq=5))
+assert [(e["seq"], e["type"]) for e in logged] == [(6, "BookDeleted"), (7, "MemberDeleted")], \
+    "The JSONL file should hold every event"
+print("✓ PASSED: Changes are published as resumable events")
+
+# TEST 32: Read replicas follow the primary (primary here, replica servers
+# as separate processes, connected by a Unix socket)
+print("\nTEST 32: Read replicas")
+result = subprocess.run([sys.executable, "replication.py"], capture_output=True, text=True,
+                        cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+assert result.returncode == 0, f"Replication self-check failed:\n{result.stderr}"
+print(result.stdout.strip())
+print("✓ PASSED: Replicas apply the primary's changes, serve searches and rejoin a new primary")
+
 print("\n" + "=" * 60)
 print("ALL TESTS PASSED SUCCESSFULLY!")
 print("=" * 60)
@@ -182,6 +987,30 @@ print("✓ Test 5: Book deletion restriction (borrowed copies)")
 print("✓ Test 6: Member deletion restriction (borrowed books)")
 print("✓ Test 7: Return book functionality")
 print("✓ Test 8: Search functionality")
+print("✓ Test 9: Catalog store lookups")
+print("✓ Test 10: Indexed search")
+print("✓ Test 11: Service API")
+print("✓ Test 12: Bulk import")
+print("✓ Test 13: Persistent storage")
+print("✓ Test 14: SQLite store")
+print("✓ Test 15: Compact records")
+print("✓ Test 16: Thread-safe circulation")
+print("✓ Test 17: Network service")
+print("✓ Test 18: Batch circulation")
+print("✓ Test 19: Paginated listings")
+print("✓ Test 20: Genre and author indexes")
+print("✓ Test 21: Loans and overdue sweeps")
+print("✓ Test 22: Hold queues")
+print("✓ Test 23: Fuzzy search")
+print("✓ Test 24: Search result cache")
+print("✓ Test 25: Sharded catalog")
+print("✓ Test 26: Operation metrics")
+print("✓ Test 27: Profiling mode")
+print("✓ Test 28: Borrower index")
+print("✓ Test 29: Columnar analytics")
+print("✓ Test 30: Binary catalog file")
+print("✓ Test 31: Change events")
+print("✓ Test 32: Read replicas")
 print("\n" + "=" * 60)
 print("All data structures working correctly:")
 print(f"✓ Dictionaries: Used for {len(operations.books)} books and {len(operations.members)} members")